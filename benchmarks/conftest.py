@@ -0,0 +1,68 @@
+"""
+ベンチマーク共通設定・フィクスチャ
+
+合成ST96コーパスをセッションごとに一時ディレクトリへ生成し、各ベンチマークで共有する。
+コーパスの規模は --st96-docs / --st96-paragraphs / --st96-claims / --st96-seed で指定する。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCHMARK_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from st96_generator import ST96Generator  # noqa: E402
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("st96", "合成ST96コーパス")
+    group.addoption("--st96-docs", type=int, default=20, help="生成する文書数")
+    group.addoption("--st96-paragraphs", type=int, default=40, help="実施形態の段落数")
+    group.addoption("--st96-claims", type=int, default=5, help="請求項数")
+    group.addoption("--st96-seed", type=int, default=0, help="乱数シード")
+
+
+@pytest.fixture(scope="session")
+def st96_generator(request):
+    """コマンドラインオプションに従ったコーパス生成器"""
+    return ST96Generator(
+        paragraphs=request.config.getoption("--st96-paragraphs"),
+        claims=request.config.getoption("--st96-claims"),
+        seed=request.config.getoption("--st96-seed"),
+    )
+
+
+@pytest.fixture(scope="session")
+def st96_corpus(st96_generator, request, tmp_path_factory):
+    """合成コーパスのディレクトリ"""
+    corpus_dir = tmp_path_factory.mktemp("st96")
+    st96_generator.write_corpus(str(corpus_dir), request.config.getoption("--st96-docs"))
+    return corpus_dir
+
+
+@pytest.fixture(scope="session")
+def xml_file(st96_corpus):
+    """ベンチマーク対象の代表ファイル（コーパスの先頭）"""
+    return sorted(st96_corpus.glob("**/*.xml"))[0]
+
+
+@pytest.fixture(scope="session")
+def processor():
+    from patent_processing.text_processor import PatentTextProcessor
+    return PatentTextProcessor(language="japanese")
+
+
+@pytest.fixture(scope="session")
+def patent_data(processor, xml_file):
+    """process_xml_files 1件分の処理済みデータ"""
+    return processor.process_xml_file(xml_file)
+
+
+@pytest.fixture(scope="session")
+def processed_df(processor, st96_corpus):
+    """コーパス全体の処理済みDataFrame"""
+    return processor.process_xml_files(str(st96_corpus))
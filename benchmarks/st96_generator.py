@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+合成ST96特許XMLコーパス生成
+
+data/raw/sample_patent.xml の文面（名称・要約・技術分野・背景技術・実施例・請求項）を素材に、
+PatentTextProcessor.parse_xml_file が解析する ST96 JPPatent 形式の文書を任意の規模で生成する。
+段落番号（com:pNumber）、改行（com:Br）、強調（com:B）、化学式・数値表現、
+従属請求項（「請求項1に記載の」）を含み、実データに近いパターンで各処理を通過させる。
+
+使用例:
+    python benchmarks/st96_generator.py /tmp/st96 1000
+    python benchmarks/st96_generator.py /tmp/st96 100 --paragraphs 200 --claims 20 --seed 1
+"""
+
+import argparse
+import random
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import List, Dict, Optional
+from xml.sax.saxutils import escape
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SAMPLE_PATH = PROJECT_ROOT / "data" / "raw" / "sample_patent.xml"
+
+NAMESPACES = (
+    'xmlns:jppat="http://www.jpo.go.jp/standards/XMLSchema/ST96/JPPatent" '
+    'xmlns:jpcom="http://www.jpo.go.jp/standards/XMLSchema/ST96/JPCommon" '
+    'xmlns:com="http://www.wipo.int/standards/XMLSchema/ST96/Common" '
+    'xmlns:pat="http://www.wipo.int/standards/XMLSchema/ST96/Patent"'
+)
+
+SAMPLE_NAMESPACES = {
+    'jpcom': 'http://www.jpo.go.jp/standards/XMLSchema/ST96/JPCommon',
+}
+
+# サンプルXMLが見つからない場合の素材
+FALLBACK_SEED = {
+    'title': 'ポリプロピレン樹脂組成物及びその成形品',
+    'abstract': ['本発明は、優れた耐衝撃性と剛性を両立するポリプロピレン樹脂組成物に関する。'],
+    'technical_field': ['本発明は、自動車部品、家電製品等に使用されるポリプロピレン樹脂組成物に関する。'],
+    'background_art': ['従来のポリプロピレン樹脂は、剛性は優れているが耐衝撃性に課題があった。'],
+    'summary': ['この課題を解決するため、以下の構成を採用した。'],
+    'sentences': [
+        'プロピレン系重合体(A) 70重量%、エチレン・α-オレフィン共重合体(B) 30重量%を溶融混練して樹脂組成物を得た。',
+        '分子量分布(Mw/Mn)は2.0～4.0である。',
+        '得られた組成物の融点は165℃であった。',
+        '反応式: C₃H₆ → (-CH₂-CH(CH₃)-)ₙ',
+    ],
+    'claims': ['プロピレン系重合体(A)50～90重量%と、エチレン・α-オレフィン共重合体(B)10～50重量%とを含有することを特徴とするポリプロピレン樹脂組成物。'],
+}
+
+# 実施形態の段落に混ぜる定型表現（法的表現・化学表現の検出対象）
+BOILERPLATE_SENTENCES = [
+    '本発明は上記実施形態に限定されるものではなく、特許請求の範囲に記載の範囲内で種々の変更が可能である。',
+    '前記組成物は、少なくとも一種の添加剤を含んでもよい。',
+    '以下、実施例により本発明を具体的に説明するが、本発明はこれらに限定されない。',
+    '酸化防止剤としては、例えばSiO₂、TiO₂、Al₂O₃等を用いることができる。',
+    '触媒の存在下、80～120℃で2時間反応させた。',
+    '得られた成形品の曲げ弾性率は1500MPa以上であることが好ましい。',
+]
+
+
+def _sentences(text: str) -> List[str]:
+    """インデント・改行を除いて句点で文に分割"""
+    joined = ''.join(line.strip().lstrip('-').strip() for line in text.splitlines())
+    return [part + '。' for part in joined.split('。') if part]
+
+
+def load_seed_text(sample_path: Optional[Path] = None) -> Dict[str, List[str]]:
+    """
+    サンプル特許XMLから生成用の文面を抽出
+
+    Args:
+        sample_path: サンプルXMLのパス（Noneの場合は data/raw/sample_patent.xml）
+
+    Returns:
+        セクション名 → 文のリスト（title は文字列）
+    """
+    sample_path = Path(sample_path or DEFAULT_SAMPLE_PATH)
+    if not sample_path.exists():
+        return FALLBACK_SEED
+
+    root = ET.parse(sample_path).getroot()
+
+    def section(tag: str) -> List[str]:
+        element = root.find(f'.//jpcom:{tag}', SAMPLE_NAMESPACES)
+        if element is None:
+            return []
+        return _sentences(''.join(element.itertext()))
+
+    title = ' '.join(section('invention-title')).rstrip('。') or FALLBACK_SEED['title']
+    # 請求項は改行・インデントを除去し、従属関係の記載（請求項N記載の）は生成時に付け直す
+    claims = [
+        re.sub(r'^請求項\d+(?:に)?記載の', '', ''.join(''.join(claim.itertext()).split()))
+        for claim in root.iterfind('.//jpcom:claim', SAMPLE_NAMESPACES)
+    ]
+    return {
+        'title': title,
+        'abstract': section('abstract') or FALLBACK_SEED['abstract'],
+        'technical_field': section('technical-field') or FALLBACK_SEED['technical_field'],
+        'background_art': section('background-art') or FALLBACK_SEED['background_art'],
+        'summary': section('disclosure') or FALLBACK_SEED['summary'],
+        'sentences': (section('disclosure') + section('best-mode')) or FALLBACK_SEED['sentences'],
+        'claims': [claim for claim in claims if claim] or FALLBACK_SEED['claims'],
+    }
+
+
+class ST96Generator:
+    """合成ST96特許XMLの生成クラス"""
+
+    def __init__(self, paragraphs: int = 40, sentences_per_paragraph: int = 4, claims: int = 5,
+                 seed: int = 0, sample_path: Optional[Path] = None):
+        """
+        初期化
+
+        Args:
+            paragraphs: 実施形態の段落数（文書サイズの主な調整パラメータ）
+            sentences_per_paragraph: 1段落あたりの文数
+            claims: 請求項数（2項目以降は従属請求項）
+            seed: 乱数シード（同じシードなら同じコーパスを生成）
+            sample_path: 素材とするサンプルXMLのパス
+        """
+        self.paragraphs = paragraphs
+        self.sentences_per_paragraph = sentences_per_paragraph
+        self.claims = claims
+        self.seed = seed
+        self.seed_text = load_seed_text(sample_path)
+        self.sentence_pool = self.seed_text['sentences'] + BOILERPLATE_SENTENCES
+
+    def _paragraph(self, rng: random.Random, number: int) -> str:
+        sentences = [escape(rng.choice(self.sentence_pool)) for _ in range(self.sentences_per_paragraph)]
+        # 改行・強調を含む段落を一定割合で混ぜる
+        if number % 3 == 0 and len(sentences) > 1:
+            sentences[0] += '<com:Br/>'
+        if number % 5 == 0:
+            sentences[-1] = f'<com:B>{sentences[-1]}</com:B>'
+        return f'<com:P com:pNumber="{number:04d}">{"".join(sentences)}</com:P>'
+
+    def _section(self, tag: str, sentences: List[str], number: int) -> str:
+        return f'<pat:{tag}><com:P com:pNumber="{number:04d}">{escape("".join(sentences))}</com:P></pat:{tag}>'
+
+    def _claims(self, rng: random.Random) -> str:
+        claims = []
+        base_claims = self.seed_text['claims']
+        for number in range(1, self.claims + 1):
+            text = base_claims[(number - 1) % len(base_claims)]
+            if number > 1:
+                text = f'請求項{rng.randint(1, number - 1)}に記載の{text}'
+            claims.append(
+                f'<pat:Claim><pat:ClaimNumber>{number}</pat:ClaimNumber>'
+                f'<pat:ClaimText>{escape(text)}</pat:ClaimText></pat:Claim>'
+            )
+        return ''.join(claims)
+
+    def document(self, index: int) -> str:
+        """
+        文書1件分のXMLを生成
+
+        Args:
+            index: 文書番号（公開番号・乱数系列の決定に使用）
+
+        Returns:
+            XML文字列
+        """
+        rng = random.Random(self.seed * 1_000_003 + index)
+        seed_text = self.seed_text
+        publication_number = 7000000 + index
+        paragraphs = ''.join(self._paragraph(rng, number) for number in range(10, 10 + self.paragraphs))
+
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<jppat:PatentPublication {NAMESPACES}>'
+            f'<pat:PublicationNumber>{publication_number}</pat:PublicationNumber>'
+            '<com:PublicationDate>2025-01-30</com:PublicationDate>'
+            '<pat:FilingDate>2023-01-01</pat:FilingDate>'
+            f'<pat:InventionTitle>{escape(seed_text["title"])}（{index}）</pat:InventionTitle>'
+            f'<pat:Abstract><com:P>{escape("".join(seed_text["abstract"]))}</com:P></pat:Abstract>'
+            '<jppat:InventorBag><jppat:Inventor><com:Contact><com:Name>'
+            '<com:EntityName>山田 太郎</com:EntityName></com:Name></com:Contact></jppat:Inventor></jppat:InventorBag>'
+            '<jppat:ApplicantBag><jppat:Applicant><com:Contact><com:Name>'
+            '<com:EntityName>株式会社サンプル</com:EntityName></com:Name></com:Contact></jppat:Applicant></jppat:ApplicantBag>'
+            '<pat:MainClassification>C08L 23/10</pat:MainClassification>'
+            '<com:PatentCitationText>特開2020-000001号公報</com:PatentCitationText>'
+            '<pat:Description>'
+            f'{self._section("TechnicalField", seed_text["technical_field"], 1)}'
+            f'{self._section("BackgroundArt", seed_text["background_art"], 2)}'
+            f'{self._section("Summary", seed_text["summary"], 3)}'
+            f'<pat:EmbodimentDescription>{paragraphs}</pat:EmbodimentDescription>'
+            '</pat:Description>'
+            f'<pat:Claims>{self._claims(rng)}</pat:Claims>'
+            '</jppat:PatentPublication>'
+        )
+
+    def write_corpus(self, output_dir: str, num_docs: int, docs_per_dir: int = 1000) -> List[Path]:
+        """
+        コーパスをディレクトリに書き出し（実データ同様にサブディレクトリへ分散）
+
+        Args:
+            output_dir: 出力ディレクトリ
+            num_docs: 文書数
+            docs_per_dir: 1サブディレクトリあたりの文書数
+
+        Returns:
+            書き出したXMLファイルのパス
+        """
+        output_directory = Path(output_dir)
+        paths = []
+        for index in range(num_docs):
+            sub_dir = output_directory / f"{index // docs_per_dir:04d}"
+            sub_dir.mkdir(parents=True, exist_ok=True)
+            path = sub_dir / f"{7000000 + index}.xml"
+            path.write_text(self.document(index), encoding='utf-8')
+            paths.append(path)
+        return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成ST96特許XMLコーパス生成")
+    parser.add_argument('output_dir', help="出力ディレクトリ")
+    parser.add_argument('num_docs', type=int, help="文書数")
+    parser.add_argument('--paragraphs', type=int, default=40, help="実施形態の段落数")
+    parser.add_argument('--sentences', type=int, default=4, help="1段落あたりの文数")
+    parser.add_argument('--claims', type=int, default=5, help="請求項数")
+    parser.add_argument('--seed', type=int, default=0, help="乱数シード")
+    parser.add_argument('--sample', default=None, help="素材とするサンプルXML")
+    args = parser.parse_args()
+
+    generator = ST96Generator(paragraphs=args.paragraphs, sentences_per_paragraph=args.sentences,
+                              claims=args.claims, seed=args.seed, sample_path=args.sample)
+    paths = generator.write_corpus(args.output_dir, args.num_docs)
+    total_bytes = sum(path.stat().st_size for path in paths)
+    print(f"{len(paths)}件を生成: {args.output_dir} ({total_bytes:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+エントリポイントの起動時間（インポート時間）のチェック
+
+重い依存ライブラリ（pandas・nltk・datasets・trl・torch 等）は使用時に読み込むため、
+各エントリポイントのインポート時点ではこれらが読み込まれないこと、
+および python -X importtime で計測したインポート時間が予算内であることを確認する。
+予算は環境変数 PATENT_IMPORT_BUDGET_MS で変更できる。
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+IMPORT_BUDGET_MS = float(os.environ.get("PATENT_IMPORT_BUDGET_MS", "400"))
+RUNS = 3
+
+HEAVY_MODULES = ('pandas', 'nltk', 'datasets', 'trl', 'torch', 'transformers', 'unsloth')
+
+# (インポート時の作業ディレクトリ, モジュール名)
+# training_utils 等は src をカレントにして `from config import Config` で読み込む前提のモジュール
+ENTRY_POINTS = [
+    ("src", "patent_processing"),
+    (".", "src.data_processing"),
+    (".", "src.inference_utils"),
+    ("src", "training_utils"),
+    ("src", "model_utils"),
+    ("scripts", "run_patent_processing"),
+]
+
+
+def _run_python(code: str, cwd: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=str(PROJECT_ROOT / cwd), capture_output=True, text=True, check=True,
+    )
+
+
+def _import_time_ms(module: str, cwd: str) -> float:
+    """-X importtime の出力から指定モジュールの累積インポート時間（ms）を取得"""
+    result = _run_python(f"import {module}", cwd, "-X", "importtime")
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000.0
+    raise AssertionError(f"importtime の出力に {module} がありません")
+
+
+def test_heavy_modules_not_loaded_for_japanese():
+    code = (
+        "import sys\n"
+        "from patent_processing import PatentTextProcessor\n"
+        "PatentTextProcessor(language='japanese')\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    loaded = _run_python(code, "src").stdout.strip()
+    assert loaded == "", f"起動時に読み込まれたモジュール: {loaded}"
+
+
+@pytest.mark.parametrize("cwd,module", ENTRY_POINTS, ids=[module for _, module in ENTRY_POINTS])
+def test_entry_point_does_not_load_heavy_modules(cwd, module):
+    code = (
+        "import sys\n"
+        f"import {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    loaded = _run_python(code, cwd).stdout.strip()
+    assert loaded == "", f"{module} のインポート時に読み込まれたモジュール: {loaded}"
+
+
+@pytest.mark.parametrize("cwd,module", ENTRY_POINTS, ids=[module for _, module in ENTRY_POINTS])
+def test_import_time_within_budget(cwd, module):
+    # 初回はバイトコード生成・ディスクキャッシュの影響を受けるため最小値で判定
+    elapsed_ms = min(_import_time_ms(module, cwd) for _ in range(RUNS))
+    assert elapsed_ms < IMPORT_BUDGET_MS, \
+        f"{module} のインポートに {elapsed_ms:.1f}ms（予算: {IMPORT_BUDGET_MS:.0f}ms）"
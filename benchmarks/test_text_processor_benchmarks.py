@@ -0,0 +1,132 @@
+"""
+PatentTextProcessor のホットパスのベンチマーク（pytest-benchmark）
+
+使用例:
+    pytest benchmarks/ --benchmark-autosave
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:10%
+    pytest benchmarks/ --st96-docs 200 --st96-paragraphs 200
+"""
+
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from st96_generator import ST96Generator
+
+pytest.importorskip("pytest_benchmark")
+
+# 段落数の多い明細書（実施形態が数千段落に及ぶ実データ相当）
+LARGE_DESCRIPTION_PARAGRAPHS = 3000
+
+
+@pytest.fixture(scope="module")
+def description_element(processor, xml_file):
+    """実施形態の要素（段落番号付き抽出の入力）"""
+    root = ET.parse(str(xml_file)).getroot()
+    return root.find('.//pat:EmbodimentDescription', processor.namespaces)
+
+
+@pytest.fixture(scope="module")
+def large_description_element(processor):
+    """数千段落の実施形態の要素"""
+    generator = ST96Generator(paragraphs=LARGE_DESCRIPTION_PARAGRAPHS)
+    root = ET.fromstring(generator.document(0))
+    return root.find('.//pat:EmbodimentDescription', processor.namespaces)
+
+
+@pytest.fixture(scope="module", params=["directory", "zip", "tar", "gztar"])
+def corpus_input(request, st96_corpus, tmp_path_factory):
+    """コーパスのディレクトリ、またはアーカイブ化したコーパス（展開せずに処理）"""
+    if request.param == "directory":
+        return st96_corpus
+    archive_dir = tmp_path_factory.mktemp(f"st96-{request.param}")
+    return shutil.make_archive(str(archive_dir / "JPB_2025_01発行分"), request.param, root_dir=st96_corpus)
+
+
+@pytest.fixture(scope="module")
+def raw_text(processor, patent_data):
+    """クリーニング前の結合テキスト"""
+    return processor._combine_text_sections(patent_data)
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_xml_file(benchmark, processor, xml_file):
+    result = benchmark(processor.parse_xml_file, str(xml_file))
+    assert result['patent_number']
+
+
+@pytest.mark.benchmark(group="parse-backend")
+@pytest.mark.parametrize("backend", ["etree", "lxml"])
+def test_parse_xml_file_backend(benchmark, backend, xml_file):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    from patent_processing.text_processor import PatentTextProcessor
+    backend_processor = PatentTextProcessor(language="japanese", xml_backend=backend)
+    result = benchmark(backend_processor.parse_xml_file, str(xml_file))
+    assert result['patent_number']
+
+
+@pytest.mark.benchmark(group="parse")
+def test_extract_text_with_paragraph_numbers(benchmark, processor, description_element):
+    text = benchmark(processor._extract_text_with_paragraph_numbers, description_element)
+    assert '【0010】' in text
+
+
+@pytest.mark.benchmark(group="parse")
+def test_extract_text_with_paragraph_numbers_large(benchmark, processor, large_description_element):
+    text = benchmark(processor._extract_text_with_paragraph_numbers, large_description_element)
+    assert text.count('\n\n') == LARGE_DESCRIPTION_PARAGRAPHS - 1
+
+
+@pytest.mark.benchmark(group="ingest")
+def test_process_xml_files_input(benchmark, processor, corpus_input, st96_corpus):
+    df = benchmark.pedantic(processor.process_xml_files, args=(str(corpus_input),), rounds=3)
+    assert len(df) == len(list(st96_corpus.glob("**/*.xml")))
+
+
+@pytest.mark.benchmark(group="clean")
+def test_protect_legal_expressions(benchmark, processor, raw_text):
+    protected_text, tokens = benchmark(processor.protect_legal_expressions, raw_text)
+    assert tokens
+
+
+@pytest.mark.benchmark(group="clean")
+def test_protect_chemical_formulas(benchmark, processor, raw_text):
+    protected_text, tokens = benchmark(processor.protect_chemical_formulas, raw_text)
+    assert tokens
+
+
+@pytest.mark.benchmark(group="clean")
+def test_enhanced_clean_text(benchmark, processor, raw_text):
+    cleaned = benchmark(processor.enhanced_clean_text, raw_text)
+    assert cleaned
+
+
+@pytest.mark.benchmark(group="validate")
+def test_validate_patent_data(benchmark, processor, patent_data):
+    result = benchmark(processor.validate_patent_data, patent_data)
+    assert 'quality_score' in result
+
+
+@pytest.mark.benchmark(group="export")
+def test_create_chatml_dataset(benchmark, processor, processed_df, tmp_path):
+    output_path = tmp_path / "chatml_training.json"
+    benchmark(processor.create_chatml_dataset, processed_df, str(output_path))
+    assert output_path.stat().st_size > 0
+
+
+@pytest.mark.benchmark(group="export")
+def test_export_to_json(benchmark, processor, processed_df, tmp_path):
+    output_path = tmp_path / "complete_dataset.json"
+    benchmark(processor.export_to_json, processed_df, str(output_path),
+              include_metadata=True, compact_format=False)
+    assert output_path.stat().st_size > 0
+
+
+@pytest.mark.benchmark(group="ingest")
+@pytest.mark.parametrize("prefetch", [0, 16])
+def test_process_xml_files_prefetch(benchmark, processor, st96_corpus, prefetch):
+    df = benchmark.pedantic(processor.process_xml_files, args=(str(st96_corpus),),
+                            kwargs={'prefetch': prefetch}, rounds=3)
+    assert len(df) == len(list(st96_corpus.glob("**/*.xml")))
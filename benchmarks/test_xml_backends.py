@@ -0,0 +1,42 @@
+"""
+XML解析バックエンド（lxml・標準ライブラリ）の出力一致の確認
+
+lxml がインストールされていない環境ではスキップする。
+"""
+
+import pytest
+
+pytest.importorskip("lxml")
+
+
+@pytest.fixture(scope="module")
+def backend_processors():
+    from patent_processing.text_processor import PatentTextProcessor
+    return {
+        backend: PatentTextProcessor(language="japanese", xml_backend=backend)
+        for backend in ("etree", "lxml")
+    }
+
+
+def test_backends_produce_identical_output(backend_processors, st96_corpus):
+    xml_files = sorted(st96_corpus.glob("**/*.xml"))
+    assert xml_files
+    for xml_file in xml_files:
+        etree_data = backend_processors["etree"].parse_xml_file(str(xml_file))
+        lxml_data = backend_processors["lxml"].parse_xml_file(str(xml_file))
+        assert etree_data == lxml_data, xml_file.name
+
+
+def test_backends_agree_on_sample_patent(backend_processors):
+    from st96_generator import DEFAULT_SAMPLE_PATH
+    if not DEFAULT_SAMPLE_PATH.exists():
+        pytest.skip("サンプルXMLがありません")
+    results = [processor.parse_xml_file(str(DEFAULT_SAMPLE_PATH)) for processor in backend_processors.values()]
+    assert results[0] == results[1]
+
+
+def test_backends_report_parse_errors(backend_processors, tmp_path):
+    broken = tmp_path / "broken.xml"
+    broken.write_text("<pat:Claims><unclosed>", encoding="utf-8")
+    for processor in backend_processors.values():
+        assert processor.parse_xml_file(str(broken)) == {}
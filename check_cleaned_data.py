@@ -7,6 +7,8 @@ import json
 import os
 from pathlib import Path
 
+from src.utils.json_stream import iter_json_records
+
 def check_cleaned_data():
     """クリーニング済みデータの内容を確認"""
     
@@ -29,14 +31,18 @@ def check_cleaned_data():
             continue
             
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 件数と先頭のサンプルのみ必要なため、全体を読み込まずに数える
+            sample = None
+            count = 0
+            for item in iter_json_records(filepath):
+                if sample is None:
+                    sample = item
+                count += 1
             
             print(f"\n📊 {filename}:")
-            print(f"  - データ数: {len(data):,}")
+            print(f"  - データ数: {count:,}")
             
-            if len(data) > 0:
-                sample = data[0]
+            if count > 0:
                 print(f"  - キー: {list(sample.keys())}")
                 
                 if 'text' in sample:
@@ -3,9 +3,10 @@
 データの整合性をチェックするスクリプト
 """
 
-import json
 from pathlib import Path
 
+from src.utils.json_stream import iter_json_records
+
 def check_data_consistency():
     """データの整合性をチェック"""
     
@@ -18,14 +19,11 @@ def check_data_consistency():
         print(f"❌ ファイルが見つかりません: {enhanced_path}")
         return
     
-    with open(enhanced_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"📊 総データ数: {len(data)}")
-    
-    # patent_idでグループ化
+    # patent_idでグループ化（全体を読み込まずに1件ずつ処理）
     patents_by_id = {}
-    for item in data:
+    total_count = 0
+    for item in iter_json_records(enhanced_path):
+        total_count += 1
         patent_id = item.get('patent_id', 'unknown')
         if patent_id not in patents_by_id:
             patents_by_id[patent_id] = {}
@@ -34,6 +32,7 @@ def check_data_consistency():
         text = item.get('text', '')
         patents_by_id[patent_id][section] = text
     
+    print(f"📊 総データ数: {total_count}")
     print(f"📋 特許数: {len(patents_by_id)}")
     
     # 各特許の内容をチェック
@@ -71,12 +70,9 @@ def check_data_consistency():
     
     chat_path = Path("data/chat_format/test_chat_enhanced.json")
     if chat_path.exists():
-        with open(chat_path, 'r', encoding='utf-8') as f:
-            chat_data = json.load(f)
-        
-        print(f"📊 Chat formatデータ数: {len(chat_data)}")
-        
-        for i, item in enumerate(chat_data):
+        chat_count = 0
+        for i, item in enumerate(iter_json_records(chat_path)):
+            chat_count += 1
             text = item.get('text', '')
             patent_id = item.get('patent_id', 'unknown')
             
@@ -101,6 +97,8 @@ def check_data_consistency():
                     print(f"   ⚠️  整合性問題: userとassistantの内容が一致しない可能性")
                 else:
                     print(f"   ✅ 整合性OK")
+        
+        print(f"\n📊 Chat formatデータ数: {chat_count}")
 
 def extract_keywords(text):
     """テキストからキーワードを抽出"""
@@ -3,9 +3,10 @@
 最終テスト結果を確認するスクリプト
 """
 
-import json
 from pathlib import Path
 
+from src.utils.json_stream import iter_json_records
+
 def check_final_results():
     """最終テスト結果の確認"""
     
@@ -19,13 +20,10 @@ def check_final_results():
         print("❌ Chat formatファイルが見つかりません")
         return
     
-    with open(chat_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"📊 生成されたペア数: {len(data)}")
-    print()
-    
-    for i, item in enumerate(data):
+    # ペアを1件ずつ読み込んで表示（件数は表示後に集計）
+    pair_count = 0
+    for i, item in enumerate(iter_json_records(chat_path)):
+        pair_count += 1
         print(f"=== ペア {i+1} ===")
         
         text = item.get('text', '')
@@ -49,6 +47,9 @@ def check_final_results():
         
         print()
     
+    print(f"📊 生成されたペア数: {pair_count}")
+    print()
+    
     # 修正前後の比較
     print("📈 修正前後の比較:")
     print("修正前:")
@@ -58,7 +59,7 @@ def check_final_results():
     print()
     print("修正後:")
     print(f"  - 特許数: 2件（正しく分離）")
-    print(f"  - 成功ペア: {len(data)}件")
+    print(f"  - 成功ペア: {pair_count}件")
     print("  - エラー: なし")
     print()
     
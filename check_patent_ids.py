@@ -3,10 +3,11 @@
 patent_idの問題を調査するスクリプト
 """
 
-import json
 from pathlib import Path
 from collections import Counter
 
+from src.utils.json_stream import iter_json_records
+
 def check_patent_ids():
     """patent_idの状況を詳しく調査"""
     
@@ -15,41 +16,43 @@ def check_patent_ids():
     
     # 元データを確認
     data_path = Path("data/cleaned/cleaned_patents_medium.json")
-    with open(data_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"📊 総データ数: {len(data)}")
     
-    # patent_idの分布を確認
-    patent_ids = []
-    for item in data:
+    # patent_idの分布を確認（全体を読み込まずに1件ずつ集計）
+    id_counter = Counter()
+    samples = []
+    total_count = 0
+    for item in iter_json_records(data_path):
+        total_count += 1
+        if len(samples) < 5:
+            samples.append(item)
         pid = item.get('patent_id', 'MISSING_KEY')
         if pid is None:
             pid = 'NULL_VALUE'
         elif pid == '':
             pid = 'EMPTY_STRING'
-        patent_ids.append(pid)
+        id_counter[pid] += 1
+    
+    print(f"📊 総データ数: {total_count}")
     
     # 頻度を確認
-    id_counter = Counter(patent_ids)
     print(f"\n📋 Patent ID分布:")
     for pid, count in id_counter.most_common(10):
         print(f"  '{pid}': {count}件")
     
     # サンプルデータの詳細確認
     print(f"\n🔍 最初の5件の詳細:")
-    for i, item in enumerate(data[:5]):
+    for i, item in enumerate(samples):
         print(f"\n{i+1}件目:")
         print(f"  patent_id: '{item.get('patent_id', 'MISSING')}'")
         print(f"  section: '{item.get('section', 'MISSING')}'")
         print(f"  text: '{item.get('text', 'MISSING')[:50]}...'")
     
     # 問題の分析
-    unique_ids = set(patent_ids)
+    unique_ids = set(id_counter)
     print(f"\n📈 統計:")
     print(f"  - ユニークpatent_id数: {len(unique_ids)}")
-    print(f"  - 総データ数: {len(data)}")
-    print(f"  - 平均セクション数/特許: {len(data) / len(unique_ids):.1f}")
+    print(f"  - 総データ数: {total_count}")
+    print(f"  - 平均セクション数/特許: {total_count / len(unique_ids):.1f}")
     
     if len(unique_ids) == 1:
         print(f"  ⚠️ 全てのデータが同じpatent_idを持っています: '{list(unique_ids)[0]}'")
@@ -72,25 +75,22 @@ def investigate_original_data():
         print("❌ sections_datasetが見つかりません")
         return
     
-    with open(sections_path, 'r', encoding='utf-8') as f:
-        sections_data = json.load(f)
-    
-    print(f"📊 Sectionsデータ数: {len(sections_data)}")
+    # patent_idの分布（全体を読み込まずに1件ずつ集計）
+    section_id_counter = Counter(item.get('patent_id', 'MISSING') for item in iter_json_records(sections_path))
+    sections_count = sum(section_id_counter.values())
     
-    # patent_idの分布
-    section_patent_ids = [item.get('patent_id', 'MISSING') for item in sections_data]
-    section_id_counter = Counter(section_patent_ids)
+    print(f"📊 Sectionsデータ数: {sections_count}")
     
     print(f"📋 Sections Patent ID分布 (上位10件):")
     for pid, count in section_id_counter.most_common(10):
         print(f"  '{pid}': {count}件")
     
     # 比較
-    unique_section_ids = set(section_patent_ids)
+    unique_section_ids = set(section_id_counter)
     print(f"\n📈 Sections統計:")
     print(f"  - ユニークpatent_id数: {len(unique_section_ids)}")
-    print(f"  - 総データ数: {len(sections_data)}")
-    print(f"  - 平均セクション数/特許: {len(sections_data) / len(unique_section_ids):.1f}")
+    print(f"  - 総データ数: {sections_count}")
+    print(f"  - 平均セクション数/特許: {sections_count / len(unique_section_ids):.1f}")
 
 if __name__ == "__main__":
     # patent_id問題の調査
@@ -1,138 +1,49 @@
 #!/usr/bin/env python3
 """Option 1: 段落単位データセット生成"""
 
-import json
-import re
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
 
-def split_into_paragraphs(text):
-    """段落番号【XXXX】でテキストを分割"""
-    if not text:
-        return []
-    
-    # 段落番号パターンで分割
-    paragraphs = re.split(r'(【\d{4}】)', text)
-    
-    result = []
-    current_paragraph = None
-    current_number = None
-    
-    for part in paragraphs:
-        if re.match(r'【\d{4}】', part):
-            # 前の段落を保存
-            if current_number and current_paragraph:
-                result.append({
-                    'number': current_number,
-                    'content': current_paragraph.strip()
-                })
-            
-            # 新しい段落番号
-            current_number = part
-            current_paragraph = ""
-        else:
-            # 段落内容
-            if current_number:
-                current_paragraph += part
-    
-    # 最後の段落を保存
-    if current_number and current_paragraph:
-        result.append({
-            'number': current_number,
-            'content': current_paragraph.strip()
-        })
-    
-    return result
+from src.config import Config
+from src.utils.json_stream import iter_json_records, first_json_record, JSONArrayWriter
+from src.patent_processing.dataset_builder import (DatasetBuilder, ParagraphUnitSink,
+                                                   build_paragraph_index, iter_chatml_documents)
 
-def create_option1_dataset(input_file, output_file, max_items=50):
+def create_option1_dataset(input_file, output_file, max_items=50, paragraph_index_path=None):
     """Option 1: 段落単位データセット生成"""
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        original_data = json.load(f)
-    
-    # 最初の50件のみ処理（テスト用）
-    original_data = original_data[:max_items]
+    # 入力は全体を読み込まずに1件ずつ処理する（数GBのファイルでもメモリ使用量は一定）
+    # 定型段落の検出（インデックスは全件で更新してから判定するため、先に1回走査する）
+    paragraph_index = None
+    if paragraph_index_path:
+        paragraph_index = build_paragraph_index(iter_chatml_documents(iter_json_records(input_file)),
+                                                paragraph_index_path)
     
-    option1_data = []
-    total_paragraphs = 0
+    # 各段落を個別のChatMLペアに変換（段落分割・書き出しは dataset_builder と共通）
+    sink = ParagraphUnitSink(JSONArrayWriter(output_file))
+    builder = DatasetBuilder([sink], paragraph_index=paragraph_index)
     
-    for item in original_data:
-        patent_id = item['metadata']['patent_id']
-        claims_count = item['metadata']['claims_count']
-        
-        # userとassistantメッセージを取得
-        user_content = None
-        assistant_content = None
-        
-        for msg in item['messages']:
-            if msg['role'] == 'user':
-                user_content = msg['content']
-            elif msg['role'] == 'assistant':
-                assistant_content = msg['content']
-        
-        if not user_content or not assistant_content:
-            continue
-        
-        # 請求項部分を抽出
-        claims_text = user_content.replace("以下の特許請求の範囲に基づいて、発明を実施するための形態を説明してください：\n\n", "")
-        
-        # assistant contentから段落を分割
-        # 【発明を実施するための形態】を除去
-        implementation_text = assistant_content.replace("【発明を実施するための形態】\n\n", "")
-        
-        paragraphs = split_into_paragraphs(implementation_text)
-        
-        if not paragraphs:
-            continue
-        
-        # 各段落を個別のChatMLペアに変換
-        for i, paragraph in enumerate(paragraphs):
-            # コンテキスト情報
-            context_info = f"特許番号: {patent_id}"
-            if i > 0:
-                # 前の段落の情報を含める
-                prev_paragraphs = paragraphs[:i]
-                prev_context = "\n".join([f"{p['number']}\n{p['content'][:100]}..." for p in prev_paragraphs])
-                context_info += f"\n\n前の段落:\n{prev_context}"
-            
-            paragraph_record = {
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "あなたは特許文書の専門家です。与えられた特許請求の範囲と文脈に基づいて、指定された段落番号の実施形態を生成してください。"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{context_info}\n\n【請求項】\n{claims_text}\n\n上記に基づいて{paragraph['number']}の段落を生成してください。"
-                    },
-                    {
-                        "role": "assistant",
-                        "content": f"{paragraph['number']}\n{paragraph['content']}"
-                    }
-                ],
-                "metadata": {
-                    "patent_id": patent_id,
-                    "paragraph_number": paragraph['number'],
-                    "paragraph_index": i,
-                    "total_paragraphs": len(paragraphs),
-                    "claims_count": claims_count,
-                    "dataset_type": "option1_paragraph_unit",
-                    "created_at": datetime.now().isoformat()
-                }
-            }
-            
-            option1_data.append(paragraph_record)
-            total_paragraphs += 1
+    # 先頭 max_items 件のみ処理（Noneの場合は全件）
+    builder.build(iter_chatml_documents(islice(iter_json_records(input_file), max_items)))
     
-    # JSON出力
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(option1_data, f, ensure_ascii=False, indent=2)
+    if paragraph_index is not None:
+        print(f"  除外した定型段落: {builder.boilerplate_count}段落（出現文書数 {paragraph_index.threshold} 以上）")
     
-    return len(option1_data), total_paragraphs
+    # 1段落 = 1件のため、生成データ数が総段落数になる
+    return sink.count
 
 # メイン処理
 input_file = "/mnt/d/20250728/01tuning/data/processed/chatml_training_with_paragraphs_full.json"
 output_file = "/mnt/d/20250728/01tuning/data/processed/option1_paragraph_unit.json"
+paragraph_index_path = "/mnt/d/20250728/01tuning/data/processed/paragraph_frequency_index.json"
+
+# 処理件数は設定ファイルの performance.max_items に従う
+config = Config.load_from_yaml(str(Path(__file__).parent / "configs" / "patent_config.yaml"))
+max_items = config.performance.max_items if config.performance else 50
+
+# 定型段落の除外は preprocessing.strip_boilerplate が true の場合のみ（既定は除外しない）
+if not (config.preprocessing and config.preprocessing.strip_boilerplate):
+    paragraph_index_path = None
 
 print("Option 1: 段落単位データセット生成")
 print("=" * 80)
@@ -142,19 +53,17 @@ if not Path(input_file).exists():
     print("❌ 入力ファイルが見つかりません")
     exit(1)
 
-dataset_count, paragraph_count = create_option1_dataset(input_file, output_file)
+dataset_count = create_option1_dataset(input_file, output_file, max_items=max_items,
+                                       paragraph_index_path=paragraph_index_path)
 
 print(f"✅ Option 1データセット生成完了")
 print(f"  出力ファイル: {Path(output_file).name}")
-print(f"  生成データ数: {dataset_count}件")
-print(f"  総段落数: {paragraph_count}段落")
+print(f"  生成データ数: {dataset_count}件（1段落 = 1件）")
 
-# サンプル確認
-with open(output_file, 'r', encoding='utf-8') as f:
-    sample_data = json.load(f)
+# サンプル確認（先頭の1件のみ読み込む）
+first_sample = first_json_record(output_file)
 
-if sample_data:
-    first_sample = sample_data[0]
+if first_sample:
     print(f"\n📋 サンプル確認:")
     print(f"  特許ID: {first_sample['metadata']['patent_id']}")
     print(f"  段落番号: {first_sample['metadata']['paragraph_number']}")
@@ -9,17 +9,79 @@ import re
 import os
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from contextlib import ExitStack
+from typing import List, Dict, Any, Iterator, Optional
 import logging
 
+# プロジェクトルートをパスに追加（共通のJSON読み込み・切り詰めを使用）
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import Config, PreprocessingConfig
+from src.utils.json_stream import iter_json_records, JSONArrayWriter
+from src.utils.truncation import truncate_text
+
 # ログ設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 設定ファイルに preprocessing がない場合の既定値（text は800文字で切り詰め、50文字未満は除外）
+DEFAULT_PREPROCESSING = {'max_text_length': 800, 'min_text_length': 49}
+
+class CleaningStats:
+    """クリーニング前後の件数・テキスト長の集計（データを保持せずに逐次集計）"""
+    
+    def __init__(self):
+        self.original_count = 0
+        self.original_total_length = 0
+        self.cleaned_count = 0
+        self.cleaned_total_length = 0
+        self.max_length = 0
+        self.min_length = float('inf')
+    
+    @staticmethod
+    def _text_length(item: Any) -> int:
+        return len(str(item.get('text', ''))) if isinstance(item, dict) else 0
+    
+    def add_original(self, item: Any):
+        """元データ1件を集計"""
+        self.original_count += 1
+        self.original_total_length += self._text_length(item)
+    
+    def add_cleaned(self, item: Dict[str, Any]):
+        """クリーニング後のデータ1件を集計"""
+        length = self._text_length(item)
+        self.cleaned_count += 1
+        self.cleaned_total_length += length
+        self.max_length = max(self.max_length, length)
+        self.min_length = min(self.min_length, length)
+    
+    def to_dict(self) -> Dict:
+        """統計情報を生成"""
+        return {
+            "processing_summary": {
+                "original_count": self.original_count,
+                "cleaned_count": self.cleaned_count,
+                "retention_rate": self.cleaned_count / self.original_count * 100 if self.original_count else 0
+            },
+            "text_length_stats": {
+                "original_avg_length": self.original_total_length / self.original_count if self.original_count else 0,
+                "cleaned_avg_length": self.cleaned_total_length / self.cleaned_count if self.cleaned_count else 0,
+                "max_length": self.max_length,
+                "min_length": self.min_length
+            }
+        }
+
 class PatentDataCleaner:
     """特許データクリーニングクラス"""
     
-    def __init__(self):
+    def __init__(self, config_path: Optional[Path] = None):
+        """
+        初期化
+        
+        Args:
+            config_path: 設定ファイルのパス（Noneの場合は configs/patent_config.yaml）。
+                         preprocessing セクションの文字数制限・除去パターンを使用する
+        """
         self.project_root = Path(__file__).parent.parent
         self.data_dir = self.project_root / "data" / "processed"
         self.output_dir = self.project_root / "data" / "cleaned"
@@ -27,6 +89,29 @@ class PatentDataCleaner:
         # 出力ディレクトリを作成
         self.output_dir.mkdir(exist_ok=True)
         
+        self.preprocessing = self.load_preprocessing(config_path or self.project_root / "configs" / "patent_config.yaml")
+        self._remove_patterns = [re.compile(pattern) for pattern in self.preprocessing.remove_patterns]
+        
+    @staticmethod
+    def load_preprocessing(config_path: Path) -> PreprocessingConfig:
+        """
+        設定ファイルの preprocessing セクションを取得
+        
+        Args:
+            config_path: 設定ファイルのパス
+            
+        Returns:
+            前処理設定（設定ファイル・セクションがない場合は DEFAULT_PREPROCESSING）
+        """
+        preprocessing = None
+        if Path(config_path).exists():
+            preprocessing = Config.load_from_yaml(str(config_path)).preprocessing
+        if preprocessing is None:
+            preprocessing = PreprocessingConfig(**DEFAULT_PREPROCESSING)
+        logger.info(f"前処理設定: 最大{preprocessing.max_text_length}文字, 最小{preprocessing.min_text_length}文字超, "
+                    f"除去パターン{len(preprocessing.remove_patterns)}件")
+        return preprocessing
+        
     def clean_patent_text(self, text: str) -> str:
         """特許テキストのクリーニング"""
         if not isinstance(text, str):
@@ -50,6 +135,10 @@ class PatentDataCleaner:
         for pattern in patterns_to_remove:
             text = re.sub(pattern, '', text)
         
+        # 設定ファイル（preprocessing.remove_patterns）の除去パターン
+        for pattern in self._remove_patterns:
+            text = pattern.sub('', text)
+        
         # 連続する同じ文字を除去（3文字以上）
         text = re.sub(r'(.)\1{2,}', r'\1\1', text)
         
@@ -67,25 +156,8 @@ class PatentDataCleaner:
         
     def limit_text_length(self, text: str, max_length: int = 1000) -> str:
         """テキスト長を制限"""
-        if len(text) <= max_length:
-            return text
-            
-        # 文の区切りで切る
-        sentences = text.split('。')
-        result = ""
-        
-        for sentence in sentences:
-            potential_result = result + sentence + '。'
-            if len(potential_result) <= max_length:
-                result = potential_result
-            else:
-                break
-                
-        # 文での区切りで何も残らない場合は、強制的に切る
-        if not result:
-            result = text[:max_length] + "..."
-            
-        return result
+        # 文の区切りで切る（文での区切りで何も残らない場合は、"..." を含めて上限内に強制的に切る）
+        return truncate_text(text, max_length, ellipsis="...")
         
     def process_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """個別アイテムの処理"""
@@ -98,15 +170,16 @@ class PatentDataCleaner:
             if key == 'text' and isinstance(value, str):
                 # メインテキストフィールドの処理
                 cleaned_text = self.clean_patent_text(value)
-                cleaned_text = self.limit_text_length(cleaned_text, 800)
+                cleaned_text = self.limit_text_length(cleaned_text, self.preprocessing.max_text_length)
                 cleaned_item[key] = cleaned_text
                 
             elif isinstance(value, str):
                 # その他の文字列フィールドの軽度クリーニング
                 cleaned_value = self.clean_patent_text(value)
                 # 長すぎる場合は制限
-                if len(cleaned_value) > 500:
-                    cleaned_value = cleaned_value[:500] + "..."
+                max_field_length = self.preprocessing.max_field_length
+                if len(cleaned_value) > max_field_length:
+                    cleaned_value = cleaned_value[:max_field_length] + "..."
                 cleaned_item[key] = cleaned_value
                 
             elif isinstance(value, list):
@@ -115,8 +188,9 @@ class PatentDataCleaner:
                 for list_item in value:
                     if isinstance(list_item, str):
                         cleaned_list_item = self.clean_patent_text(list_item)
-                        if len(cleaned_list_item) > 300:
-                            cleaned_list_item = cleaned_list_item[:300] + "..."
+                        max_item_length = self.preprocessing.max_list_item_length
+                        if len(cleaned_list_item) > max_item_length:
+                            cleaned_list_item = cleaned_list_item[:max_item_length] + "..."
                         cleaned_list.append(cleaned_list_item)
                     else:
                         cleaned_list.append(list_item)
@@ -128,57 +202,53 @@ class PatentDataCleaner:
         
         # 有効性チェック
         text_field = cleaned_item.get('text', '')
-        if len(text_field) < 50:  # 最小長チェック
+        if len(text_field) <= self.preprocessing.min_text_length:  # 最小長チェック
             return None
             
         return cleaned_item
         
-    def load_and_clean_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        """ファイルを読み込んでクリーニング"""
+    def iter_cleaned_items(self, file_path: Path, stats: Optional['CleaningStats'] = None) -> Iterator[Dict[str, Any]]:
+        """
+        ファイルを1件ずつ読み込みながらクリーニング（ファイル全体をメモリに読み込まない）
+        
+        Args:
+            file_path: 入力JSON/JSONLファイル
+            stats: 元データ・クリーニング後データの件数とテキスト長を集計するオブジェクト
+            
+        Yields:
+            クリーニング済みアイテム（読み込みに失敗した場合はその時点で終了）
+        """
         logger.info(f"ファイル処理開始: {file_path}")
+        stats = stats or CleaningStats()
         
         try:
-            # 複数のエンコーディングを試行
-            encodings = ['utf-8', 'utf-8-sig', 'cp932', 'shift_jis']
-            data = None
-            
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        data = json.load(f)
-                    logger.info(f"エンコーディング成功: {encoding}")
-                    break
-                except (UnicodeDecodeError, json.JSONDecodeError):
-                    continue
-            
-            if data is None:
-                logger.error(f"ファイル読み込み失敗: {file_path}")
-                return []
-            
-            # データ形式の正規化
-            if not isinstance(data, list):
-                data = [data]
-                
-            logger.info(f"読み込みデータ数: {len(data)}")
-            
-            # クリーニング処理
-            cleaned_data = []
-            for i, item in enumerate(data):
+            # 先頭部分からエンコーディング（BOM・UTF-8・CP932）を判定して1回だけ読み込む
+            for i, item in enumerate(iter_json_records(file_path)):
+                stats.add_original(item)
                 try:
                     cleaned_item = self.process_item(item)
-                    if cleaned_item:
-                        cleaned_data.append(cleaned_item)
-                    
-                    if (i + 1) % 100 == 0:
-                        logger.info(f"処理進捗: {i + 1}/{len(data)}")
-                        
                 except Exception as e:
                     logger.warning(f"アイテム {i} の処理でエラー: {e}")
                     continue
-            
-            logger.info(f"クリーニング完了: {len(cleaned_data)}/{len(data)} 件の有効データ")
-            return cleaned_data
-            
+                
+                if cleaned_item:
+                    stats.add_cleaned(cleaned_item)
+                    yield cleaned_item
+                
+                if (i + 1) % 100 == 0:
+                    logger.info(f"処理進捗: {i + 1}件")
+                    
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            logger.error(f"ファイル読み込み失敗: {file_path} ({e})")
+            return
+        
+        logger.info(f"読み込みデータ数: {stats.original_count}")
+        logger.info(f"クリーニング完了: {stats.cleaned_count}/{stats.original_count} 件の有効データ")
+        
+    def load_and_clean_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """ファイルを読み込んでクリーニング"""
+        try:
+            return list(self.iter_cleaned_items(file_path))
         except Exception as e:
             logger.error(f"ファイル処理エラー: {e}")
             return []
@@ -188,47 +258,21 @@ class PatentDataCleaner:
         output_path = self.output_dir / output_filename
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"保存完了: {output_path}")
-            logger.info(f"保存データ数: {len(data)}")
-            
-            # ファイルサイズ表示
-            file_size = output_path.stat().st_size / (1024 * 1024)
-            logger.info(f"ファイルサイズ: {file_size:.2f} MB")
+            with JSONArrayWriter(output_path) as writer:
+                writer.write_all(data)
+            self._log_saved(writer)
             
         except Exception as e:
             logger.error(f"保存エラー: {e}")
     
-    def generate_statistics(self, original_data: List[Dict], cleaned_data: List[Dict]) -> Dict:
-        """統計情報を生成"""
-        stats = {
-            "processing_summary": {
-                "original_count": len(original_data),
-                "cleaned_count": len(cleaned_data),
-                "retention_rate": len(cleaned_data) / len(original_data) * 100 if original_data else 0
-            },
-            "text_length_stats": {
-                "original_avg_length": 0,
-                "cleaned_avg_length": 0,
-                "max_length": 0,
-                "min_length": float('inf')
-            }
-        }
-        
-        # テキスト長統計
-        if original_data:
-            original_lengths = [len(str(item.get('text', ''))) for item in original_data]
-            stats["text_length_stats"]["original_avg_length"] = sum(original_lengths) / len(original_lengths)
+    def _log_saved(self, writer: JSONArrayWriter):
+        """保存結果（件数・ファイルサイズ）を表示"""
+        logger.info(f"保存完了: {writer.path}")
+        logger.info(f"保存データ数: {writer.count}")
         
-        if cleaned_data:
-            cleaned_lengths = [len(str(item.get('text', ''))) for item in cleaned_data]
-            stats["text_length_stats"]["cleaned_avg_length"] = sum(cleaned_lengths) / len(cleaned_lengths)
-            stats["text_length_stats"]["max_length"] = max(cleaned_lengths)
-            stats["text_length_stats"]["min_length"] = min(cleaned_lengths)
-        
-        return stats
+        # ファイルサイズ表示
+        file_size = writer.path.stat().st_size / (1024 * 1024)
+        logger.info(f"ファイルサイズ: {file_size:.2f} MB")
     
     def run_cleaning(self):
         """メインクリーニング処理"""
@@ -247,46 +291,55 @@ class PatentDataCleaner:
         for file_path in json_files:
             logger.info(f"  - {file_path.name}")
         
-        # 各ファイルを処理
-        all_cleaned_data = []
+        # 各ファイルを処理（1件ずつクリーニングして各出力ファイルへ逐次書き出し、全件をメモリに保持しない）
         all_stats = {}
+        sample = None
+        # 統合データセット・学習用小データセット（最初の50件）・中サイズデータセット（最初の200件）
+        combined_outputs = [
+            ("cleaned_all_patents.json", None),
+            ("cleaned_patents_small.json", 50),
+            ("cleaned_patents_medium.json", 200),
+        ]
         
-        for file_path in json_files:
-            # 元データを保持（統計用）
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    original_data = json.load(f)
-                if not isinstance(original_data, list):
-                    original_data = [original_data]
-            except:
-                original_data = []
-            
-            # クリーニング実行
-            cleaned_data = self.load_and_clean_file(file_path)
+        with ExitStack() as stack:
+            combined_writers = []
             
-            if cleaned_data:
-                # ファイル別保存
-                output_filename = f"cleaned_{file_path.name}"
-                self.save_cleaned_data(cleaned_data, output_filename)
+            for file_path in json_files:
+                stats = CleaningStats()
+                file_writer = None
                 
-                # 統計生成
-                stats = self.generate_statistics(original_data, cleaned_data)
-                all_stats[file_path.name] = stats
+                try:
+                    for cleaned_item in self.iter_cleaned_items(file_path, stats):
+                        if file_writer is None:
+                            # ファイル別保存（有効データがある場合のみ作成）
+                            file_writer = stack.enter_context(
+                                JSONArrayWriter(self.output_dir / f"cleaned_{file_path.name}"))
+                        if not combined_writers:
+                            combined_writers = [
+                                (stack.enter_context(JSONArrayWriter(self.output_dir / filename)), limit)
+                                for filename, limit in combined_outputs
+                            ]
+                            sample = cleaned_item
+                        
+                        file_writer.write(cleaned_item)
+                        # 全体データに追加
+                        for writer, limit in combined_writers:
+                            if limit is None or writer.count < limit:
+                                writer.write(cleaned_item)
+                except Exception as e:
+                    logger.error(f"ファイル処理エラー: {e}")
                 
-                # 全体データに追加
-                all_cleaned_data.extend(cleaned_data)
-        
-        # 統合データセット保存
-        if all_cleaned_data:
-            self.save_cleaned_data(all_cleaned_data, "cleaned_all_patents.json")
+                if file_writer is not None:
+                    file_writer.close()
+                    self._log_saved(file_writer)
+                    # 統計生成
+                    all_stats[file_path.name] = stats.to_dict()
             
-            # 学習用小データセット作成（最初の50件）
-            small_dataset = all_cleaned_data[:50]
-            self.save_cleaned_data(small_dataset, "cleaned_patents_small.json")
-            
-            # 中サイズデータセット（最初の200件）
-            medium_dataset = all_cleaned_data[:200]
-            self.save_cleaned_data(medium_dataset, "cleaned_patents_medium.json")
+            for writer, _ in combined_writers:
+                writer.close()
+                self._log_saved(writer)
+        
+        total_count = combined_writers[0][0].count if combined_writers else 0
         
         # 統計情報を保存
         stats_path = self.output_dir / "cleaning_stats.json"
@@ -296,12 +349,11 @@ class PatentDataCleaner:
         logger.info("=" * 60)
         logger.info("データクリーニング完了")
         logger.info(f"出力ディレクトリ: {self.output_dir}")
-        logger.info(f"統合データ数: {len(all_cleaned_data)}")
+        logger.info(f"統合データ数: {total_count}")
         logger.info("=" * 60)
         
         # サマリー表示
-        if all_cleaned_data:
-            sample = all_cleaned_data[0]
+        if sample is not None:
             logger.info("📊 サンプルデータ:")
             logger.info(f"  キー: {list(sample.keys())}")
             if 'text' in sample:
@@ -4,12 +4,20 @@
 請求項 → user、実施形態 → assistant の対話形式に変換
 """
 
-import json
+import sys
+import math
 import re
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
 
+# プロジェクトルートをパスに追加（共通のJSON読み込み・切り詰め・設定を使用）
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.json_stream import iter_json_records, JSONArrayWriter
+from src.utils.truncation import truncate_blocks
+
 # ログ設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,6 +26,7 @@ logger = logging.getLogger(__name__)
 # セクション検索の優先順位
 CLAIMS_SECTIONS = ['claims', 'claim']  # 請求項セクション（厳密）
 EMBODIMENT_SECTIONS = ['detailed_description', 'embodiment']  # 実施形態セクション（厳密）
+PAIR_SECTIONS = frozenset(CLAIMS_SECTIONS + EMBODIMENT_SECTIONS)  # ペア作成に使用するセクション
 
 # テキスト長制限
 MAX_CLAIMS_LENGTH = 500      # 請求項の最大文字数
@@ -29,15 +38,33 @@ MIN_EMBODIMENT_LENGTH = 100  # 実施形態の最小文字数
 SYSTEM_PROMPT = """あなたは特許の専門家です。請求項から具体的な実施形態を説明してください。"""
 
 # 特許文書マーカーのパターン
-PATENT_MARKER_PATTERN = r'【[^】]*】'  # 【課題】【解決手段】等の一般マーカー
 PATENT_PARAGRAPH_PATTERN = r'【\d{4}】'  # 【0010】【0011】等の段落番号
-PATENT_SECTION_PATTERN = r'【[^】\d][^】]*】'  # 【発明を実施する形態】等のセクション名（数字以外で始まる）
-PATENT_ALL_PATTERN = r'【[^】]*】'  # 全ての【】パターン（統合）
+
+# 前処理で使用するパターン（事前コンパイル）
+_WHITESPACE_RE = re.compile(r'\s+')
+_CLAIM_MARKER_RE = re.compile(r'【請求項\d+】')
+_PARAGRAPH_RE = re.compile(PATENT_PARAGRAPH_PATTERN)
+
 
 class PatentChatFormatter:
     """特許データをchat形式に変換するクラス"""
     
-    def __init__(self):
+    def __init__(self, max_claims_length: int = MAX_CLAIMS_LENGTH,
+                 max_embodiment_length: int = MAX_EMBODIMENT_LENGTH,
+                 num_workers: int = 1, batch_size: int = 1000):
+        """
+        初期化
+        
+        Args:
+            max_claims_length: 請求項の最大文字数
+            max_embodiment_length: 実施形態の最大文字数
+            num_workers: ペア作成（請求項・実施形態の前処理）の並列プロセス数（1の場合は逐次処理）
+            batch_size: 並列処理で1ワーカーに渡す特許数の上限
+        """
+        self.max_claims_length = max_claims_length
+        self.max_embodiment_length = max_embodiment_length
+        self.num_workers = num_workers
+        self.batch_size = batch_size
         self.project_root = Path(__file__).parent.parent
         self.cleaned_dir = self.project_root / "data" / "cleaned"
         self.chat_dir = self.project_root / "data" / "chat_format"
@@ -45,34 +72,124 @@ class PatentChatFormatter:
         # 出力ディレクトリを作成
         self.chat_dir.mkdir(exist_ok=True)
         
-    def extract_claims_and_implementations(self, data: List[Dict]) -> List[Dict]:
+    def group_sections(self, data: Iterable[Dict]) -> Dict[str, Dict[str, str]]:
         """
-        特許データから請求項と実施形態のペアを抽出
+        セクション単位のデータを patent_id ごとにグループ化
         
-        ロジック詳細:
-        1. patent_idごとにセクションをグループ化
-        2. 請求項セクションを厳密に検索: claims > claim （abstractは除外）
-        3. 実施形態セクションを厳密に検索: detailed_description > embodiment （他は除外）
-        4. 両方が存在し、かつ最低文字数を満たす場合のみペア作成
-        5. 請求項→実施形態の生成に必要なセクションのみを使用
-        """
+        data は1回だけ順に走査し、請求項・実施形態以外のセクションのテキストは保持しない。
         
-        # patent_idごとにグループ化
+        Args:
+            data: セクション単位のレコード（patent_id・section・text）
+            
+        Returns:
+            patent_id → {セクション名: テキスト}（入力に現れた順）
+        """
         patents_by_id = {}
+        input_count = 0
         for item in data:
+            input_count += 1
             patent_id = item.get('patent_id', 'unknown')
             if patent_id not in patents_by_id:
                 patents_by_id[patent_id] = {}
             
             section = item.get('section', 'unknown')
+            if section not in PAIR_SECTIONS:
+                # ペア作成に使用しないセクションはテキストを保持しない
+                continue
             text = item.get('text', '')
             
             patents_by_id[patent_id][section] = text
         
+        logger.info(f"入力データ数: {input_count}")
         logger.info(f"グループ化完了: {len(patents_by_id)}件の特許")
+        return patents_by_id
+    
+    def build_pair(self, patent: Tuple[str, Dict[str, str]]) -> Tuple[str, Optional[Dict]]:
+        """
+        1特許分の請求項と実施形態のペアを作成
+        
+        Args:
+            patent: (patent_id, {セクション名: テキスト}) の組
+            
+        Returns:
+            (統計キー, ペア) の組（ペアを作成できない場合はペアがNone）
+        """
+        patent_id, sections = patent
+        # 利用可能なセクションをチェック
+        logger.debug(f"Patent {patent_id}: {list(sections.keys())}")
+        
+        # 請求項セクションを厳密に検索（定数使用）
+        claims_section = None
+        claims_text = ""
+        
+        for section_name in CLAIMS_SECTIONS:
+            if section_name in sections and sections[section_name].strip():
+                claims_section = section_name
+                claims_text = sections[section_name]
+                logger.debug(f"請求項セクション採用: {patent_id} - {section_name}")
+                break
+        
+        # 実施形態セクションを厳密に検索（定数使用）
+        implementation_section = None
+        implementation_text = ""
+        
+        for section_name in EMBODIMENT_SECTIONS:
+            if section_name in sections and sections[section_name].strip():
+                implementation_section = section_name
+                implementation_text = sections[section_name]
+                logger.debug(f"実施形態セクション採用: {patent_id} - {section_name}")
+                break
+        
+        # ペア作成の判定
+        if not claims_text:
+            logger.debug(f"請求項なしでスキップ: {patent_id}")
+            return 'no_claims', None
+            
+        if not implementation_text:
+            logger.debug(f"実施形態なしでスキップ: {patent_id}")
+            return 'no_implementation', None
+        
+        # テキストの前処理（文字数制限対応）
+        claims_text = self.preprocess_claims(claims_text)
+        implementation_text = self.preprocess_implementation(implementation_text)
+        
+        # 最低長チェック（前処理後、定数使用）
+        if len(claims_text) < MIN_CLAIMS_LENGTH or len(implementation_text) < MIN_EMBODIMENT_LENGTH:
+            logger.debug(f"テキスト長不足でスキップ: {patent_id} (claims:{len(claims_text)}, impl:{len(implementation_text)})")
+            return 'too_short', None
+        
+        logger.debug(f"ペア作成成功: {patent_id}")
+        return 'success', {
+            'patent_id': patent_id,
+            'claims_section': claims_section,
+            'implementation_section': implementation_section,
+            'user_message': claims_text,
+            'assistant_message': implementation_text
+        }
+    
+    def _map_build_pair(self, patents: Dict[str, Dict[str, str]]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """各特許の build_pair を実行（num_workers > 1 の場合はプロセスプールでバッチ単位に並列実行、入力順を保持）"""
+        if self.num_workers <= 1 or len(patents) <= 1:
+            yield from map(self.build_pair, patents.items())
+            return
+        
+        from concurrent.futures import ProcessPoolExecutor
         
-        # 請求項と実施形態のペアを作成
-        chat_pairs = []
+        # ワーカーごとに複数バッチが行き渡るようにバッチサイズを調整（上限は batch_size）
+        chunksize = max(1, min(self.batch_size, math.ceil(len(patents) / (self.num_workers * 4))))
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            yield from executor.map(self.build_pair, patents.items(), chunksize=chunksize)
+    
+    def iter_chat_pairs(self, patents_by_id: Dict[str, Dict[str, str]]) -> Iterator[Dict]:
+        """
+        グループ化済みの特許から請求項と実施形態のペアを順に作成
+        
+        Args:
+            patents_by_id: group_sections の戻り値
+            
+        Yields:
+            ペア（patent_id・claims_section・implementation_section・user_message・assistant_message）
+        """
         skipped_stats = {
             'no_claims': 0,
             'no_implementation': 0, 
@@ -80,62 +197,10 @@ class PatentChatFormatter:
             'success': 0
         }
         
-        for patent_id, sections in patents_by_id.items():
-            # 利用可能なセクションをチェック
-            available_sections = list(sections.keys())
-            logger.debug(f"Patent {patent_id}: {available_sections}")
-            
-            # 請求項セクションを厳密に検索（定数使用）
-            claims_section = None
-            claims_text = ""
-            
-            for section_name in CLAIMS_SECTIONS:
-                if section_name in sections and sections[section_name].strip():
-                    claims_section = section_name
-                    claims_text = sections[section_name]
-                    logger.debug(f"請求項セクション採用: {patent_id} - {section_name}")
-                    break
-            
-            # 実施形態セクションを厳密に検索（定数使用）
-            implementation_section = None
-            implementation_text = ""
-            
-            for section_name in EMBODIMENT_SECTIONS:
-                if section_name in sections and sections[section_name].strip():
-                    implementation_section = section_name
-                    implementation_text = sections[section_name]
-                    logger.debug(f"実施形態セクション採用: {patent_id} - {section_name}")
-                    break
-            
-            # ペア作成の判定
-            if not claims_text:
-                skipped_stats['no_claims'] += 1
-                logger.debug(f"請求項なしでスキップ: {patent_id}")
-                continue
-                
-            if not implementation_text:
-                skipped_stats['no_implementation'] += 1  
-                logger.debug(f"実施形態なしでスキップ: {patent_id}")
-                continue
-            
-            # テキストの前処理（文字数制限対応）
-            claims_text = self.preprocess_claims(claims_text)
-            implementation_text = self.preprocess_implementation(implementation_text)
-            
-            # 最低長チェック（前処理後、定数使用）
-            if len(claims_text) >= MIN_CLAIMS_LENGTH and len(implementation_text) >= MIN_EMBODIMENT_LENGTH:
-                chat_pairs.append({
-                    'patent_id': patent_id,
-                    'claims_section': claims_section,
-                    'implementation_section': implementation_section,
-                    'user_message': claims_text,
-                    'assistant_message': implementation_text
-                })
-                skipped_stats['success'] += 1
-                logger.debug(f"ペア作成成功: {patent_id}")
-            else:
-                skipped_stats['too_short'] += 1
-                logger.debug(f"テキスト長不足でスキップ: {patent_id} (claims:{len(claims_text)}, impl:{len(implementation_text)})")
+        for status, pair in self._map_build_pair(patents_by_id):
+            skipped_stats[status] += 1
+            if pair is not None:
+                yield pair
         
         # 統計情報を出力
         logger.info(f"ペア作成統計:")
@@ -143,8 +208,20 @@ class PatentChatFormatter:
         logger.info(f"  - 請求項なし: {skipped_stats['no_claims']}")
         logger.info(f"  - 実施形態なし: {skipped_stats['no_implementation']}")
         logger.info(f"  - 文字数不足: {skipped_stats['too_short']}")
-        logger.info(f"抽出されたペア数: {len(chat_pairs)}")
-        return chat_pairs
+        logger.info(f"抽出されたペア数: {skipped_stats['success']}")
+    
+    def extract_claims_and_implementations(self, data: Iterable[Dict]) -> List[Dict]:
+        """
+        特許データから請求項と実施形態のペアを抽出
+        
+        ロジック詳細:
+        1. patent_idごとにセクションをグループ化（group_sections）
+        2. 請求項セクションを厳密に検索: claims > claim （abstractは除外）
+        3. 実施形態セクションを厳密に検索: detailed_description > embodiment （他は除外）
+        4. 両方が存在し、かつ最低文字数を満たす場合のみペア作成
+        5. 請求項→実施形態の生成に必要なセクションのみを使用
+        """
+        return list(self.iter_chat_pairs(self.group_sections(data)))
     
     def preprocess_claims(self, text: str) -> str:
         """
@@ -159,64 +236,16 @@ class PatentChatFormatter:
             return ""
         
         # 余分な空白を除去
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         text = text.strip()
         
-        # 文字数制限（定数使用）
-        if len(text) <= MAX_CLAIMS_LENGTH:
+        # 文字数制限
+        if len(text) <= self.max_claims_length:
             return text
         
-        # 【請求項1】【請求項2】等で分割
-        claims_pattern = r'【請求項\d+】'
-        claims_blocks = re.split(claims_pattern, text)
-        claims_markers = re.findall(claims_pattern, text)
-        
-        result = ""
-        
-        # 各請求項を順次追加
-        for i, block in enumerate(claims_blocks):
-            if not block.strip():
-                continue
-                
-            # 請求項番号がある場合は追加
-            claim_marker = claims_markers[i-1] if i > 0 and i-1 < len(claims_markers) else ""
-            potential_claim = claim_marker + block.strip()
-            potential_result = result + potential_claim
-            
-            if len(potential_result) <= MAX_CLAIMS_LENGTH:
-                result = potential_result
-            else:
-                # 現在の結果が空でない場合はそれを使用
-                if result:
-                    break
-                # 結果が空の場合は最初の請求項だけでも強制的に含める
-                else:
-                    result = potential_claim[:MAX_CLAIMS_LENGTH-3] + '...'
-                    break
-        
-        # まだ結果が空の場合（安全策: 請求項パターンで分割できない場合）
-        if not result:
-            # 一般的な【****】パターンで分割を試行
-            general_blocks = re.split(PATENT_ALL_PATTERN, text)
-            general_markers = re.findall(PATENT_ALL_PATTERN, text)
-            
-            for i, block in enumerate(general_blocks):
-                if not block.strip():
-                    continue
-                    
-                marker = general_markers[i-1] if i > 0 and i-1 < len(general_markers) else ""
-                potential_block = marker + block.strip()
-                
-                if len(potential_block) <= MAX_CLAIMS_LENGTH:
-                    result = potential_block
-                    break
-                else:
-                    result = potential_block[:MAX_CLAIMS_LENGTH-3] + '...'
-                    break
-        
-        # 最終安全策
-        if not result:
-            result = text[:MAX_CLAIMS_LENGTH-3] + '...'
+        # 【請求項1】【請求項2】等で分割し、請求項番号付きで上限に収まるだけ含める
+        # （最初の請求項だけで上限を超える場合は強制的に切り詰める）
+        result = truncate_blocks(text, _CLAIM_MARKER_RE, self.max_claims_length)
         
         logger.debug(f"請求項前処理: {len(text)} → {len(result)} 文字")
         return result
@@ -234,75 +263,23 @@ class PatentChatFormatter:
             return ""
         
         # 余分な空白を除去
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         text = text.strip()
         
-        # 文字数制限（定数使用）
-        if len(text) <= MAX_EMBODIMENT_LENGTH:
+        # 文字数制限
+        if len(text) <= self.max_embodiment_length:
             return text
         
         # 【発明を実施する形態】セクションを検出
-        embodiment_start = re.search(r'【発明を実施する形態】', text)
-        if embodiment_start:
+        embodiment_start = text.find('【発明を実施する形態】')
+        if embodiment_start >= 0:
             # セクション開始位置から処理
-            text = text[embodiment_start.start():]
-            
-        # 段落番号【0010】【0011】等で分割
-        paragraphs = re.split(PATENT_PARAGRAPH_PATTERN, text)
-        paragraph_numbers = re.findall(PATENT_PARAGRAPH_PATTERN, text)
+            text = text[embodiment_start:]
         
-        result = ""
-        
-        # 各段落を順次追加
-        for i, paragraph in enumerate(paragraphs):
-            if not paragraph.strip():
-                continue
-                
-            # 段落番号がある場合は追加
-            paragraph_num = paragraph_numbers[i-1] if i > 0 and i-1 < len(paragraph_numbers) else ""
-            
-            # 最初の段落の場合、【発明を実施する形態】を含める可能性
-            if i == 0 and '【発明を実施する形態】' in paragraph:
-                potential_paragraph = paragraph.strip()
-            else:
-                potential_paragraph = paragraph_num + paragraph.strip()
-                
-            potential_result = result + potential_paragraph
-            
-            if len(potential_result) <= MAX_EMBODIMENT_LENGTH:
-                result = potential_result
-            else:
-                # 現在の結果が空でない場合はそれを使用
-                if result:
-                    break
-                # 結果が空の場合は最初の段落だけでも強制的に含める
-                else:
-                    result = potential_paragraph[:MAX_EMBODIMENT_LENGTH-3] + '...'
-                    break
-        
-        # まだ結果が空の場合（安全策: 段落番号パターンで分割できない場合）
-        if not result:
-            # セクション名【****】で分割を試行
-            section_blocks = re.split(PATENT_SECTION_PATTERN, text)
-            section_markers = re.findall(PATENT_SECTION_PATTERN, text)
-            
-            for i, block in enumerate(section_blocks):
-                if not block.strip():
-                    continue
-                    
-                marker = section_markers[i-1] if i > 0 and i-1 < len(section_markers) else ""
-                potential_block = marker + block.strip()
-                
-                if len(potential_block) <= MAX_EMBODIMENT_LENGTH:
-                    result = potential_block
-                    break
-                else:
-                    result = potential_block[:MAX_EMBODIMENT_LENGTH-3] + '...'
-                    break
-        
-        # 最終安全策
-        if not result:
-            result = text[:MAX_EMBODIMENT_LENGTH-3] + '...'
+        # 段落番号【0010】【0011】等で分割し、段落番号付きで上限に収まるだけ含める
+        # （先頭の段落は段落番号を持たず、【発明を実施する形態】を含む場合はそのまま含める。
+        #   最初の段落だけで上限を超える場合は強制的に切り詰める）
+        result = truncate_blocks(text, _PARAGRAPH_RE, self.max_embodiment_length)
         
         logger.debug(f"実施形態前処理: {len(text)} → {len(result)} 文字")
         return result
@@ -328,63 +305,59 @@ class PatentChatFormatter:
         
         logger.info(f"変換開始: {input_path} → {output_path}")
         
-        # データ読み込み
+        # データ読み込み・グループ化（ファイル全体を読み込まずに1件ずつ処理）
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            logger.info(f"入力データ数: {len(data)}")
+            patents_by_id = self.group_sections(iter_json_records(input_path))
         except Exception as e:
             logger.error(f"ファイル読み込みエラー: {e}")
             return
         
-        # ペア抽出
-        chat_pairs = self.extract_claims_and_implementations(data)
-        
-        if not chat_pairs:
+        # ペア作成（num_workers > 1 の場合は並列）は書き出しと並行して順に行う
+        chat_pairs = self.iter_chat_pairs(patents_by_id)
+        first_pair = next(chat_pairs, None)
+        if first_pair is None:
             logger.error("有効なペアが抽出できませんでした")
             return
         
-        # Chat format変換
-        chat_dataset = []
-        
-        for i, pair in enumerate(chat_pairs):
-            try:
-                chat_text = self.create_chat_template(
-                    pair['user_message'],
-                    pair['assistant_message']
-                )
-                
-                chat_item = {
-                    "text": chat_text,
-                    "patent_id": pair['patent_id'],
-                    "claims_section": pair['claims_section'],
-                    "implementation_section": pair['implementation_section']
-                }
-                
-                chat_dataset.append(chat_item)
-                
-                if (i + 1) % 10 == 0:
-                    logger.info(f"変換進捗: {i + 1}/{len(chat_pairs)}")
-                    
-            except Exception as e:
-                logger.warning(f"ペア {i} の変換でエラー: {e}")
-                continue
+        # Chat format変換・保存（1件ずつ書き出す）
+        sample = None
         
-        # 保存
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(chat_dataset, f, ensure_ascii=False, indent=2)
+            with JSONArrayWriter(output_path) as writer:
+                for i, pair in enumerate(chain([first_pair], chat_pairs)):
+                    try:
+                        chat_text = self.create_chat_template(
+                            pair['user_message'],
+                            pair['assistant_message']
+                        )
+                        
+                        chat_item = {
+                            "text": chat_text,
+                            "patent_id": pair['patent_id'],
+                            "claims_section": pair['claims_section'],
+                            "implementation_section": pair['implementation_section']
+                        }
+                        
+                        writer.write(chat_item)
+                        if sample is None:
+                            sample = chat_item
+                        
+                        if (i + 1) % 10 == 0:
+                            logger.info(f"変換進捗: {i + 1}件")
+                            
+                    except Exception as e:
+                        logger.warning(f"ペア {i} の変換でエラー: {e}")
+                        continue
             
             logger.info(f"変換完了: {output_path}")
-            logger.info(f"出力データ数: {len(chat_dataset)}")
+            logger.info(f"出力データ数: {writer.count}")
             
             # ファイルサイズ表示
             file_size = output_path.stat().st_size / (1024 * 1024)
             logger.info(f"ファイルサイズ: {file_size:.2f} MB")
             
             # サンプル表示
-            if chat_dataset:
-                sample = chat_dataset[0]
+            if sample is not None:
                 logger.info("📊 サンプルチャット:")
                 logger.info(f"テキスト長: {len(sample['text'])}")
                 logger.info(f"プレビュー:\n{sample['text'][:300]}...")
@@ -428,9 +401,33 @@ class PatentChatFormatter:
         logger.info("=" * 60)
 
 
+def load_formatter_options(config_path: Path) -> Dict[str, int]:
+    """
+    設定ファイルの performance セクションから文字数制限・並列数を取得
+    
+    Args:
+        config_path: 設定ファイルのパス
+        
+    Returns:
+        PatentChatFormatter の引数（設定ファイルがない場合は既定値）
+    """
+    options = {'max_claims_length': MAX_CLAIMS_LENGTH, 'max_embodiment_length': MAX_EMBODIMENT_LENGTH}
+    if not config_path.exists():
+        return options
+    
+    from src.config import Config
+    performance = Config.load_from_yaml(str(config_path)).performance
+    if performance is not None:
+        options['max_claims_length'] = performance.max_claims_length
+        options['max_embodiment_length'] = performance.max_embodiment_length
+        options['num_workers'] = performance.chat_num_workers
+        options['batch_size'] = performance.chat_batch_size
+    return options
+
 def main():
     """メイン実行関数"""
-    formatter = PatentChatFormatter()
+    config_path = Path(__file__).parent.parent / "configs" / "patent_config.yaml"
+    formatter = PatentChatFormatter(**load_formatter_options(config_path))
     formatter.run_conversion()
 
 if __name__ == "__main__":
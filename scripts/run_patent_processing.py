@@ -6,10 +6,24 @@
     python scripts/run_patent_processing.py single  # 単一ファイルテスト
     python scripts/run_patent_processing.py bulk    # 一括処理
     python scripts/run_patent_processing.py quick   # クイックテスト
+
+    # 一括処理をシャード分割して複数プロセス・マシンで実行し、最後にマージ
+    python scripts/run_patent_processing.py bulk --shard-index 0 --num-shards 4
+    python scripts/run_patent_processing.py bulk --merge --num-shards 4
+    # マージ時にシャード横断で近似重複文書を除外する場合
+    python scripts/run_patent_processing.py bulk --merge --num-shards 4 --dedup
+
+    # 中断した一括処理をチェックポイントから再開
+    # （チェックポイントはシャード処理のみが書き出すため、シャード指定のない --resume はエラー）
+    python scripts/run_patent_processing.py bulk --shard-index 0 --num-shards 4 --resume
+
+    # 並列数・チェックポイント間隔・圧縮等は configs の performance セクションで指定
+    # （performance.num_workers > 1 の場合、bulk は1台で並列にシャード処理してマージする）
 """
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # プロジェクトルートをパスに追加
@@ -24,14 +38,81 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def parse_args() -> argparse.Namespace:
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="特許データ処理実行スクリプト")
+    parser.add_argument('mode', nargs='?', default="single", help="実行モード (single, bulk, quick)")
+    parser.add_argument('--data-path', default=None,
+                        help="シャード処理対象のXMLディレクトリ（省略時は自動検出）")
+    parser.add_argument('--shard-index', type=int, default=0, help="bulkモードで処理するシャード番号（0始まり）")
+    parser.add_argument('--num-shards', type=int, default=1, help="bulkモードのシャード数")
+    parser.add_argument('--merge', action='store_true', help="出力済みシャードをマージして最終データセットを作成")
+    parser.add_argument('--dedup', action='store_true',
+                        help="シャード出力のマージ時にシャード横断で近似重複文書を除外")
+    parser.add_argument('--resume', action='store_true',
+                        help="シャードのチェックポイントから再開（--num-shards 2以上、または performance.num_workers > 1 の場合のみ）")
+    return parser.parse_args()
+
+
+def run_sharded_bulk(args: argparse.Namespace, config: Config) -> None:
+    """シャード分割した一括処理、またはシャード出力のマージを実行"""
+    from src.patent_processing.text_processor import PatentTextProcessor
+    from src.patent_processing.sharding import run_bulk_shard, run_local_shards, merge_shard_outputs
+    from src.patent_processing.checkpoint import checkpoint_options
+    from src.utils.data_discovery import DataDiscovery
+    
+    output_dir = project_root / "data" / "processed"
+    
+    if args.merge:
+        logger.info("🔄 シャード出力のマージ")
+        merge_shard_outputs(str(output_dir), args.num_shards if args.num_shards > 1 else None, deduplicate=args.dedup)
+        return
+    
+    data_path = args.data_path or DataDiscovery(str(project_root)).get_auto_path("bulk")
+    if data_path is None:
+        raise FileNotFoundError("一括処理用のXMLディレクトリが見つかりません")
+    
+    options = checkpoint_options(config.performance)
+    num_workers = config.performance.num_workers if config.performance else 1
+    prefetch = config.performance.prefetch_files if config.performance else 0
+    if args.num_shards == 1 and num_workers > 1:
+        # シャード指定がない場合は performance.num_workers 個のシャードをローカルで並列処理
+        logger.info(f"🔄 一括処理モード（ローカル並列 {num_workers}ワーカー）")
+        run_local_shards(data_path, str(output_dir), num_workers, resume=args.resume, checkpoint_options=options,
+                         prefetch=prefetch, deduplicate=args.dedup)
+        return
+    
+    logger.info(f"🔄 一括処理モード（シャード {args.shard_index + 1}/{args.num_shards}）")
+    processor = PatentTextProcessor(language="japanese")
+    part_dir = run_bulk_shard(processor, data_path, str(output_dir), args.shard_index, args.num_shards,
+                              resume=args.resume, checkpoint_options=options, prefetch=prefetch)
+    logger.info(f"✅ シャード出力完了: {part_dir}")
+
+
 def main():
     """メイン実行関数"""
     # 引数取得
-    mode = sys.argv[1] if len(sys.argv) > 1 else "single"
+    args = parse_args()
+    mode = args.mode
     
     # 設定読み込み
     config_path = project_root / "configs" / "patent_config.yaml"
     config = Config.load_from_yaml(str(config_path))
+    num_workers = config.performance.num_workers if config.performance else 1
+    
+    if args.resume and not args.merge and args.num_shards == 1 and num_workers <= 1:
+        # シャード指定のない一括処理はチェックポイントを書き出さないため再開できない
+        logger.error("❌ --resume はシャード処理（--num-shards 2以上、または performance.num_workers > 1）でのみ使用できます")
+        sys.exit(1)
+    
+    if mode == "bulk" and (args.num_shards > 1 or args.merge or num_workers > 1):
+        try:
+            run_sharded_bulk(args, config)
+            logger.info("🎉 処理完了")
+        except Exception as e:
+            logger.error(f"❌ エラー発生: {e}")
+            sys.exit(1)
+        return
     
     # データプロセッサー初期化
     processor = DataProcessor(config)
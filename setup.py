@@ -46,6 +46,7 @@ setup(
     extras_require={
         "dev": [
             "pytest>=7.0.0",
+            "pytest-benchmark>=4.0.0",
             "black>=22.0.0",
             "flake8>=5.0.0",
             "mypy>=0.991",
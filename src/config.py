@@ -1,10 +1,18 @@
 # config.py 設定管理モジュール
 
 import yaml
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Union
+import copy
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass, fields, asdict
+from pathlib import Path
+from typing import List, Dict, Optional, Union, Any, Tuple, get_type_hints, get_origin, get_args
 import os
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class ModelConfig:
     """モデル設定"""
@@ -123,8 +131,238 @@ class DataConfig:
     dataset_name: str = "yahma/alpaca_cleand"
     train_split: str = "train"
     text_field: str = "text"
-    dataset_num_proc: int = 2
-    packing: bool = True
+    dataset_num_proc: Optional[int] = None  # 非推奨（無視される）: performance.map_num_proc を使用
+    packing: Optional[bool] = None  # 非推奨（無視される）: performance.packing を使用
+
+@dataclass
+class PreprocessingConfig:
+    """前処理設定（DataProcessor・PatentDataCleaner のクリーニング・長さ制限で使用）"""
+    sections_to_extract: List[str] = None
+    remove_patterns: List[str] = None  # クリーニング時に除去する正規表現
+    min_text_length: int = 100  # この文字数以下のテキストは除外
+    max_text_length: int = 1500  # これを超えるテキストは文の区切りで切り詰め
+    max_field_length: int = 500  # text 以外の文字列フィールドの上限文字数
+    max_list_item_length: int = 300  # リスト（claims等）の要素の上限文字数
+    strip_boilerplate: bool = False  # 派生データセット生成で多数の文書に現れる定型段落を除外するかどうか
+    
+    def __post_init__(self):
+        if self.sections_to_extract is None:
+            self.sections_to_extract = ["abstract", "claims", "description"]
+        if self.remove_patterns is None:
+            self.remove_patterns = []
+    
+    def validate(self) -> List[str]:
+        """設定値の整合性チェック（エラーメッセージのリストを返す）"""
+        errors = []
+        for pattern in self.remove_patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                errors.append(f"preprocessing.remove_patterns: 不正な正規表現 {pattern!r} ({e})")
+        if self.min_text_length < 0:
+            errors.append(f"preprocessing.min_text_length は0以上である必要があります: {self.min_text_length}")
+        for name in ('max_field_length', 'max_list_item_length'):
+            if getattr(self, name) < 1:
+                errors.append(f"preprocessing.{name} は1以上である必要があります: {getattr(self, name)}")
+        if self.max_text_length < self.min_text_length:
+            errors.append(f"preprocessing.max_text_length ({self.max_text_length}) が "
+                          f"min_text_length ({self.min_text_length}) より小さくなっています")
+        return errors
+
+@dataclass
+class PerformanceConfig:
+    """処理性能に関する設定（各ステージの並列数・バッチサイズ・キャッシュ等）"""
+    num_workers: int = 1  # bulk処理でローカル並列実行するワーカープロセス数
+    prefetch_files: int = 0  # XML読み込みでスレッドプールにより先読みするファイル数（0の場合は先読みしない）
+    dataset_num_proc: int = 1  # SFTTrainer のデータセット前処理の並列数
+    map_num_proc: int = 2  # DataProcessor の datasets.map の並列数
+    map_batch_size: int = 1000  # datasets.map のバッチサイズ
+    packing: bool = False  # SFTTrainer のシーケンスパッキング
+    shard_size: int = 5000  # チェックポイントの1パートファイルあたりのレコード数
+    checkpoint_every: int = 100  # チェックポイントを書き出す処理件数
+    compression: Optional[str] = None  # チェックポイントのパートファイル圧縮（None or "gzip"）
+    cache_dir: Optional[str] = None  # datasets のキャッシュディレクトリ（Noneの場合は既定の場所）
+    max_items: Optional[int] = 50  # 派生データセット生成の最大件数（Noneの場合は全件）
+    max_claims_length: int = 500  # chat形式変換時の請求項の最大文字数
+    max_embodiment_length: int = 800  # chat形式変換時の実施形態の最大文字数
+    chat_num_workers: int = 1  # chat形式変換のペア作成の並列プロセス数（1の場合は逐次処理）
+    chat_batch_size: int = 1000  # chat形式変換で1ワーカーに渡す特許数の上限
+    
+    def validate(self) -> List[str]:
+        """設定値の整合性チェック（エラーメッセージのリストを返す）"""
+        errors = []
+        for name in ('num_workers', 'dataset_num_proc', 'map_num_proc', 'map_batch_size', 'shard_size',
+                     'checkpoint_every', 'max_claims_length', 'max_embodiment_length',
+                     'chat_num_workers', 'chat_batch_size'):
+            if getattr(self, name) < 1:
+                errors.append(f"performance.{name} は1以上である必要があります: {getattr(self, name)}")
+        if self.prefetch_files < 0:
+            errors.append(f"performance.prefetch_files は0以上である必要があります: {self.prefetch_files}")
+        if self.max_items is not None and self.max_items < 1:
+            errors.append(f"performance.max_items は1以上またはnullである必要があります: {self.max_items}")
+        if self.compression not in (None, 'gzip'):
+            errors.append(f"performance.compression は null または 'gzip' を指定してください: {self.compression!r}")
+        return errors
+
+# 設定ファイルのセクション名 → 設定クラス
+SECTION_CLASSES = {
+    'model': ModelConfig,
+    'lora': LoraConfig,
+    'training': TrainingConfig,
+    'dataset': DatasetConfig,
+    'quantization': QuantizationConfig,
+    'unsloth': UnslothConfig,
+    'evaluation': EvaluationConfig,
+    'data': DataConfig,
+    'preprocessing': PreprocessingConfig,
+    'performance': PerformanceConfig,
+}
+
+# 非推奨の data セクションのキー → 代わりに使用する performance セクションのキー
+DEPRECATED_DATA_KEYS = {
+    'dataset_num_proc': 'map_num_proc',
+    'packing': 'packing',
+}
+
+# 省略時も既定値で生成するセクション
+REQUIRED_SECTIONS = ('model', 'lora', 'training')
+
+# 継承元の指定キー（パスはプロジェクトルートまたは設定ファイルからの相対パス）
+BASE_CONFIG_KEY = 'base_config'
+
+# 解決済み設定のキャッシュ: 設定ファイルの絶対パス → (継承チェーンの (パス, 更新時刻), 設定)
+_resolved_cache: Dict[str, Tuple[Tuple[Tuple[str, float], ...], 'Config']] = {}
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """辞書を再帰的にマージ（リスト・スカラーは上書き）"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _resolve_base_path(base_path: str, config_path: Path) -> Path:
+    """継承元パスを解決（設定ファイルのディレクトリ → プロジェクトルート → カレントの順）"""
+    candidate = Path(base_path)
+    if candidate.is_absolute():
+        return candidate
+    for root in (config_path.parent, config_path.parent.parent, Path.cwd()):
+        if (root / candidate).exists():
+            return (root / candidate).resolve()
+    raise FileNotFoundError(f"継承元の設定ファイルが見つかりません: {base_path} ({config_path} から参照)")
+
+
+def _load_config_chain(config_path: Path, chain: List[Path]) -> Dict[str, Any]:
+    """base_config を辿って設定を読み込み、継承元から順にマージ"""
+    config_path = config_path.resolve()
+    if config_path in chain:
+        cycle = ' -> '.join(str(path) for path in chain + [config_path])
+        raise ValueError(f"設定ファイルの継承が循環しています: {cycle}")
+    chain.append(config_path)
+    
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config_dict = yaml.safe_load(f) or {}
+    if not isinstance(config_dict, dict):
+        raise ValueError(f"設定ファイルの形式が不正です（マッピングではありません）: {config_path}")
+    
+    base_path = config_dict.pop(BASE_CONFIG_KEY, None)
+    if base_path:
+        base_dict = _load_config_chain(_resolve_base_path(base_path, config_path), chain)
+        config_dict = _deep_merge(base_dict, config_dict)
+    return config_dict
+
+
+def _coerce_value(value: Any, annotation: Any, key: str) -> Any:
+    """型注釈に合わせて値を変換（変換できない場合は ValueError）"""
+    if value is None:
+        # 既定値が None のフィールド（List[str] = None 等）もあるため None は常に許可
+        return None
+    
+    origin = get_origin(annotation)
+    if origin is Union:
+        candidates = [arg for arg in get_args(annotation) if arg is not type(None)]
+        errors = []
+        for candidate in candidates:
+            try:
+                return _coerce_value(value, candidate, key)
+            except ValueError as e:
+                errors.append(str(e))
+        raise ValueError(errors[0])
+    if origin in (list, List):
+        if not isinstance(value, list):
+            raise ValueError(f"{key}: リストを指定してください（値: {value!r}）")
+        item_type = (get_args(annotation) or (Any,))[0]
+        return [_coerce_value(item, item_type, f"{key}[{index}]") for index, item in enumerate(value)]
+    if origin in (dict, Dict) or annotation is dict:
+        if not isinstance(value, dict):
+            raise ValueError(f"{key}: マッピングを指定してください（値: {value!r}）")
+        return value
+    
+    if annotation is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in ('true', 'yes', 'on', 'false', 'no', 'off'):
+            return value.lower() in ('true', 'yes', 'on')
+        raise ValueError(f"{key}: 真偽値を指定してください（値: {value!r}）")
+    if annotation is int:
+        if isinstance(value, bool):
+            raise ValueError(f"{key}: 整数を指定してください（値: {value!r}）")
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str):
+            try:
+                return int(value)
+            except ValueError:
+                pass
+        raise ValueError(f"{key}: 整数を指定してください（値: {value!r}）")
+    if annotation is float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        if isinstance(value, str):
+            # YAML 1.1 では "2e-4" 等の指数表記が文字列として読み込まれる
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        raise ValueError(f"{key}: 数値を指定してください（値: {value!r}）")
+    if annotation is str:
+        if isinstance(value, str):
+            return value
+        raise ValueError(f"{key}: 文字列を指定してください（値: {value!r}）")
+    return value
+
+
+def _build_section(section_class, section_name: str, values: Any, errors: List[str], unknown: List[str]):
+    """設定セクションを検証・型変換して生成"""
+    if values is None:
+        values = {}
+    if not isinstance(values, dict):
+        errors.append(f"{section_name}: マッピングを指定してください（値: {values!r}）")
+        return None
+    
+    type_hints = get_type_hints(section_class)
+    known = {field.name for field in fields(section_class)}
+    kwargs = {}
+    for key, value in values.items():
+        if key not in known:
+            unknown.append(f"{section_name}.{key}")
+            continue
+        try:
+            kwargs[key] = _coerce_value(value, type_hints[key], f"{section_name}.{key}")
+        except ValueError as e:
+            errors.append(str(e))
+    
+    section = section_class(**kwargs)
+    if hasattr(section, 'validate'):
+        errors.extend(section.validate())
+    return section
+
 
 @dataclass
 class Config:
@@ -137,42 +375,101 @@ class Config:
     unsloth: Optional[UnslothConfig] = None
     evaluation: Optional[EvaluationConfig] = None
     data: Optional[DataConfig] = None  # 下位互換性のため
+    preprocessing: Optional[PreprocessingConfig] = None
+    performance: Optional[PerformanceConfig] = None
 
     @classmethod
-    def load_from_yaml(cls, config_path: str):
-        """YAMLファイルからの設定を読込"""
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_dict = yaml.safe_load(f)
-
-            return cls(
-                model=ModelConfig(**config_dict.get('model', {})),
-                lora=LoraConfig(**config_dict.get('lora', {})),
-                training=TrainingConfig(**config_dict.get('training', {})),
-                dataset=DatasetConfig(**config_dict.get('dataset', {})) if 'dataset' in config_dict else None,
-                quantization=QuantizationConfig(**config_dict.get('quantization', {})) if 'quantization' in config_dict else None,
-                unsloth=UnslothConfig(**config_dict.get('unsloth', {})) if 'unsloth' in config_dict else None,
-                evaluation=EvaluationConfig(**config_dict.get('evaluation', {})) if 'evaluation' in config_dict else None,
-                data=DataConfig(**config_dict.get('data', {})) if 'data' in config_dict else None
-            )
+    def load_from_yaml(cls, config_path: str, use_cache: bool = True):
+        """
+        YAMLファイルからの設定を読込
         
-    def save_yaml(self, config_path: str):
-        """設定をYAMLファイルに保存"""
-        config_dict = {
-            'model': self.model.__dict__,
-            'lora': self.lora.__dict__,
-            'training': self.training.__dict__,
+        base_config で指定された設定ファイルを継承元として再帰的にマージし、
+        各セクションを型注釈に従って検証・型変換する。解決済みの設定は
+        継承チェーンのファイルが更新されるまでプロセス内でキャッシュする。
+        
+        Args:
+            config_path: 設定ファイルのパス
+            use_cache: 解決済み設定のキャッシュを使用するかどうか
+            
+        Returns:
+            Config
+        """
+        cache_key = str(Path(config_path).resolve())
+        if use_cache and cache_key in _resolved_cache:
+            chain_mtimes, cached = _resolved_cache[cache_key]
+            if all(os.path.exists(path) and os.path.getmtime(path) == mtime for path, mtime in chain_mtimes):
+                return copy.deepcopy(cached)
+        
+        chain: List[Path] = []
+        config_dict = _load_config_chain(Path(config_path), chain)
+        config = cls.from_dict(config_dict, source=str(config_path))
+        
+        _resolved_cache[cache_key] = (
+            tuple((str(path), os.path.getmtime(path)) for path in chain), copy.deepcopy(config)
+        )
+        logger.debug(f"設定読込: {config_path} (継承: {len(chain) - 1}件, fingerprint: {config.fingerprint()})")
+        return config
+    
+    @classmethod
+    def from_dict(cls, config_dict: Dict[str, Any], source: str = "<dict>"):
+        """
+        辞書から設定を生成（検証・型変換付き）
+        
+        Args:
+            config_dict: 継承解決済みの設定辞書
+            source: エラーメッセージに表示する設定の出所
+            
+        Returns:
+            Config
+        """
+        errors: List[str] = []
+        unknown: List[str] = []
+        sections = {}
+        for section_name, section_class in SECTION_CLASSES.items():
+            if section_name in config_dict or section_name in REQUIRED_SECTIONS:
+                sections[section_name] = _build_section(
+                    section_class, section_name, config_dict.get(section_name), errors, unknown)
+        
+        if errors:
+            raise ValueError(f"設定ファイルの検証に失敗しました ({source}):\n  " + "\n  ".join(errors))
+        data_values = config_dict.get('data')
+        if isinstance(data_values, dict):
+            for key, replacement in DEPRECATED_DATA_KEYS.items():
+                if data_values.get(key) is not None:
+                    logger.warning(f"data.{key} は非推奨のため無視します。performance.{replacement} を使用してください ({source})")
+        if unknown:
+            # 継承元の共通設定（project, logging 等）や他ツール向けのキーはスキーマ外として無視
+            logger.info(f"スキーマ外の設定キーを無視: {', '.join(unknown)}")
+        return cls(**sections)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """設定を辞書に変換（未設定のセクションは含めない）"""
+        return {
+            section_name: asdict(getattr(self, section_name))
+            for section_name in SECTION_CLASSES
+            if getattr(self, section_name) is not None
         }
+    
+    def fingerprint(self, sections: Optional[List[str]] = None) -> str:
+        """
+        解決済み設定のフィンガープリント（キャッシュキー用）
+        
+        Args:
+            sections: 対象とするセクション名（Noneの場合は全セクション）。
+                      例えばデータセットのキャッシュには学習率等を含めないよう絞り込む
+            
+        Returns:
+            16桁の16進文字列
+        """
+        config_dict = self.to_dict()
+        if sections is not None:
+            config_dict = {name: config_dict.get(name) for name in sections}
+        canonical = json.dumps(config_dict, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
         
-        if self.dataset:
-            config_dict['dataset'] = self.dataset.__dict__
-        if self.quantization:
-            config_dict['quantization'] = self.quantization.__dict__
-        if self.unsloth:
-            config_dict['unsloth'] = self.unsloth.__dict__
-        if self.evaluation:
-            config_dict['evaluation'] = self.evaluation.__dict__
-        if self.data:
-            config_dict['data'] = self.data.__dict__
+    def save_yaml(self, config_path: str):
+        """設定をYAMLファイルに保存"""
+        config_dict = self.to_dict()
         
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.dump(config_dict, f, default_flow_style=False, allow_unicode=True)
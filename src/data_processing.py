@@ -1,19 +1,29 @@
 # データ前処理モジュール
-from datasets import load_dataset, Dataset
-from typing import Dict, List, Any
+from typing import Dict, List, Any, TYPE_CHECKING
+import hashlib
 import logging
-from .config import Config
+import re
+from .config import Config, PreprocessingConfig, PerformanceConfig
+from .utils.lazy_imports import lazy_import, optional_import
+from .utils.truncation import truncate_text
 
-# 特許データ処理モジュールをインポート
-try:
-    from .patent_processing.text_processor import PatentTextProcessor
-    from .utils.data_discovery import DataDiscovery
-    PATENT_PROCESSING_AVAILABLE = True
-except ImportError:
-    PATENT_PROCESSING_AVAILABLE = False
+# datasets は読み込みに数秒かかるため、データセット作成時に読み込む
+datasets = lazy_import("datasets")
+
+if TYPE_CHECKING:
+    from datasets import Dataset
     
 logger = logging.getLogger(__name__)
 
+# データセットのキャッシュキーに含める設定セクション（学習率等の変更ではキャッシュを無効化しない）
+DATASET_CACHE_SECTIONS = ['model', 'data', 'dataset', 'preprocessing']
+
+
+def _patent_processing_available() -> bool:
+    """特許データ処理モジュールが利用可能か（初回呼び出し時に読み込み、結果はキャッシュ）"""
+    return (optional_import(f"{__package__}.patent_processing.text_processor") is not None and
+            optional_import(f"{__package__}.utils.data_discovery") is not None)
+
 class DataProcessor:
     """データ処理クラス"""
 
@@ -21,11 +31,49 @@ class DataProcessor:
         self.config = config
         self.tokenizer = tokenizer
         self.dataset = None
+        self._patent_processor = None
+        self._data_discovery = None
+        
+        # 前処理設定（設定ファイルに preprocessing がない場合は既定値）
+        self.preprocessing = getattr(config, 'preprocessing', None) or PreprocessingConfig()
+        self._remove_patterns = [re.compile(pattern) for pattern in self.preprocessing.remove_patterns]
+        # 性能設定（並列数・バッチサイズ・キャッシュディレクトリ）
+        self.performance = getattr(config, 'performance', None) or PerformanceConfig()
+    
+    @property
+    def patent_processor(self):
+        """特許テキスト処理器（初回アクセス時に生成。利用できない場合はNone）"""
+        if self._patent_processor is None and _patent_processing_available():
+            from .patent_processing.text_processor import PatentTextProcessor
+            self._patent_processor = PatentTextProcessor(language="japanese")
+        return self._patent_processor
+    
+    @property
+    def data_discovery(self):
+        """データディスカバリー（初回アクセス時に生成。利用できない場合はNone）"""
+        if self._data_discovery is None and _patent_processing_available():
+            from .utils.data_discovery import DataDiscovery
+            self._data_discovery = DataDiscovery()
+        return self._data_discovery
+        
+    def _cache_fingerprint(self, dataset, step: str) -> str:
+        """
+        datasets の map キャッシュ用フィンガープリント
+        
+        関数のハッシュ化（トークナイザーを含む self 全体が対象になり、失敗するとキャッシュが効かない）の
+        代わりに、解決済み設定・入力データセット・トークナイザー・処理名から決定的に算出する。
+        """
+        tokenizer_name = getattr(self.tokenizer, 'name_or_path', type(self.tokenizer).__name__)
+        key = ':'.join([
+            self.config.fingerprint(DATASET_CACHE_SECTIONS),
+            str(getattr(dataset, '_fingerprint', '')),
+            str(tokenizer_name),
+            step,
+        ])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
         
     def clean_patent_text(self, text: str) -> str:
         """特許テキストのクリーニング"""
-        import re
-        
         if not isinstance(text, str):
             return ""
         
@@ -36,6 +84,10 @@ class DataProcessor:
         text = re.sub(r'CH{3,}', '', text)       # CHCHCHCH等を除去
         text = re.sub(r'AL\d+', '', text)        # AL20等を除去
         
+        # 設定ファイル（preprocessing.remove_patterns）の除去パターン
+        for pattern in self._remove_patterns:
+            text = pattern.sub('', text)
+        
         # 連続する同じ文字を除去（3文字以上）
         text = re.sub(r'(.)\1{2,}', r'\1\1', text)
         
@@ -48,28 +100,8 @@ class DataProcessor:
         return text.strip()
         
     def limit_text_length(self, text: str, max_length: int = 2000) -> str:
-        """テキスト長を制限"""
-        if len(text) > max_length:
-            # 文の区切りで切る
-            sentences = text.split('。')
-            result = ""
-            for sentence in sentences:
-                if len(result + sentence + '。') <= max_length:
-                    result += sentence + '。'
-                else:
-                    break
-            return result if result else text[:max_length]
-        return text
-        
-        # 特許データ処理機能の初期化
-        if PATENT_PROCESSING_AVAILABLE:
-            self.patent_processor = PatentTextProcessor(language="japanese")
-            self.data_discovery = DataDiscovery()
-            logger.info("✅特許データ処理機能が利用可能です")
-        else:
-            self.patent_processor = None
-            self.data_discovery = None
-            logger.warning("⚠️特許データ処理機能は利用できません")
+        """テキスト長を制限（文の区切りで切り、区切りで何も残らない場合は強制的に切る）"""
+        return truncate_text(text, max_length)
 
     def create_alpaca_prompt_template(self) -> str:
         """Alpaca プロンプトテンプレートを作成"""
@@ -104,7 +136,7 @@ class DataProcessor:
 
         return {"text": texts}
     
-    def create_dummy_dataset(self, size: int = 100) -> Dataset:
+    def create_dummy_dataset(self, size: int = 100) -> 'Dataset':
         """ダミーデータセットを作成（デモ・テスト用）"""
         logger.info(f"ダミーデータセット作成中 (サイズ: {size})")
         
@@ -136,18 +168,19 @@ class DataProcessor:
         for key in dummy_data:
             dummy_data[key] = dummy_data[key][:size]
         
-        return Dataset.from_dict(dummy_data)
+        return datasets.Dataset.from_dict(dummy_data)
 
-    def load_and_process_dataset(self) -> Dataset:
+    def load_and_process_dataset(self) -> 'Dataset':
         """データセット読込、前処理を実行"""
         try:
             logger.info(f"データセットを読込中: {self.config.data.dataset_name}")
             
             # データセット読み込み試行
             try:
-                dataset = load_dataset(
+                dataset = datasets.load_dataset(
                     self.config.data.dataset_name,
-                    split=self.config.data.train_split
+                    split=self.config.data.train_split,
+                    cache_dir=self.performance.cache_dir
                 )
                 logger.info("✅データセット読込完了")
             except Exception as dataset_error:
@@ -160,7 +193,9 @@ class DataProcessor:
             dataset = dataset.map(
                 self.formatting_prompts_func,
                 batched=True,
-                num_proc=self.config.data.dataset_num_proc
+                batch_size=self.performance.map_batch_size,
+                num_proc=self.performance.map_num_proc,
+                new_fingerprint=self._cache_fingerprint(dataset, "formatting_prompts")
             )
 
             self.dataset = dataset
@@ -171,9 +206,9 @@ class DataProcessor:
             logger.error(f"✖データ処理エラー: {e}")
             raise
 
-    def load_patent_dataset(self, data_path: str = None) -> Dataset:
+    def load_patent_dataset(self, data_path: str = None) -> 'Dataset':
         """特許データセットを読み込み、前処理を実行"""
-        if not PATENT_PROCESSING_AVAILABLE:
+        if not _patent_processing_available():
             raise RuntimeError("特許データ処理機能が利用できません。依存関係を確認してください。")
             
         try:
@@ -209,63 +244,42 @@ class DataProcessor:
             elif data_path.endswith('.json') or data_path.endswith('.jsonl'):
                 # JSONファイルの処理
                 import json
+                from .utils.json_stream import iter_json_records
                 processed_data = []
                 
                 try:
-                    # 文字化け対策のため複数のエンコーディングを試行
-                    encodings = ['utf-8', 'cp932', 'shift_jis', 'utf-8-sig']
-                    
-                    for encoding in encodings:
-                        try:
-                            if data_path.endswith('.json'):
-                                # JSON形式
-                                with open(data_path, 'r', encoding=encoding) as f:
-                                    data = json.load(f)
-                                    if isinstance(data, list):
-                                        processed_data = data
-                                    else:
-                                        processed_data = [data]
-                                break
-                            else:
-                                # JSONL形式
-                                with open(data_path, 'r', encoding=encoding) as f:
-                                    for line in f:
-                                        line = line.strip()
-                                        if line:
-                                            processed_data.append(json.loads(line))
-                                break
-                        except (UnicodeDecodeError, json.JSONDecodeError):
-                            continue
-                    
-                    if not processed_data:
-                        logger.error(f"JSONファイルの読み込みに失敗: {data_path}")
-                        processed_data = [{"error": f"JSONファイルの読み込みに失敗: {data_path}"}]
-                    else:
-                        logger.info(f"JSONファイル読み込み成功: {len(processed_data)}件のデータ")
-                        
-                        # 特許データのクリーニング処理
-                        logger.info("特許データクリーニング開始...")
-                        cleaned_data = []
-                        for item in processed_data:
+                    # 文字化け対策のため先頭部分からエンコーディングを判定し、1回の読み込みで順にクリーニング
+                    logger.info("特許データクリーニング開始...")
+                    loaded_count = 0
+                    try:
+                        for item in iter_json_records(data_path):
+                            loaded_count += 1
                             if isinstance(item, dict):
                                 cleaned_item = {}
                                 for key, value in item.items():
                                     if key == 'text' and isinstance(value, str):
                                         # テキストフィールドをクリーニング
                                         cleaned_text = self.clean_patent_text(value)
-                                        cleaned_text = self.limit_text_length(cleaned_text, 1500)
+                                        cleaned_text = self.limit_text_length(cleaned_text, self.preprocessing.max_text_length)
                                         cleaned_item[key] = cleaned_text
                                     elif isinstance(value, str):
                                         # その他の文字列フィールドも軽くクリーニング
-                                        cleaned_item[key] = self.clean_patent_text(value)[:500]
+                                        cleaned_item[key] = self.clean_patent_text(value)[:self.preprocessing.max_field_length]
                                     else:
                                         cleaned_item[key] = value
                                 
                                 # 有効なデータのみ保持
-                                if cleaned_item.get('text') and len(cleaned_item['text']) > 100:
-                                    cleaned_data.append(cleaned_item)
-                        
-                        processed_data = cleaned_data
+                                if cleaned_item.get('text') and len(cleaned_item['text']) > self.preprocessing.min_text_length:
+                                    processed_data.append(cleaned_item)
+                    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                        logger.warning(f"JSONデコードエラー: {e}")
+                        loaded_count = 0
+                    
+                    if not loaded_count:
+                        logger.error(f"JSONファイルの読み込みに失敗: {data_path}")
+                        processed_data = [{"error": f"JSONファイルの読み込みに失敗: {data_path}"}]
+                    else:
+                        logger.info(f"JSONファイル読み込み成功: {loaded_count}件のデータ")
                         logger.info(f"クリーニング完了: {len(processed_data)}件の有効データ")
                         
                 except Exception as e:
@@ -283,14 +297,16 @@ class DataProcessor:
                 processed_data = dataset_dict
             
             # Datasetオブジェクトに変換
-            dataset = Dataset.from_dict(processed_data)
+            dataset = datasets.Dataset.from_dict(processed_data)
             
             # トークナイザーが指定されている場合は前処理を実行
             if self.tokenizer is not None:
                 dataset = dataset.map(
                     self.formatting_prompts_func,
                     batched=True,
-                    num_proc=self.config.data.dataset_num_proc if self.config.data else 2
+                    batch_size=self.performance.map_batch_size,
+                    num_proc=self.performance.map_num_proc,
+                    new_fingerprint=self._cache_fingerprint(dataset, "formatting_prompts")
                 )
             
             self.dataset = dataset
@@ -301,9 +317,9 @@ class DataProcessor:
             logger.error(f"✖特許データ処理エラー: {e}")
             raise
 
-    def create_patent_training_dataset(self, data_format: str = "chatml") -> Dataset:
+    def create_patent_training_dataset(self, data_format: str = "chatml") -> 'Dataset':
         """特許データから学習用データセットを作成"""
-        if not PATENT_PROCESSING_AVAILABLE:
+        if not _patent_processing_available():
             raise RuntimeError("特許データ処理機能が利用できません。")
             
         try:
@@ -333,7 +349,7 @@ class DataProcessor:
                     import json
                     with open("data/processed/complete_dataset.json", "r", encoding="utf-8") as f:
                         training_data = json.load(f)
-                    training_dataset = Dataset.from_dict(training_data)
+                    training_dataset = datasets.Dataset.from_dict(training_data)
                 else:
                     # 基本的なフォーマット変換
                     training_data = {
@@ -345,7 +361,7 @@ class DataProcessor:
                         text = f"特許: {item.get('title', '')}\n要約: {item.get('abstract', '')}\nクレーム: {item.get('claims', '')}"
                         training_data["text"].append(text)
                         training_data["source"].append("patent")
-                    training_dataset = Dataset.from_dict(training_data)
+                    training_dataset = datasets.Dataset.from_dict(training_data)
             elif data_format == "alpaca":
                 # Alpacaフォーマットでの変換
                 training_data = {
@@ -358,7 +374,7 @@ class DataProcessor:
                     training_data["instruction"].append("以下の特許文書の内容を要約してください。")
                     training_data["input"].append(f"タイトル: {item.get('title', '')}\n詳細: {item.get('detailed_description', '')}")
                     training_data["output"].append(item.get('abstract', ''))
-                training_dataset = Dataset.from_dict(training_data)
+                training_dataset = datasets.Dataset.from_dict(training_data)
             else:
                 raise ValueError(f"サポートされていないフォーマット: {data_format}")
             
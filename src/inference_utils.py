@@ -1,8 +1,12 @@
 # 推論関連ユーティリティ
 
-import torch
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
+from .utils.lazy_imports import lazy_import
+from .utils.truncation import token_counter, truncate_text
+
+# torch は推論実行時に読み込む
+torch = lazy_import("torch")
 
 logger = logging.getLogger(__name__)
 
@@ -60,8 +64,9 @@ class InferenceManager:
             logger.error(f"✖生成エラー: {e}")
             raise
 
-    def test_alpaca_format(self, instruction: str, input_text: str = "") -> str:
-        """Alpacaフォーマットでのテスト生成"""
+    def test_alpaca_format(self, instruction: str, input_text: str = "",
+                           max_input_tokens: Optional[int] = None) -> str:
+        """Alpacaフォーマットでのテスト生成（max_input_tokens 指定時は入力を文の区切りでトークン数以内に切り詰め）"""
         alpaca_prompt = """Below is an instruction that describes a task, paired with an input that provides further context. Write a response that appropriately completes the request.
 
         ### Instruction:
@@ -73,5 +78,7 @@ class InferenceManager:
         ### Response:
         {}
         """
+        if max_input_tokens is not None:
+            input_text = truncate_text(input_text, max_input_tokens, measure=token_counter(self.tokenizer))
         prompt = alpaca_prompt.format(instruction, input_text, "")
         return self.generate_response(prompt)
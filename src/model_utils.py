@@ -1,9 +1,12 @@
 # モデル関連ユーティリティ
 
-import torch
 from typing import Tuple, Optional
 import logging
 from config import Config
+from utils.lazy_imports import lazy_import
+
+# torch は GPU メモリ情報の取得時に読み込む（モデル本体は unsloth 経由で読み込む）
+torch = lazy_import("torch")
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -123,4 +126,4 @@ class ModelManager:
         
         except Exception as e:
             logger.error(f"✖モデル保存エラー {e}")
-            raise
\ No newline at end of file
+            raise
\ No newline at end of file
@@ -5,5 +5,15 @@ ST96 XMLフォーマット対応の特許文書解析と前処理機能を提供
 """
 
 from .text_processor import PatentTextProcessor
+from .implementation_scorer import ImplementationQualityScorer
+from .records import PatentRecord, Claim, LegalSpan, ChemicalEntity, records_to_dataframe
+from .profiling import StageProfiler
+from .dataset_builder import (DatasetBuilder, DatasetSink, ChatMLSink, ParagraphUnitSink, ConversationSink,
+                              PatentDocument)
+from .patent_ids import assign_patent_id, get_patent_id
 
-__all__ = ['PatentTextProcessor']
\ No newline at end of file
+__all__ = ['PatentTextProcessor', 'ImplementationQualityScorer',
+           'PatentRecord', 'Claim', 'LegalSpan', 'ChemicalEntity', 'records_to_dataframe',
+           'StageProfiler',
+           'DatasetBuilder', 'DatasetSink', 'ChatMLSink', 'ParagraphUnitSink', 'ConversationSink', 'PatentDocument',
+           'assign_patent_id', 'get_patent_id']
@@ -0,0 +1,302 @@
+"""
+法的表現・化学エンティティ分析結果のコンパクト表現
+
+マッチごとの辞書の代わりに、開始・終了位置、パターンID、重要度を並列の NumPy 配列で保持する。
+カテゴリはパターンIDごとの事前計算テーブルから引き、集計は np.bincount で行う。
+既存コードとの互換のため、分析結果は従来の辞書と同じキーで参照できる（Mapping）。
+"""
+
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterator, Sequence
+
+import numpy as np
+
+# カテゴリ名（配列中はこの順のIDで保持）
+LEGAL_CATEGORIES = ('claim', 'description', 'procedural', 'general')
+CHEMICAL_CATEGORIES = ('organic_molecular', 'inorganic_compound', 'polymer',
+                       'reaction', 'property', 'condition')
+
+# 重要度 (0: 通常, 1: 重要, 2: クリティカル) ごとの品質スコア重み
+LEGAL_IMPORTANCE_WEIGHTS = np.array([0.3, 0.6, 1.0])
+
+# 化学カテゴリごとの複雑度重み
+CHEMICAL_COMPLEXITY_WEIGHTS = np.array([0.3, 0.2, 0.4, 0.5, 0.1, 0.1])
+
+# 化学エンティティの正規表現パターン（CHEMICAL_CATEGORIES と同じ順のカテゴリごと）
+# パターンIDはこの定義順の位置（CHEMICAL_PATTERNS のインデックス）で、プロセス・実行をまたいで同じ値になる
+CHEMICAL_PATTERN_GROUPS = (
+    # 有機化合物の分子式（C07分野中心）
+    (
+        r'C\d{1,3}H\d{1,3}(?:O\d{1,2})?(?:N\d{1,2})?(?:S\d{1,2})?(?:P\d{1,2})?(?:Cl\d{1,2})?(?:Br\d{1,2})?(?:F\d{1,2})?(?:I\d{1,2})?',
+        r'(?:CH₃|CH₂|CH|C)(?:[-–](?:CH₃|CH₂|CH|C))*',  # 構造式表記
+        r'R₁|R₂|R₃|R₄|X|Y|Z',  # 化学式中の置換基表記
+    ),
+    # 無機化合物（C01分野中心）
+    (
+        r'H₂SO₄|HCl|HNO₃|H₃PO₄|NH₃|NaOH|KOH|Ca\(OH\)₂',  # 主要酸・塩基
+        r'NaCl|KCl|CaCl₂|MgSO₄|Na₂CO₃|K₂CO₃|NaHCO₃',  # 主要塩類
+        r'TiO₂|SiO₂|Al₂O₃|Fe₂O₃|CuO|ZnO|MgO|CaO',  # 金属酸化物
+        r'[A-Z][a-z]?(?:\d+)?(?:[+-]\d*)?',  # 元素記号＋イオン
+    ),
+    # 高分子化合物（C08分野）
+    (
+        r'\[-(?:CH₂[-–]CH₂[-–]|CH₂[-–]CHR[-–]|CH₂[-–]CR₂[-–])+\]ₙ',  # ポリマー表記
+        r'(?:PE|PP|PS|PVC|PET|PMMA|PA|PC|PU|PTFE)',  # 高分子略号
+        r'Mw\s*[=:]\s*\d+(?:[,，]\d+)*|Mn\s*[=:]\s*\d+(?:[,，]\d+)*',  # 分子量
+        r'重合度\s*[=:]\s*\d+(?:[,，]\d+)*',
+    ),
+    # 化学反応式
+    (
+        r'[A-Z][a-z]?\d*(?:\s*[+＋]\s*[A-Z][a-z]?\d*)*\s*[→⇒]\s*[A-Z][a-z]?\d*(?:\s*[+＋]\s*[A-Z][a-z]?\d*)*',
+        r'[A-Z][a-z]?\d*\s*[⇌⇔]\s*[A-Z][a-z]?\d*',  # 平衡反応
+        r'[A-Z][a-z]?\d*\s*[→⇒]\s*[A-Z][a-z]?\d*\s*/\s*[A-Z][a-z]?',  # 触媒反応
+    ),
+    # 化学的性質・数値
+    (
+        r'融点\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?\s*℃',
+        r'沸点\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?\s*℃',
+        r'\d+(?:\.\d+)?\s*(?:wt%|重量%|質量%|mol%|体積%|重量％|質量％|体積％)',
+        r'純度\s*[=:：]?\s*\d+(?:\.\d+)?\s*%以上',
+        r'pH\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?',
+        r'pKa\s*[=:：]?\s*\d+(?:\.\d+)?',
+        r'収率\s*[=:：]?\s*\d+(?:\.\d+)?\s*%',
+        r'選択性\s*[=:：]?\s*\d+(?:\.\d+)?\s*%',
+    ),
+    # 実験条件・装置
+    (
+        r'\d+(?:\.\d+)?\s*℃(?:で|にて|において|に|下で)',
+        r'\d+(?:\.\d+)?\s*(?:MPa|kPa|mmHg|Torr|Pa|atm)(?:で|にて|において|に|下で)',
+        r'\d+(?:\.\d+)?\s*(?:時間|分|秒|hr|min|sec)(?:反応させ|加熱し|撹拌し|処理し)',
+        r'(?:オートクレーブ|反応器|蒸留塔|分離塔|カラム|反応釜)(?:中で|内で|にて)',
+    ),
+)
+CHEMICAL_PATTERNS = tuple(pattern for patterns in CHEMICAL_PATTERN_GROUPS for pattern in patterns)
+
+
+def _copy_value(value: Any) -> Any:
+    """保持している集計値のコピー（呼び出し側で変更しても保持している集計結果に影響しないよう辞書は複製）"""
+    return dict(value) if isinstance(value, dict) else value
+
+
+class LegalAnalysis(Mapping):
+    """法的表現の分析結果（analyze_legal_content の戻り値）"""
+
+    __slots__ = ('text', 'starts', 'ends', 'pattern_ids', 'importance', 'pattern_categories', '_summary')
+
+    _KEYS = ('total_expressions', 'category_counts', 'importance_distribution',
+             'legal_quality_score', 'expressions', 'has_claim_expressions', 'has_critical_expressions')
+
+    def __init__(self, text: str, starts: np.ndarray, ends: np.ndarray, pattern_ids: np.ndarray,
+                 importance: np.ndarray, pattern_categories: np.ndarray):
+        """
+        初期化
+
+        Args:
+            text: 分析対象テキスト（オフセットの参照先。コピーはしない）
+            starts: 開始位置（int32）
+            ends: 終了位置（int32）
+            pattern_ids: all_legal_patterns のインデックス（int16）
+            importance: 重要度（int8）
+            pattern_categories: パターンIDごとのカテゴリIDテーブル（int8）
+        """
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.pattern_ids = pattern_ids
+        self.importance = importance
+        self.pattern_categories = pattern_categories
+        self._summary = None
+
+    @property
+    def categories(self) -> np.ndarray:
+        """マッチごとのカテゴリID"""
+        return self.pattern_categories[self.pattern_ids]
+
+    def category_count_array(self) -> np.ndarray:
+        return np.bincount(self.categories, minlength=len(LEGAL_CATEGORIES))
+
+    def importance_count_array(self) -> np.ndarray:
+        return np.bincount(self.importance, minlength=3)
+
+    def quality_score(self) -> float:
+        """法的品質スコア（0.0-1.0）"""
+        total = len(self.starts)
+        if total == 0:
+            return 0.0
+        total_score = float(self.importance_count_array() @ LEGAL_IMPORTANCE_WEIGHTS)
+        # カテゴリの多様性ボーナス
+        unique_categories = int(np.count_nonzero(self.category_count_array()))
+        diversity_bonus = min(unique_categories * 0.1, 0.3)
+        return round(min((total_score + diversity_bonus) / total, 1.0), 3)
+
+    def expressions(self) -> List[Dict[str, Any]]:
+        """従来形式の表現リスト（必要な場合のみ生成）"""
+        categories = self.categories
+        return [
+            {
+                'text': self.text[start:end],
+                'start': start,
+                'end': end,
+                'importance': importance,
+                'category': LEGAL_CATEGORIES[category],
+                'pattern_index': pattern_id
+            }
+            for start, end, importance, category, pattern_id in zip(
+                self.starts.tolist(), self.ends.tolist(), self.importance.tolist(),
+                categories.tolist(), self.pattern_ids.tolist())
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """表現リストを除く集計結果"""
+        return {key: _copy_value(value) for key, value in self._cached_summary().items()}
+
+    def _cached_summary(self) -> Dict[str, Any]:
+        """集計結果（初回参照時に計算して保持。キー参照ごとの再計算を避ける）"""
+        if self._summary is None:
+            self._summary = self._compute_summary()
+        return self._summary
+
+    def _compute_summary(self) -> Dict[str, Any]:
+        category_counts = self.category_count_array()
+        importance_counts = self.importance_count_array()
+        return {
+            'total_expressions': len(self.starts),
+            'category_counts': {LEGAL_CATEGORIES[i]: int(count)
+                                for i, count in enumerate(category_counts) if count},
+            'importance_distribution': {
+                'critical': int(importance_counts[2]),
+                'important': int(importance_counts[1]),
+                'normal': int(importance_counts[0])
+            },
+            'legal_quality_score': self.quality_score(),
+            'has_claim_expressions': bool(category_counts[0]),
+            'has_critical_expressions': bool(importance_counts[2]),
+        }
+
+    def span_rows(self) -> np.ndarray:
+        """(start, end, importance, category_id, pattern_index) の行列（int32）"""
+        return np.column_stack((self.starts, self.ends, self.importance,
+                                self.categories, self.pattern_ids)).astype(np.int32)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """従来の辞書形式に変換"""
+        return {key: self[key] for key in self._KEYS}
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'expressions':
+            return self.expressions()
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return _copy_value(self._cached_summary()[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
+class ChemicalAnalysis(Mapping):
+    """化学的内容の分析結果（analyze_chemical_content の戻り値）"""
+
+    __slots__ = ('text', 'starts', 'ends', 'pattern_ids', 'pattern_categories', 'patterns', '_summary')
+
+    _KEYS = ('enabled', 'total_entities', 'unique_formulas', 'category_counts',
+             'complexity_score', 'entities', 'unique_formulas_list')
+
+    def __init__(self, text: str, starts: np.ndarray, ends: np.ndarray, pattern_ids: np.ndarray,
+                 pattern_categories: np.ndarray, patterns: Sequence[str]):
+        """
+        初期化
+
+        Args:
+            text: 分析対象テキスト（オフセットの参照先。コピーはしない）
+            starts: 開始位置（int32）
+            ends: 終了位置（int32）
+            pattern_ids: all_chemical_patterns のインデックス（int16）
+            pattern_categories: パターンIDごとのカテゴリIDテーブル（int8）
+            patterns: パターン文字列のリスト（all_chemical_patterns）
+        """
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.pattern_ids = pattern_ids
+        self.pattern_categories = pattern_categories
+        self.patterns = patterns
+        self._summary = None
+
+    @property
+    def categories(self) -> np.ndarray:
+        """エンティティごとのカテゴリID"""
+        return self.pattern_categories[self.pattern_ids]
+
+    def category_count_array(self) -> np.ndarray:
+        return np.bincount(self.categories, minlength=len(CHEMICAL_CATEGORIES))
+
+    def unique_formulas_list(self) -> List[str]:
+        return list(set(self.text[start:end] for start, end in zip(self.starts.tolist(), self.ends.tolist())))
+
+    def complexity_score(self) -> float:
+        """化学的複雑度スコア（0.0-1.0）"""
+        total = len(self.starts)
+        if total == 0:
+            return 0.0
+        # テキスト長による追加重み
+        length_factor = np.minimum((self.ends - self.starts) / 20.0, 1.0)
+        total_score = float(np.sum(CHEMICAL_COMPLEXITY_WEIGHTS[self.categories] * (1.0 + length_factor)))
+        return round(min(total_score / total, 1.0), 3)
+
+    def entities(self) -> List[Dict[str, Any]]:
+        """従来形式のエンティティリスト（必要な場合のみ生成）"""
+        return [
+            {
+                'text': self.text[start:end],
+                'category': CHEMICAL_CATEGORIES[category],
+                'start': start,
+                'end': end,
+                'pattern': self.patterns[pattern_id]
+            }
+            for start, end, category, pattern_id in zip(
+                self.starts.tolist(), self.ends.tolist(),
+                self.categories.tolist(), self.pattern_ids.tolist())
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """エンティティリストを除く集計結果"""
+        return {key: _copy_value(value) for key, value in self._cached_summary().items()}
+
+    def _cached_summary(self) -> Dict[str, Any]:
+        """集計結果（初回参照時に計算して保持。キー参照ごとの再計算を避ける）"""
+        if self._summary is None:
+            self._summary = self._compute_summary()
+        return self._summary
+
+    def _compute_summary(self) -> Dict[str, Any]:
+        category_counts = self.category_count_array()
+        return {
+            'enabled': True,
+            'total_entities': len(self.starts),
+            'unique_formulas': len(self.unique_formulas_list()),
+            'category_counts': {CHEMICAL_CATEGORIES[i]: int(count)
+                                for i, count in enumerate(category_counts) if count},
+            'complexity_score': self.complexity_score(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """従来の辞書形式に変換"""
+        return {key: self[key] for key in self._KEYS}
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'entities':
+            return self.entities()
+        if key == 'unique_formulas_list':
+            return self.unique_formulas_list()
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return _copy_value(self._cached_summary()[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
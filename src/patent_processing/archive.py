@@ -0,0 +1,221 @@
+"""
+JPB 発行分アーカイブ（.zip / .tar / .tar.gz）の直接読み込み
+
+アーカイブを展開せずに、メンバーのストリームをそのまま XML パーサに渡す。
+メンバーはアーカイブのパス・メンバー名・データ位置だけを持つ ArchiveMember で表し、
+pickle してワーカープロセス・スレッドに渡せる。
+
+- .tar: メンバーのデータ開始位置（offset_data）とサイズを保持し、os.pread で直接読み込む
+- .zip: プロセスごとに1回だけ中央ディレクトリを読み込んだ ZipFile から、メンバー単位で伸長しながら読み込む
+- .tar.gz / .tgz: ランダムアクセスできないため、先頭から順にストリーム処理する（iter_archive のみ）
+"""
+
+import io
+import logging
+import os
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar',)
+COMPRESSED_TAR_SUFFIXES = ('.tar.gz', '.tgz')
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES + COMPRESSED_TAR_SUFFIXES
+
+# プロセスごとに開いたアーカイブのハンドル（fork 後に親のファイル位置を共有しないよう pid 単位）
+_open_handles: Dict[Tuple[int, str], Union[zipfile.ZipFile, int]] = {}
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """対応するアーカイブ形式のファイルかどうか（拡張子で判定）"""
+    name = str(path).lower()
+    return name.endswith(ARCHIVE_SUFFIXES) and Path(path).is_file()
+
+
+def _archive_kind(archive_path: str) -> str:
+    name = archive_path.lower()
+    if name.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if name.endswith(COMPRESSED_TAR_SUFFIXES):
+        return 'tar.gz'
+    if name.endswith(TAR_SUFFIXES):
+        return 'tar'
+    raise ValueError(f"対応していないアーカイブ形式です: {archive_path}")
+
+
+class ArchiveMember:
+    """アーカイブ内のXMLファイル（展開せずに読み込むための位置情報）"""
+
+    __slots__ = ('archive_path', 'name', 'size', 'offset')
+
+    def __init__(self, archive_path: str, name: str, size: int, offset: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            archive_path: アーカイブのパス
+            name: アーカイブ内のメンバー名（/ 区切りの相対パス）
+            size: 展開後のバイト数
+            offset: データ位置（.tar はデータ開始位置、.zip はローカルヘッダ位置、.tar.gz はNone）
+        """
+        self.archive_path = archive_path
+        self.name = name
+        self.size = size
+        self.offset = offset
+
+    @property
+    def file_name(self) -> str:
+        """メンバーのファイル名"""
+        return PurePosixPath(self.name).name
+
+    @property
+    def path(self) -> str:
+        """表示・記録用のパス（アーカイブのパス/メンバー名）"""
+        return f"{self.archive_path}/{self.name}"
+
+    def open(self) -> BinaryIO:
+        """
+        メンバーをバイナリストリームとして開く
+
+        Returns:
+            読み込み用のバイナリストリーム
+
+        Raises:
+            ValueError: ランダムアクセスできないアーカイブ（.tar.gz）の場合
+        """
+        return open_member(self)
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember({self.path!r}, size={self.size})"
+
+
+def list_members(archive_path: Union[str, Path], suffix: str = '.xml') -> List[ArchiveMember]:
+    """
+    アーカイブ内のXMLメンバーを列挙（アーカイブ内の格納順）
+
+    Args:
+        archive_path: アーカイブのパス
+        suffix: 対象とするメンバーの拡張子
+
+    Returns:
+        ArchiveMember のリスト（.tar.gz は全体を1回伸長して列挙する）
+    """
+    archive_path = str(archive_path)
+    kind = _archive_kind(archive_path)
+
+    if kind == 'zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            return [
+                ArchiveMember(archive_path, info.filename, info.file_size, info.header_offset)
+                for info in archive.infolist()
+                if not info.is_dir() and info.filename.endswith(suffix)
+            ]
+
+    with tarfile.open(archive_path, 'r:' if kind == 'tar' else 'r|gz') as archive:
+        return [
+            ArchiveMember(archive_path, _tar_member_name(info), info.size,
+                          info.offset_data if kind == 'tar' else None)
+            for info in archive
+            if info.isfile() and info.name.endswith(suffix)
+        ]
+
+
+def _tar_member_name(info: tarfile.TarInfo) -> str:
+    """tar のメンバー名を正規化（`tar cf x.tar .` で付く先頭の ./ を除去）"""
+    return PurePosixPath(info.name).as_posix()
+
+
+def _handle(archive_path: str, kind: str):
+    key = (os.getpid(), archive_path)
+    handle = _open_handles.get(key)
+    if handle is None:
+        # zip は中央ディレクトリの読み込みをプロセスごとに1回に抑える。tar は pread 用の fd を保持
+        handle = zipfile.ZipFile(archive_path) if kind == 'zip' else os.open(archive_path, os.O_RDONLY)
+        _open_handles[key] = handle
+    return handle
+
+
+def close_archives() -> None:
+    """
+    open_member で開いたアーカイブのハンドル（ZipFile・pread 用の fd）を全て閉じる
+
+    fork で親プロセスから引き継いだハンドルも閉じる（子プロセス側の複製のみ閉じられる）。
+    process_xml_files が入力の処理を終えた時点で呼び出す。次の open_member で再び開かれる。
+    """
+    while _open_handles:
+        _, handle = _open_handles.popitem()
+        try:
+            if isinstance(handle, int):
+                os.close(handle)
+            else:
+                handle.close()
+        except OSError as e:
+            logger.debug(f"アーカイブのハンドルを閉じる際のエラー: {e}")
+
+
+def open_member(member: ArchiveMember) -> BinaryIO:
+    """
+    メンバーをバイナリストリームとして開く（他のメンバーを読まずにデータ位置から直接読み込む）
+
+    Args:
+        member: list_members で取得したメンバー
+
+    Returns:
+        読み込み用のバイナリストリーム
+    """
+    kind = _archive_kind(member.archive_path)
+    if member.offset is None or kind == 'tar.gz':
+        raise ValueError(f"圧縮tarはメンバー単位で読み込めません（iter_archive を使用）: {member.archive_path}")
+
+    handle = _handle(member.archive_path, kind)
+    if kind == 'zip':
+        # ZipFile はスレッド間でファイル位置を排他制御するため、同一プロセス内の並列読み込みも可
+        return handle.open(handle.getinfo(member.name))
+
+    # pread はファイル位置を変更しないため、スレッド間で fd を共有できる
+    # BytesIO は読み込んだ bytes をコピーせずに参照する
+    return io.BytesIO(os.pread(handle, member.size, member.offset))
+
+
+def iter_archive(archive_path: Union[str, Path], suffix: str = '.xml',
+                 members: Optional[List[ArchiveMember]] = None) -> Iterator[Tuple[ArchiveMember, BinaryIO]]:
+    """
+    アーカイブのXMLメンバーを格納順にストリームとして列挙
+
+    .tar.gz は先頭から1回だけ伸長しながら順に返す（ストリームは次のメンバーに進むまで有効）。
+
+    Args:
+        archive_path: アーカイブのパス
+        suffix: 対象とするメンバーの拡張子
+        members: 処理対象のメンバー（Noneの場合は全メンバー。シャード分割時に指定）
+
+    Yields:
+        (メンバー, バイナリストリーム) の組
+    """
+    archive_path = str(archive_path)
+    kind = _archive_kind(archive_path)
+
+    if kind != 'tar.gz':
+        for member in members if members is not None else list_members(archive_path, suffix):
+            with open_member(member) as stream:
+                yield member, stream
+        return
+
+    wanted = None if members is None else {member.name for member in members}
+    with tarfile.open(archive_path, 'r|gz') as archive:
+        for info in archive:
+            if not (info.isfile() and info.name.endswith(suffix)):
+                continue
+            name = _tar_member_name(info)
+            if wanted is not None and name not in wanted:
+                continue
+            stream = archive.extractfile(info)
+            if stream is None:
+                continue
+            yield ArchiveMember(archive_path, name, info.size), stream
@@ -0,0 +1,237 @@
+"""
+一括処理のチェックポイント・再開機能
+
+処理済みレコードを追記専用のJSONLパートファイルへ定期的に書き出し、
+どの入力ファイルが完了したかを進捗ジャーナル（progress.jsonl）に記録する。
+ジャーナルはレコードの書き込み・fsync 後に追記するため、ジャーナルに載っている
+ファイルのレコードは必ずパートファイル内に完全な行として存在する。
+パートファイルは gzip 圧縮（records-NNNNN.jsonl.gz）でも書き出せる。
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "progress.jsonl"
+PART_FILE_FORMAT = "records-{:05d}.jsonl"
+PART_FILE_GLOB = "records-*.jsonl*"
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz"}
+
+# ジャーナルのステータス
+STATUS_OK = "ok"          # レコードをパートファイルに書き込み済み
+STATUS_EMPTY = "empty"    # 解析結果が空（レコードなし）
+STATUS_ERROR = "error"    # 処理エラー（再開時も再処理しない）
+
+
+class CheckpointWriter:
+    """処理済みレコードの定期チェックポイント書き込みクラス"""
+
+    def __init__(self, checkpoint_dir: str, resume: bool = False, flush_every: int = 100,
+                 flush_interval: float = 60.0, records_per_part: int = 5000,
+                 compression: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            checkpoint_dir: チェックポイントの出力ディレクトリ
+            resume: Trueの場合は既存のチェックポイントを引き継ぐ。Falseの場合は既存分を破棄する
+            flush_every: 書き出しを行うバッファ件数
+            flush_interval: 書き出しを行う経過秒数（件数に達していなくても書き出す）
+            records_per_part: 1パートファイルあたりの最大レコード数
+            compression: パートファイルの圧縮形式（None or "gzip"）
+        """
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"サポートされていない圧縮形式です: {compression!r}")
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records_per_part = records_per_part
+        self.part_suffix = COMPRESSION_SUFFIXES[compression]
+
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.checkpoint_dir / JOURNAL_FILE
+
+        if not resume:
+            self._clear()
+
+        # ファイル → (ステータス, パートファイル名)
+        self.completed: Dict[str, Tuple[str, Optional[str]]] = self._read_journal()
+
+        self._buffer: List[Tuple[str, str, Optional[str]]] = []
+        self._last_flush = time.monotonic()
+        # 再開時は常に新しいパートファイルから書き始める（途中で切れた行の後ろに追記しない）
+        self._part_index = len(list(self.checkpoint_dir.glob(PART_FILE_GLOB)))
+        self._part_count = 0
+
+    def _clear(self) -> None:
+        """既存のチェックポイントを削除"""
+        removed = 0
+        for path in list(self.checkpoint_dir.glob(PART_FILE_GLOB)) + [self.journal_path]:
+            if path.exists():
+                path.unlink()
+                removed += 1
+        if removed:
+            logger.info(f"既存のチェックポイントを破棄: {self.checkpoint_dir}")
+
+    def _read_journal(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """進捗ジャーナルを読み込み（途中で切れた最終行は無視）"""
+        completed = {}
+        if not self.journal_path.exists():
+            return completed
+        self._truncate_partial_line(self.journal_path)
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[entry['file']] = (entry['status'], entry.get('part'))
+        return completed
+
+    @staticmethod
+    def _truncate_partial_line(path: Path) -> None:
+        """クラッシュで途中まで書かれた最終行を切り詰める（以降の追記が壊れた行に連結されないように）"""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+                logger.warning(f"途中で切れた行を削除: {path}")
+
+    def is_completed(self, file_key: str) -> bool:
+        """ファイルが処理済みかどうか"""
+        return file_key in self.completed
+
+    def add(self, file_key: str, record: Optional[Dict[str, Any]], status: str = STATUS_OK) -> None:
+        """
+        処理結果を追加（一定件数・一定時間ごとに書き出し）
+
+        Args:
+            file_key: 入力ファイルの識別子（入力ディレクトリからの相対パス）
+            record: JSONシリアライズ可能なレコード（empty/error の場合はNone）
+            status: ステータス
+        """
+        line = None
+        if record is not None:
+            line = json.dumps({'file': file_key, 'record': record}, ensure_ascii=False)
+        self._buffer.append((file_key, status, line))
+        if (len(self._buffer) >= self.flush_every or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """バッファをパートファイルに書き出し、fsync 後にジャーナルへ記録"""
+        if not self._buffer:
+            return
+
+        journal_entries = []
+        part_file = None
+        handle = None
+        try:
+            for file_key, status, line in self._buffer:
+                part_name = None
+                if line is not None:
+                    if handle is None or self._part_count >= self.records_per_part:
+                        if handle is not None:
+                            self._sync_close(handle, part_file)
+                        if self._part_count >= self.records_per_part:
+                            self._part_index += 1
+                            self._part_count = 0
+                        part_file = self.checkpoint_dir / (PART_FILE_FORMAT.format(self._part_index) +
+                                                           self.part_suffix)
+                        handle = _open_part(part_file, 'a')
+                    handle.write(line + '\n')
+                    self._part_count += 1
+                    part_name = part_file.name
+                journal_entries.append({'file': file_key, 'status': status, 'part': part_name})
+        finally:
+            if handle is not None:
+                self._sync_close(handle, part_file)
+
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            for entry in journal_entries:
+                journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self.completed[entry['file']] = (entry['status'], entry['part'])
+            journal.flush()
+            os.fsync(journal.fileno())
+
+        logger.info(f"チェックポイント書き出し: {len(journal_entries)}件 (累計: {len(self.completed)}件)")
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _sync_close(handle, path: Path) -> None:
+        # gzip はクローズ時に末尾（CRC・サイズ）を書き込むため、クローズ後に fsync する
+        handle.close()
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        """残りのバッファを書き出して終了"""
+        self.flush()
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        ジャーナルで完了済みのレコードを (ファイル識別子, レコード) の組で読み込み
+
+        パートファイル内の行のうち、ジャーナルに記録されたファイル・パートの組のものだけを返す
+        （ジャーナル記録前にクラッシュした書きかけの行や、再処理前の古い行は除外される）。
+        """
+        expected_parts = {
+            file_key: part for file_key, (status, part) in self.completed.items()
+            if status == STATUS_OK and part
+        }
+        seen = set()
+        for part in sorted(set(expected_parts.values())):
+            for line in _read_part_lines(self.checkpoint_dir / part):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                file_key = entry['file']
+                if expected_parts.get(file_key) == part and file_key not in seen:
+                    seen.add(file_key)
+                    yield file_key, entry['record']
+
+
+def _open_part(path: Path, mode: str):
+    """パートファイルを開く（拡張子 .gz の場合は gzip。追記ごとに gzip メンバーが増える）"""
+    if path.suffix == '.gz':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _read_part_lines(path: Path) -> Iterator[str]:
+    """パートファイルの行を読み込み（クラッシュで途中まで書かれた gzip メンバー以降は無視）"""
+    with _open_part(path, 'r') as f:
+        try:
+            yield from f
+        except (EOFError, gzip.BadGzipFile):
+            logger.warning(f"途中で切れたパートファイル: {path}")
+
+
+def checkpoint_options(performance) -> Dict[str, Any]:
+    """
+    性能設定（config の performance セクション）から CheckpointWriter の引数を作成
+
+    Args:
+        performance: PerformanceConfig（Noneの場合は既定値）
+
+    Returns:
+        CheckpointWriter のキーワード引数
+    """
+    if performance is None:
+        return {}
+    return {
+        'flush_every': performance.checkpoint_every,
+        'records_per_part': performance.shard_size,
+        'compression': performance.compression,
+    }
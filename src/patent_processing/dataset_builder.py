@@ -0,0 +1,416 @@
+"""
+1回の走査で複数形式の学習データセットを作成
+
+PatentTextProcessor が解析した特許データ（または作成済みの ChatML データ）を1件ずつ受け取り、
+実施形態の段落分割を1回だけ行って、登録した出力先（シンク）ごとの形式で逐次書き出す。
+
+- ChatMLSink: 請求項 → 実施形態全文の ChatML
+- ParagraphUnitSink: 段落単位の ChatML（Option 1）
+- ConversationSink: 段落ごとの会話履歴形式（Option 2）
+
+シンクは write / close / count を持つ任意のライター（JSONArrayWriter 等）に書き出す。
+途中でエラーが発生した場合は書き出し先を破棄（abort を持つライターの場合）する。
+シンクごとに処理する特許数の上限を指定できる。定型段落の除外に使用する段落頻度インデックスは
+build_paragraph_index で作成する。
+"""
+
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .paragraph_index import ParagraphFrequencyIndex
+from .patent_ids import digest_patent_id, get_patent_id
+
+logger = logging.getLogger(__name__)
+
+# 定型段落とみなす出現文書数
+BOILERPLATE_THRESHOLD = 20
+
+# 段落番号【XXXX】
+PARAGRAPH_NUMBER_PATTERN = re.compile(r'【\d{4}】')
+
+# ChatML の user / assistant の定型部分
+CLAIMS_PROMPT_PREFIX = "以下の特許請求の範囲に基づいて、発明を実施するための形態を説明してください：\n\n"
+DESCRIPTION_HEADER = "【発明を実施するための形態】\n\n"
+
+CHATML_SYSTEM_PROMPT = "あなたは特許文書の専門家です。与えられた特許請求の範囲に基づいて、その発明を実施するための具体的な形態を詳しく説明してください。"
+PARAGRAPH_SYSTEM_PROMPT = "あなたは特許文書の専門家です。与えられた特許請求の範囲と文脈に基づいて、指定された段落番号の実施形態を生成してください。"
+CONVERSATION_SYSTEM_PROMPT = "あなたは特許文書の専門家です。ユーザーの請求項に基づいて、実施形態を段落ごとに対話形式で生成してください。ユーザーが「次へ」と言ったら次の段落を生成してください。"
+
+
+def split_into_paragraphs(text: str) -> List[Dict[str, str]]:
+    """
+    段落番号【XXXX】でテキストを分割
+
+    最初の段落番号より前のテキストと、内容のない段落番号は含めない。
+
+    Args:
+        text: 段落番号付きの実施形態テキスト
+
+    Returns:
+        段落のリスト（'number': 段落番号、'content': 前後の空白を除いた段落の内容）
+    """
+    if not text:
+        return []
+
+    result = []
+    number = None
+    start = 0
+    for match in PARAGRAPH_NUMBER_PATTERN.finditer(text):
+        if number and match.start() > start:
+            result.append({'number': number, 'content': text[start:match.start()].strip()})
+        number = match.group()
+        start = match.end()
+    if number and len(text) > start:
+        result.append({'number': number, 'content': text[start:].strip()})
+    return result
+
+
+class PatentDocument:
+    """データセット作成に使用する1特許分の請求項・実施形態"""
+
+    __slots__ = ('patent_id', 'claims_text', 'claims_count', 'description', 'paragraphs')
+
+    def __init__(self, patent_id: str, claims_text: str, claims_count: int, description: str):
+        """
+        初期化
+
+        Args:
+            patent_id: 特許ID
+            claims_text: 【請求項N】付きで連結した請求項テキスト
+            claims_count: 請求項数
+            description: 段落番号付きの実施形態テキスト
+        """
+        self.patent_id = patent_id
+        self.claims_text = claims_text
+        self.claims_count = claims_count
+        self.description = description
+        # 段落分割の結果（DatasetBuilder が1回だけ設定し、各シンクで共有する）
+        self.paragraphs: Optional[List[Dict[str, str]]] = None
+
+    @classmethod
+    def from_patent(cls, patent_data: Dict[str, Any]) -> Optional['PatentDocument']:
+        """
+        解析済みの特許データ（PatentTextProcessor.parse_xml_file の出力形式）から作成
+
+        Returns:
+            請求項と実施形態の両方がある場合は PatentDocument、それ以外はNone
+        """
+        claims = patent_data.get('claims') or []
+        description = patent_data.get('detailed_description') or ''
+        if not description.strip() or not claims:
+            return None
+
+        # 全請求項をまとめる
+        claims_text = ''.join(
+            f"【請求項{claim.get('claim_number', '')}】\n{claim.get('claim_text', '')}\n\n"
+            for claim in claims if claim.get('claim_text', '').strip()
+        ).strip()
+        if not claims_text:
+            return None
+
+        return cls(get_patent_id(patent_data), claims_text, len(claims), description)
+
+    @classmethod
+    def from_chatml(cls, record: Dict[str, Any]) -> Optional['PatentDocument']:
+        """
+        ChatMLSink の出力形式のレコードから作成
+
+        Returns:
+            user・assistant の両方がある場合は PatentDocument、それ以外はNone
+        """
+        user_content = None
+        assistant_content = None
+        for message in record['messages']:
+            if message['role'] == 'user':
+                user_content = message['content']
+            elif message['role'] == 'assistant':
+                assistant_content = message['content']
+
+        if not user_content or not assistant_content:
+            return None
+
+        metadata = record['metadata']
+        claims_text = user_content.replace(CLAIMS_PROMPT_PREFIX, "")
+        description = assistant_content.replace(DESCRIPTION_HEADER, "")
+        # 特許IDのない旧形式のデータは内容のダイジェストをIDにする（実行ごとに同じ値）
+        patent_id = metadata.get('patent_id') or digest_patent_id(claims_text, description)
+        return cls(patent_id, claims_text, metadata['claims_count'], description)
+
+
+class DatasetSink(ABC):
+    """
+    データセット形式ごとの出力先（基底クラス）
+
+    サブクラスは records で1特許分のレコードを生成する。
+    段落分割の結果を使用するシンクは uses_paragraphs を True にする。
+    """
+
+    name = 'dataset'
+    uses_paragraphs = False
+
+    def __init__(self, writer, max_documents: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            writer: レコードの書き出し先（write・close・count を持つもの。例: JSONArrayWriter）
+            max_documents: 処理する特許数の上限（Noneの場合は全件）
+        """
+        self.writer = writer
+        self.max_documents = max_documents
+        self.documents = 0
+
+    @property
+    def full(self) -> bool:
+        """上限の特許数を処理済みかどうか"""
+        return self.max_documents is not None and self.documents >= self.max_documents
+
+    @property
+    def count(self) -> int:
+        """書き出したレコード数"""
+        return self.writer.count
+
+    @abstractmethod
+    def records(self, document: PatentDocument) -> Iterable[Dict[str, Any]]:
+        """1特許分のレコードを生成"""
+
+    def write(self, document: PatentDocument) -> bool:
+        """
+        1特許分のレコードを書き出し
+
+        Returns:
+            処理した場合True（上限に達している場合はFalse）
+        """
+        if self.full:
+            return False
+        self.documents += 1
+        for record in self.records(document):
+            self.writer.write(record)
+        return True
+
+    def close(self) -> None:
+        """書き出し先を閉じる"""
+        self.writer.close()
+
+    def abort(self) -> None:
+        """書き出し先を破棄（abort を持たないライターの場合は閉じる）"""
+        abort = getattr(self.writer, 'abort', None)
+        if abort is not None:
+            abort()
+        else:
+            self.writer.close()
+
+    def __enter__(self) -> 'DatasetSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class ChatMLSink(DatasetSink):
+    """請求項 → 実施形態全文の ChatML（1特許=1サンプル）"""
+
+    name = 'chatml'
+
+    def records(self, document: PatentDocument) -> Iterable[Dict[str, Any]]:
+        yield {
+            "messages": [
+                {"role": "system", "content": CHATML_SYSTEM_PROMPT},
+                {"role": "user", "content": f"{CLAIMS_PROMPT_PREFIX}{document.claims_text}"},
+                {"role": "assistant", "content": f"{DESCRIPTION_HEADER}{document.description}"}
+            ],
+            "metadata": {
+                "patent_id": document.patent_id,
+                "claims_count": document.claims_count,
+                "paragraph_numbers_included": True,
+                "created_at": datetime.now().isoformat()
+            }
+        }
+
+
+class ParagraphUnitSink(DatasetSink):
+    """Option 1: 段落単位の ChatML（各段落が独立したペア、前の段落の文脈付き）"""
+
+    name = 'option1_paragraph_unit'
+    uses_paragraphs = True
+
+    def records(self, document: PatentDocument) -> Iterable[Dict[str, Any]]:
+        paragraphs = document.paragraphs
+        for i, paragraph in enumerate(paragraphs):
+            # コンテキスト情報
+            context_info = f"特許番号: {document.patent_id}"
+            if i > 0:
+                # 前の段落の情報を含める
+                prev_context = "\n".join(f"{p['number']}\n{p['content'][:100]}..." for p in paragraphs[:i])
+                context_info += f"\n\n前の段落:\n{prev_context}"
+
+            yield {
+                "messages": [
+                    {"role": "system", "content": PARAGRAPH_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": f"{context_info}\n\n【請求項】\n{document.claims_text}\n\n上記に基づいて{paragraph['number']}の段落を生成してください。"
+                    },
+                    {"role": "assistant", "content": f"{paragraph['number']}\n{paragraph['content']}"}
+                ],
+                "metadata": {
+                    "patent_id": document.patent_id,
+                    "paragraph_number": paragraph['number'],
+                    "paragraph_index": i,
+                    "total_paragraphs": len(paragraphs),
+                    "claims_count": document.claims_count,
+                    "dataset_type": "option1_paragraph_unit",
+                    "created_at": datetime.now().isoformat()
+                }
+            }
+
+
+class ConversationSink(DatasetSink):
+    """Option 2: 段落ごとの会話履歴形式（1特許=1会話、2段落以上の特許のみ）"""
+
+    name = 'option2_conversation'
+    uses_paragraphs = True
+
+    def __init__(self, writer, max_documents: Optional[int] = None):
+        super().__init__(writer, max_documents)
+        self.turns = 0
+
+    def records(self, document: PatentDocument) -> Iterable[Dict[str, Any]]:
+        paragraphs = document.paragraphs
+        if len(paragraphs) < 2:  # 最低2段落必要
+            return
+
+        messages = [
+            {"role": "system", "content": CONVERSATION_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"以下の特許請求の範囲に基づいて、実施形態を段落ごとに生成してください：\n\n{document.claims_text}\n\n最初の段落からお願いします。"
+            },
+            # 最初の段落
+            {"role": "assistant", "content": f"{paragraphs[0]['number']}\n{paragraphs[0]['content']}"}
+        ]
+
+        # 残りの段落を会話として追加
+        for i in range(1, len(paragraphs)):
+            user_request = "最後の段落をお願いします。" if i == len(paragraphs) - 1 else "次の段落をお願いします。"
+            messages.append({"role": "user", "content": user_request})
+            messages.append({"role": "assistant", "content": f"{paragraphs[i]['number']}\n{paragraphs[i]['content']}"})
+
+        self.turns += len(messages)
+        yield {
+            "messages": messages,
+            "metadata": {
+                "patent_id": document.patent_id,
+                "total_paragraphs": len(paragraphs),
+                "conversation_turns": len(messages),
+                "claims_count": document.claims_count,
+                "dataset_type": "option2_conversation",
+                "created_at": datetime.now().isoformat()
+            }
+        }
+
+
+def iter_documents(patents: Iterable[Dict[str, Any]]) -> Iterator[PatentDocument]:
+    """解析済みの特許データのうち、請求項と実施形態の両方があるものを PatentDocument として順に返す"""
+    for patent_data in patents:
+        document = PatentDocument.from_patent(patent_data)
+        if document is not None:
+            yield document
+
+
+def iter_chatml_documents(records: Iterable[Dict[str, Any]]) -> Iterator[PatentDocument]:
+    """ChatML レコード（ChatMLSink の出力形式）を PatentDocument として順に返す"""
+    for record in records:
+        document = PatentDocument.from_chatml(record)
+        if document is not None:
+            yield document
+
+
+def build_paragraph_index(documents: Iterable[PatentDocument], index_path: str,
+                          threshold: int = BOILERPLATE_THRESHOLD) -> ParagraphFrequencyIndex:
+    """
+    段落頻度インデックスを更新して保存（定型段落の検出用）
+
+    登録済みの特許IDの文書はスキップするため、同じ入力で再実行しても出現文書数は増えない。
+
+    Args:
+        documents: 特許の列（iter_chatml_documents の戻り値等）
+        index_path: インデックスファイルのパス（存在する場合は読み込んで更新）
+        threshold: 定型段落とみなす出現文書数
+
+    Returns:
+        更新後の ParagraphFrequencyIndex
+    """
+    paragraph_index = ParagraphFrequencyIndex(index_path, threshold=threshold)
+    for document in documents:
+        paragraphs = split_into_paragraphs(document.description)
+        paragraph_index.update([paragraph['content'] for paragraph in paragraphs], document_id=document.patent_id)
+    paragraph_index.save()
+    return paragraph_index
+
+
+class DatasetBuilder:
+    """特許を1回走査して、登録した全シンクへ書き出す"""
+
+    def __init__(self, sinks: List[DatasetSink], paragraph_index=None):
+        """
+        初期化
+
+        Args:
+            sinks: 出力先のリスト
+            paragraph_index: 定型段落の除外に使用する ParagraphFrequencyIndex（Noneの場合は除外しない）
+        """
+        self.sinks = sinks
+        self.paragraph_index = paragraph_index
+        self.documents = 0
+        self.boilerplate_count = 0
+
+    def add_document(self, document: PatentDocument) -> None:
+        """1特許分を各シンクへ書き出し（段落分割・定型段落の除外は1回だけ行う）"""
+        self.documents += 1
+        if document.paragraphs is None and any(sink.uses_paragraphs and not sink.full for sink in self.sinks):
+            paragraphs = split_into_paragraphs(document.description)
+            if self.paragraph_index is not None:
+                paragraphs, boilerplate_count = self.paragraph_index.filter_paragraphs(paragraphs)
+                self.boilerplate_count += boilerplate_count
+            document.paragraphs = paragraphs
+
+        for sink in self.sinks:
+            sink.write(document)
+
+    def build(self, documents: Iterable[PatentDocument], max_documents: Optional[int] = None) -> Dict[str, int]:
+        """
+        特許を順に各シンクへ書き出し、シンクを閉じる
+
+        全シンクが上限に達した時点で入力の読み込みを終了する。
+
+        Args:
+            documents: 特許の列（iter_documents の戻り値等）
+            max_documents: 処理する特許数の上限（Noneの場合は全件）
+
+        Returns:
+            シンク名 → 書き出したレコード数
+        """
+        try:
+            for document in islice(documents, max_documents):
+                self.add_document(document)
+                if all(sink.full for sink in self.sinks):
+                    break
+        except BaseException:
+            # 途中までの出力を確定させない
+            for sink in self.sinks:
+                sink.abort()
+            raise
+        for sink in self.sinks:
+            sink.close()
+
+        counts = {sink.name: sink.count for sink in self.sinks}
+        logger.info(f"データセット作成完了: {self.documents}件の特許 → {counts}")
+        return counts
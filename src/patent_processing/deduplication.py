@@ -0,0 +1,282 @@
+"""
+特許文書の近似重複検出モジュール
+combined_text の文字シングルに対する MinHash/LSH で
+分割出願・再公表などのほぼ同一な文書を学習データから除外する
+"""
+
+import json
+import logging
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# MinHash 用のメルセンヌ素数（2^31 - 1）: uint64 上で a*x+b が溢れない範囲
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHashDeduplicator:
+    """MinHash/LSH による近似重複検出クラス（ストリーミング・永続インデックス対応）"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 5,
+                 threshold: float = 0.8, seed: int = 42, index_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            num_perm: MinHash の置換数（署名長）
+            bands: LSH のバンド数（num_perm を割り切れること）
+            shingle_size: 文字シングルの長さ
+            threshold: 重複とみなす推定Jaccard類似度
+            seed: 置換パラメータの乱数シード
+            index_path: 永続インデックスのパス（指定時は既存インデックスを読み込む）
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) は bands ({bands}) で割り切れる必要があります")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.seed = seed
+        self.index_path = Path(index_path) if index_path else None
+
+        rng = np.random.RandomState(seed)
+        self._perm_a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._perm_b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+        # インデックス本体
+        self._ids: List[str] = []
+        self._sources: List[str] = []
+        self._signatures: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+        # 今回の実行で除外した文書のクラスタ（代表ID → 除外文書リスト）
+        self.clusters: Dict[str, List[Dict[str, Any]]] = {}
+        self._loaded_count = 0
+
+        if self.index_path and self.index_path.exists():
+            self.load(self.index_path)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """文字シングルの32bitハッシュ集合を作成"""
+        text = re.sub(r'\s+', '', text)
+        k = self.shingle_size
+        if len(text) <= k:
+            shingles = {text} if text else set()
+        else:
+            shingles = {text[i:i + k] for i in range(len(text) - k + 1)}
+        return np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+
+    def signature(self, text: str, block_size: int = 4096) -> np.ndarray:
+        """
+        MinHash 署名を計算
+
+        Args:
+            text: 入力テキスト
+            block_size: 一度に処理するシングル数（メモリ使用量の上限）
+
+        Returns:
+            長さ num_perm の署名配列
+        """
+        hashes = self._shingle_hashes(text) % MERSENNE_PRIME
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+
+        for start in range(0, len(hashes), block_size):
+            block = hashes[start:start + block_size]
+            permuted = (self._perm_a[:, None] * block[None, :] + self._perm_b[:, None]) % MERSENNE_PRIME
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+
+        return signature
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        """署名をバンドに分割したLSHバケットキー"""
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[int, float]]:
+        """
+        インデックス内で最も類似した文書を検索
+
+        Returns:
+            (インデックス位置, 推定Jaccard類似度)。閾値以上の候補がない場合はNone
+        """
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best = None
+        for position in candidates:
+            similarity = float(np.mean(self._signatures[position] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (position, similarity)
+        return best
+
+    def _insert(self, patent_id: str, source: str, signature: np.ndarray) -> None:
+        position = len(self._ids)
+        self._ids.append(patent_id)
+        self._sources.append(source)
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(position)
+
+    def add(self, patent_id: str, text: str, source: str = "") -> Optional[str]:
+        """
+        文書をストリーミングで追加
+
+        Args:
+            patent_id: 特許ID
+            text: 比較対象テキスト（combined_text）
+            source: 出典（XMLファイルパス等、レポート用）
+
+        Returns:
+            重複と判定された場合は代表文書のID、新規文書の場合はNone
+        """
+        signature = self.signature(text)
+        match = self.query(signature)
+
+        if match is not None:
+            position, similarity = match
+            representative = self._ids[position]
+            if representative == patent_id:
+                # 同一リリースの再処理（既にインデックス済みの文書）
+                return None
+            self.clusters.setdefault(representative, []).append({
+                'patent_id': patent_id,
+                'source': source,
+                'similarity': round(similarity, 3),
+                'representative_source': self._sources[position],
+                'representative_from_previous_release': position < self._loaded_count,
+            })
+            return representative
+
+        self._insert(patent_id, source, signature)
+        return None
+
+    def deduplicate_records(self, records: Iterable[Dict[str, Any]], text_field: str = 'combined_text',
+                            id_field: str = 'patent_id') -> List[Dict[str, Any]]:
+        """
+        レコード列から近似重複を除外
+
+        Args:
+            records: 特許データ辞書の列
+            text_field: 比較に使用するフィールド
+            id_field: 特許IDのフィールド
+
+        Returns:
+            重複を除いたレコードのリスト（比較テキストが空のレコードは判定せずにそのまま残す）
+        """
+        return list(self.iter_deduplicated(records, text_field=text_field, id_field=id_field))
+
+    def iter_deduplicated(self, records: Iterable[Dict[str, Any]], text_field: str = 'combined_text',
+                          id_field: str = 'patent_id') -> Iterator[Dict[str, Any]]:
+        """
+        レコード列から近似重複を除外しながら順に返す（レコードを保持しない）
+
+        Args:
+            records: 特許データ辞書の列
+            text_field: 比較に使用するフィールド
+            id_field: 特許IDのフィールド
+
+        Yields:
+            重複でないレコード（比較テキストが空のレコードは判定せずにそのまま返す）
+        """
+        for record in records:
+            patent_id = record.get(id_field) or record.get('file_name', '')
+            text = record.get(text_field, '') or ''
+            if not text.strip():
+                # 空テキストの署名はすべて同じ値になり、互いに重複と判定されるためインデックスに加えない
+                logger.debug(f"比較テキストが空のため重複判定をスキップ: {patent_id}")
+                yield record
+                continue
+            duplicate_of = self.add(str(patent_id), text, source=record.get('xml_file_path', ''))
+            if duplicate_of is None:
+                yield record
+            else:
+                logger.info(f"近似重複を除外: {patent_id} (代表: {duplicate_of})")
+
+    def save(self, index_path: Optional[str] = None) -> None:
+        """署名インデックスを保存（次回リリース処理時に再利用）"""
+        path = Path(index_path) if index_path else self.index_path
+        if path is None:
+            raise ValueError("インデックスの保存先が指定されていません")
+
+        index_data = {
+            'params': {
+                'num_perm': self.num_perm,
+                'bands': self.bands,
+                'shingle_size': self.shingle_size,
+                'seed': self.seed,
+            },
+            'updated_at': datetime.now().isoformat(),
+            'entries': [
+                {'patent_id': patent_id, 'source': source, 'signature': signature.tolist()}
+                for patent_id, source, signature in zip(self._ids, self._sources, self._signatures)
+            ]
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index_data, f, ensure_ascii=False)
+
+        logger.info(f"MinHashインデックスを保存: {path} ({len(self._ids)}件)")
+
+    def load(self, index_path: str) -> None:
+        """保存済みの署名インデックスを読み込み"""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index_data = json.load(f)
+
+        params = index_data.get('params', {})
+        current = {'num_perm': self.num_perm, 'bands': self.bands,
+                   'shingle_size': self.shingle_size, 'seed': self.seed}
+        if params != current:
+            raise ValueError(f"インデックスのパラメータが一致しません: {params} != {current}")
+
+        for entry in index_data.get('entries', []):
+            self._insert(entry['patent_id'], entry.get('source', ''),
+                         np.asarray(entry['signature'], dtype=np.uint64))
+        self._loaded_count = len(self._ids)
+
+        logger.info(f"MinHashインデックスを読み込み: {index_path} ({self._loaded_count}件)")
+
+    def write_report(self, report_path: str) -> Dict[str, Any]:
+        """
+        重複クラスタレポートを出力
+
+        Args:
+            report_path: レポート出力先パス
+
+        Returns:
+            レポート辞書
+        """
+        dropped = sum(len(members) for members in self.clusters.values())
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'shingle_size': self.shingle_size,
+            'indexed_documents': len(self._ids),
+            'dropped_documents': dropped,
+            'clusters': [
+                {'representative': representative, 'dropped': members}
+                for representative, members in self.clusters.items()
+            ]
+        }
+
+        output_path = Path(report_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"重複クラスタレポートを出力しました: {output_path} (除外: {dropped}件)")
+        return report
@@ -0,0 +1,264 @@
+"""
+実施形態生成品質（patent_implementation_quality）の評価モジュール
+
+請求項側のn-gram・法的表現インデックスを特許ごとに一度だけ構築し、
+生成候補をインクリメンタルにスコアリングする（best-of-N サンプリングの再ランキング用）
+"""
+
+import re
+from typing import List, Optional, Dict, Any, Tuple, Set
+
+# 評価メトリクス名（EvaluationConfig.metrics で指定される名前）
+METRIC_NAME = "patent_implementation_quality"
+
+# 前記/該/当該/上記 による参照語の抽出（平仮名・句読点の直前までを名詞句とみなす）
+REFERENCE_TERM_PATTERN = re.compile(r'(?:前記|当該|該|上記)([^\u3040-\u309F、。\s]{2,20})')
+
+# 段落番号【XXXX】
+PARAGRAPH_NUMBER_PATTERN = re.compile(r'【(\d{4})】')
+
+# 請求項の構成要素の区切り
+CLAIM_ELEMENT_SEPARATOR = re.compile(r'[、。]')
+
+DEFAULT_WEIGHTS = {
+    'element_coverage': 0.5,
+    'reference_reuse': 0.3,
+    'paragraph_continuity': 0.2,
+}
+
+
+class ClaimIndex:
+    """請求項側の事前計算インデックス（特許ごとに1回だけ構築）"""
+
+    def __init__(self, claims: List[Dict[str, str]], processor=None, ngram_size: int = 3,
+                 min_element_length: int = 4):
+        """
+        初期化
+
+        Args:
+            claims: 請求項のリスト（{'claim_number', 'claim_text'} の辞書）
+            processor: 法的表現抽出に使用する PatentTextProcessor（Noneの場合は正規表現のみで抽出）
+            ngram_size: 文字n-gramのサイズ
+            min_element_length: 構成要素とみなす最小文字数
+        """
+        self.ngram_size = ngram_size
+        self.elements: List[str] = []
+        self.element_ngram_counts: List[int] = []
+        self.ngram_to_elements: Dict[str, List[int]] = {}
+        self.reference_terms: Set[str] = set()
+        seen_elements: Set[str] = set()
+
+        for claim in claims:
+            claim_text = claim.get('claim_text', '')
+            if not claim_text:
+                continue
+
+            # 構成要素（読点区切り）ごとのn-gram転置インデックス
+            for element in CLAIM_ELEMENT_SEPARATOR.split(claim_text):
+                element = element.strip()
+                # 従属請求項で繰り返される構成要素は1回だけ数える
+                if len(element) < min_element_length or element in seen_elements:
+                    continue
+                seen_elements.add(element)
+                element_id = len(self.elements)
+                element_ngrams = set(char_ngrams(element, ngram_size))
+                self.elements.append(element)
+                self.element_ngram_counts.append(len(element_ngrams))
+                for ngram in element_ngrams:
+                    self.ngram_to_elements.setdefault(ngram, []).append(element_id)
+
+            self.reference_terms.update(self._extract_reference_terms(claim_text, processor))
+
+        self.max_reference_length = max((len(term) for term in self.reference_terms), default=0)
+
+    @staticmethod
+    def _extract_reference_terms(claim_text: str, processor=None) -> Set[str]:
+        """前記/該 参照の対象となる名詞句を抽出"""
+        if processor is None:
+            spans = [claim_text]
+        else:
+            spans = [expr['text'] for expr in processor.extract_legal_expressions(claim_text)
+                     if expr['text'].startswith(('前記', '当該', '該', '上記'))]
+
+        terms = set()
+        for span in spans:
+            for match in REFERENCE_TERM_PATTERN.finditer(span):
+                terms.add(match.group(1))
+        return terms
+
+
+class CandidateScorer:
+    """生成候補のインクリメンタルスコアラー"""
+
+    def __init__(self, index: ClaimIndex, weights: Optional[Dict[str, float]] = None,
+                 coverage_threshold: float = 0.5):
+        """
+        初期化
+
+        Args:
+            index: 請求項側インデックス
+            weights: 各スコアの重み
+            coverage_threshold: 構成要素をカバー済みとみなすn-gram一致率
+        """
+        self.index = index
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.coverage_threshold = coverage_threshold
+
+        self._tail = ""
+        self._length = 0
+        self._seen_ngrams: Set[str] = set()
+        self._element_hits = [0] * len(index.elements)
+        self._found_terms: Set[str] = set()
+        self._paragraph_numbers: List[int] = []
+
+    def feed(self, chunk: str) -> None:
+        """
+        生成テキストの断片を追加し、統計を差分更新
+
+        Args:
+            chunk: 追加テキスト（トークン単位・文単位など任意）
+        """
+        if not chunk:
+            return
+
+        n = self.index.ngram_size
+        # 直前の断片との境界をまたぐn-gram・参照語・段落番号を拾うため末尾を重ねる
+        overlap = max(n - 1, self.index.max_reference_length - 1, len('【0000】') - 1)
+        window = self._tail + chunk
+        new_start = len(self._tail)
+
+        for i in range(max(0, new_start - n + 1), len(window) - n + 1):
+            ngram = window[i:i + n]
+            if ngram in self._seen_ngrams:
+                continue
+            self._seen_ngrams.add(ngram)
+            for element_id in self.index.ngram_to_elements.get(ngram, ()):
+                self._element_hits[element_id] += 1
+
+        for term in self.index.reference_terms:
+            if term not in self._found_terms and term in window:
+                self._found_terms.add(term)
+
+        for match in PARAGRAPH_NUMBER_PATTERN.finditer(window):
+            if match.end() > new_start:
+                self._paragraph_numbers.append(int(match.group(1)))
+
+        self._length += len(chunk)
+        self._tail = window[-overlap:] if overlap > 0 else ""
+
+    def element_coverage(self) -> float:
+        """請求項の構成要素のカバー率"""
+        if not self.index.elements:
+            return 0.0
+        covered = sum(
+            1 for hits, total in zip(self._element_hits, self.index.element_ngram_counts)
+            if total and hits / total >= self.coverage_threshold
+        )
+        return covered / len(self.index.elements)
+
+    def reference_reuse(self) -> float:
+        """前記/該 で参照される語の再利用率"""
+        if not self.index.reference_terms:
+            return 0.0
+        return len(self._found_terms) / len(self.index.reference_terms)
+
+    def paragraph_continuity(self) -> float:
+        """段落番号【XXXX】の連続性"""
+        numbers = self._paragraph_numbers
+        if not numbers:
+            return 0.0
+        if len(numbers) == 1:
+            return 1.0
+        continuous = sum(1 for prev, curr in zip(numbers, numbers[1:]) if curr == prev + 1)
+        return continuous / (len(numbers) - 1)
+
+    def score(self) -> Dict[str, Any]:
+        """
+        現時点のスコアを計算
+
+        Returns:
+            各スコアと重み付き総合スコアの辞書
+        """
+        scores = {
+            'element_coverage': self.element_coverage(),
+            'reference_reuse': self.reference_reuse(),
+            'paragraph_continuity': self.paragraph_continuity(),
+        }
+        total_weight = sum(self.weights.values()) or 1.0
+        total = sum(scores[key] * self.weights.get(key, 0.0) for key in scores) / total_weight
+
+        result = {key: round(value, 3) for key, value in scores.items()}
+        result[METRIC_NAME] = round(total, 3)
+        result['candidate_length'] = self._length
+        return result
+
+
+class ImplementationQualityScorer:
+    """patent_implementation_quality メトリクスの計算クラス"""
+
+    def __init__(self, processor=None, ngram_size: int = 3,
+                 weights: Optional[Dict[str, float]] = None,
+                 coverage_threshold: float = 0.5):
+        """
+        初期化
+
+        Args:
+            processor: 法的表現抽出に使用する PatentTextProcessor
+            ngram_size: 文字n-gramのサイズ
+            weights: 各スコアの重み（element_coverage, reference_reuse, paragraph_continuity）
+            coverage_threshold: 構成要素をカバー済みとみなすn-gram一致率
+        """
+        self.processor = processor
+        self.ngram_size = ngram_size
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.coverage_threshold = coverage_threshold
+        self._index_cache: Dict[str, ClaimIndex] = {}
+
+    def index_patent(self, claims: List[Dict[str, str]], patent_id: Optional[str] = None) -> ClaimIndex:
+        """
+        請求項側インデックスを構築（patent_id指定時はキャッシュ）
+
+        Args:
+            claims: 請求項のリスト
+            patent_id: 特許ID
+
+        Returns:
+            請求項側インデックス
+        """
+        if patent_id and patent_id in self._index_cache:
+            return self._index_cache[patent_id]
+
+        index = ClaimIndex(claims, processor=self.processor, ngram_size=self.ngram_size)
+        if patent_id:
+            self._index_cache[patent_id] = index
+        return index
+
+    def new_candidate(self, index: ClaimIndex) -> CandidateScorer:
+        """生成中の候補用スコアラーを作成"""
+        return CandidateScorer(index, weights=self.weights, coverage_threshold=self.coverage_threshold)
+
+    def score(self, index: ClaimIndex, text: str) -> Dict[str, Any]:
+        """生成済みテキストを一括でスコアリング"""
+        candidate = self.new_candidate(index)
+        candidate.feed(text)
+        return candidate.score()
+
+    def rerank(self, index: ClaimIndex, candidates: List[str]) -> List[Tuple[int, float]]:
+        """
+        best-of-N の候補を総合スコアで再ランキング
+
+        Args:
+            index: 請求項側インデックス
+            candidates: 生成候補テキストのリスト
+
+        Returns:
+            (候補インデックス, 総合スコア) のリスト（スコア降順）
+        """
+        ranked = [(i, self.score(index, text)[METRIC_NAME]) for i, text in enumerate(candidates)]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+
+def char_ngrams(text: str, n: int) -> List[str]:
+    """文字n-gramのリストを作成"""
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
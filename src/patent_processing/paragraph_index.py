@@ -0,0 +1,159 @@
+"""
+段落単位の完全重複インデックス
+「本発明は上記実施形態に限定されず…」のような定型段落を
+ハッシュの出現文書数で検出し、学習データから除外する
+"""
+
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 段落先頭の段落番号【XXXX】
+PARAGRAPH_NUMBER_PREFIX = re.compile(r'^\s*【\d{4}】')
+
+
+class ParagraphFrequencyIndex:
+    """段落ハッシュの出現文書数インデックス（ディスク永続化・インクリメンタル更新対応）"""
+
+    def __init__(self, index_path: Optional[str] = None, threshold: int = 20, min_length: int = 10):
+        """
+        初期化
+
+        Args:
+            index_path: インデックスファイルのパス（存在する場合は読み込む）
+            threshold: 定型段落とみなす出現文書数
+            min_length: 判定対象とする段落の最小文字数（短い段落は常に保持）
+        """
+        self.index_path = Path(index_path) if index_path else None
+        self.threshold = threshold
+        self.min_length = min_length
+
+        self.counts: Dict[str, int] = {}
+        self.previews: Dict[str, str] = {}
+        self.documents = set()
+
+        if self.index_path and self.index_path.exists():
+            self.load(self.index_path)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """段落番号と空白を除いた比較用テキスト"""
+        text = PARAGRAPH_NUMBER_PREFIX.sub('', text)
+        return re.sub(r'\s+', '', text)
+
+    def key(self, text: str) -> Optional[str]:
+        """段落のハッシュキー（判定対象外の短い段落はNone）"""
+        normalized = self.normalize(text)
+        if len(normalized) < self.min_length:
+            return None
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+    def update(self, paragraphs: Iterable[str], document_id: Optional[str] = None) -> bool:
+        """
+        1文書分の段落を登録（同一文書内の重複は1回と数える）
+
+        Args:
+            paragraphs: 段落テキストの列
+            document_id: 文書ID（登録済みの場合はスキップして二重計上を防ぐ）
+
+        Returns:
+            登録した場合True、登録済みでスキップした場合False
+        """
+        if document_id is not None:
+            if document_id in self.documents:
+                return False
+            self.documents.add(document_id)
+
+        seen = set()
+        for paragraph in paragraphs:
+            key = self.key(paragraph)
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+            if count >= self.threshold and key not in self.previews:
+                self.previews[key] = self.normalize(paragraph)[:80]
+        return True
+
+    def frequency(self, text: str) -> int:
+        """段落の出現文書数"""
+        key = self.key(text)
+        return self.counts.get(key, 0) if key else 0
+
+    def is_boilerplate(self, text: str) -> bool:
+        """定型段落かどうか"""
+        return self.frequency(text) >= self.threshold
+
+    def filter_paragraphs(self, paragraphs: List[Dict[str, Any]], text_key: str = 'content',
+                          strip: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        定型段落を除外またはフラグ付け
+
+        Args:
+            paragraphs: 段落辞書のリスト（split_into_paragraphs の出力形式）
+            text_key: 段落テキストのキー
+            strip: Trueの場合は除外、Falseの場合は 'boilerplate' フラグを付与
+
+        Returns:
+            (処理後の段落リスト, 定型段落の数)
+        """
+        result = []
+        boilerplate_count = 0
+        for paragraph in paragraphs:
+            is_boilerplate = self.is_boilerplate(paragraph.get(text_key, ''))
+            if is_boilerplate:
+                boilerplate_count += 1
+            if strip:
+                if not is_boilerplate:
+                    result.append(paragraph)
+            else:
+                result.append(dict(paragraph, boilerplate=is_boilerplate))
+        return result, boilerplate_count
+
+    def boilerplate_summary(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """出現文書数の多い定型段落の一覧"""
+        frequent = [(key, count) for key, count in self.counts.items() if count >= self.threshold]
+        frequent.sort(key=lambda item: item[1], reverse=True)
+        return [
+            {'hash': key, 'documents': count, 'preview': self.previews.get(key, '')}
+            for key, count in frequent[:limit]
+        ]
+
+    def save(self, index_path: Optional[str] = None) -> None:
+        """インデックスを保存"""
+        path = Path(index_path) if index_path else self.index_path
+        if path is None:
+            raise ValueError("インデックスの保存先が指定されていません")
+
+        index_data = {
+            'updated_at': datetime.now().isoformat(),
+            'min_length': self.min_length,
+            'documents': sorted(self.documents),
+            'counts': self.counts,
+            'previews': self.previews,
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index_data, f, ensure_ascii=False)
+
+        logger.info(f"段落頻度インデックスを保存: {path} (文書数: {len(self.documents)}, 段落数: {len(self.counts)})")
+
+    def load(self, index_path: str) -> None:
+        """保存済みインデックスを読み込み"""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index_data = json.load(f)
+
+        if index_data.get('min_length', self.min_length) != self.min_length:
+            raise ValueError(f"インデックスのmin_lengthが一致しません: {index_data.get('min_length')} != {self.min_length}")
+
+        self.documents = set(index_data.get('documents', []))
+        self.counts = index_data.get('counts', {})
+        self.previews = index_data.get('previews', {})
@@ -0,0 +1,113 @@
+"""
+特許IDの決定的な割り当て
+
+XML解析時に公報番号（PublicationNumber）から特許IDを決める。公報番号がない場合は、
+抽出した本文・請求項のダイジェスト（本文も空の場合はファイル名のダイジェスト）から作る。
+組み込みの hash() と違いプロセスごとの乱数（PYTHONHASHSEED）に依存しないため、
+シャード・並列ワーカー・再実行をまたいで同じ入力には同じIDが付き、結合キーとして使える。
+"""
+
+import hashlib
+import re
+from typing import Any, Mapping
+
+# 公報番号がない場合のIDの接頭辞
+FALLBACK_ID_PREFIX = 'patent_'
+
+# ダイジェストのバイト数（16進16桁。数百万件でも偶然の衝突は無視できる）
+DIGEST_SIZE = 8
+
+# ダイジェストに含めるテキストセクション（この順で連結）
+DIGEST_SECTIONS = ('title', 'abstract', 'technical_field', 'background_art', 'summary', 'detailed_description')
+
+_WHITESPACE = re.compile(r'\s+')
+
+# フィールドの区切り（本文に現れない制御文字）
+_SEPARATOR = '\x1f'
+
+
+def normalize_publication_number(number: Any) -> str:
+    """公報番号の前後・途中の空白を除去（値がない場合は空文字）"""
+    if not isinstance(number, str):
+        return ''
+    return _WHITESPACE.sub('', number)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def digest_patent_id(*texts: str) -> str:
+    """
+    テキストのダイジェストから特許IDを作成（公報番号のないデータ用）
+
+    Args:
+        texts: ダイジェストに含めるテキスト（この順で連結）
+
+    Returns:
+        特許ID（patent_<16桁の16進>）
+    """
+    return f"{FALLBACK_ID_PREFIX}{_digest(_SEPARATOR.join(texts))}"
+
+
+def content_digest(patent_data: Mapping[str, Any]) -> str:
+    """
+    本文・請求項のダイジェスト（内容が同じ文書は同じ値）
+
+    Args:
+        patent_data: 特許データ辞書（parse_xml_file の出力形式。pandas の行も可）
+
+    Returns:
+        16進文字列（本文・請求項が全て空の場合は空文字）
+    """
+    parts = []
+    for name in DIGEST_SECTIONS:
+        text = patent_data.get(name)
+        parts.append(text if isinstance(text, str) else '')
+    claims = patent_data.get('claims')
+    if isinstance(claims, (list, tuple)):
+        for claim in claims:
+            parts.append(f"{claim.get('claim_number', '')}{_SEPARATOR}{claim.get('claim_text', '')}")
+
+    if not any(parts):
+        return ''
+    return _digest(_SEPARATOR.join(parts))
+
+
+def assign_patent_id(patent_data: Mapping[str, Any]) -> str:
+    """
+    特許IDを決定的に割り当て
+
+    優先順位: 公報番号 → 本文・請求項のダイジェスト → ファイル名のダイジェスト
+
+    Args:
+        patent_data: 特許データ辞書（patent_number・各セクション・file_name を参照）
+
+    Returns:
+        特許ID
+    """
+    publication_number = normalize_publication_number(patent_data.get('patent_number'))
+    if publication_number:
+        return publication_number
+
+    digest = content_digest(patent_data)
+    if digest:
+        return f"{FALLBACK_ID_PREFIX}{digest}"
+    file_name = patent_data.get('file_name')
+    return digest_patent_id(file_name if isinstance(file_name, str) and file_name else 'unknown')
+
+
+def get_patent_id(patent_data: Mapping[str, Any]) -> str:
+    """
+    解析時に割り当てた特許IDを取得（割り当て前のデータの場合はここで割り当てる）
+
+    Args:
+        patent_data: 特許データ辞書（pandas の行も可）
+
+    Returns:
+        特許ID
+    """
+    patent_id = patent_data.get('patent_id')
+    if isinstance(patent_id, str) and patent_id:
+        return patent_id
+    return assign_patent_id(patent_data)
@@ -0,0 +1,249 @@
+"""
+特許処理パイプラインのステージ別プロファイリング
+
+process_xml_files 内の各ステージ（XML解析、セクション抽出、クリーニング、化学・法的分析、
+検証、文分割）の処理時間と処理量を文書ごとに記録し、スループット（files/sec, chars/sec, bytes/sec）と
+文書あたりレイテンシのパーセンタイル（p50/p95/p99）を pipeline_profile.json に出力する。
+各ステージの計測範囲は重ならない。処理量は文字数（chars）と入力のバイト数（bytes: XML解析のみ）を別に集計する。
+無効時は計測を行わない共有のダミーオブジェクトを返すため、オーバーヘッドはほぼない。
+"""
+
+import cProfile
+import heapq
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE = "pipeline_profile.json"
+TRACE_DIR = "profiles"
+
+# 文書全体の処理時間を記録するステージ名
+DOCUMENT_STAGE = "document"
+
+
+class _NullStage:
+    """無効時に返す何もしない計測コンテキスト"""
+
+    __slots__ = ('chars', 'bytes')
+
+    def __init__(self):
+        self.chars = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    """1ステージ1回分の計測コンテキスト（chars・bytes は処理後に設定してもよい）"""
+
+    __slots__ = ('profiler', 'name', 'chars', 'bytes', 'start')
+
+    def __init__(self, profiler: 'StageProfiler', name: str, chars: int, num_bytes: int = 0):
+        self.profiler = profiler
+        self.name = name
+        self.chars = chars
+        self.bytes = num_bytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start, self.chars, self.bytes)
+        return False
+
+
+class _DocumentTimer(_StageTimer):
+    """文書1件分の計測コンテキスト（必要に応じて cProfile を併用）"""
+
+    __slots__ = ('profile',)
+
+    def __enter__(self):
+        self.profile = None
+        if self.profiler.trace_top_n > 0:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.profile is not None:
+            self.profile.disable()
+        self.profiler.record(DOCUMENT_STAGE, elapsed, self.chars, self.bytes)
+        if self.profile is not None:
+            self.profiler._keep_trace(elapsed, self.name, self.profile)
+        return False
+
+
+class StageProfiler:
+    """ステージ別の処理時間・処理文字数を集計するプロファイラ"""
+
+    def __init__(self, enabled: bool = False, trace_top_n: int = 0):
+        """
+        初期化
+
+        Args:
+            enabled: 計測を有効にするかどうか（Falseの場合は全ての計測が no-op）
+            trace_top_n: 処理時間の長い上位N文書の cProfile トレースを保存（0の場合は保存しない）
+        """
+        self.enabled = enabled
+        self.trace_top_n = trace_top_n if enabled else 0
+        # ステージ名 → 処理時間・処理文字数・処理バイト数のリスト
+        self._durations: Dict[str, List[float]] = {}
+        self._chars: Dict[str, List[int]] = {}
+        self._bytes: Dict[str, List[int]] = {}
+        # 処理時間の短い順に並ぶ最小ヒープ: (処理時間, 連番, 文書名, cProfile)
+        self._traces: List[Tuple[float, int, str, cProfile.Profile]] = []
+        self._trace_counter = 0
+        self._started_at = time.perf_counter()
+
+    def stage(self, name: str, chars: int = 0, num_bytes: int = 0):
+        """
+        ステージの計測コンテキストを取得
+
+        Args:
+            name: ステージ名
+            chars: 処理文字数（with ブロック内で .chars に設定してもよい）
+            num_bytes: 処理バイト数（with ブロック内で .bytes に設定してもよい）
+
+        Returns:
+            with 文で使う計測コンテキスト
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name, chars, num_bytes)
+
+    def document(self, name: str, chars: int = 0):
+        """
+        文書1件分の計測コンテキストを取得（trace_top_n > 0 の場合は cProfile も取得）
+
+        Args:
+            name: 文書名（トレースファイル名に使用）
+            chars: 処理文字数
+
+        Returns:
+            with 文で使う計測コンテキスト
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _DocumentTimer(self, name, chars)
+
+    def record(self, name: str, seconds: float, chars: int = 0, num_bytes: int = 0) -> None:
+        """計測値を1件記録"""
+        if name not in self._durations:
+            self._durations[name] = []
+            self._chars[name] = []
+            self._bytes[name] = []
+        self._durations[name].append(seconds)
+        self._chars[name].append(chars)
+        self._bytes[name].append(num_bytes)
+
+    def _keep_trace(self, seconds: float, name: str, profile: cProfile.Profile) -> None:
+        """処理時間の長い上位N文書のトレースのみ保持"""
+        self._trace_counter += 1
+        item = (seconds, self._trace_counter, name, profile)
+        if len(self._traces) < self.trace_top_n:
+            heapq.heappush(self._traces, item)
+        elif seconds > self._traces[0][0]:
+            heapq.heapreplace(self._traces, item)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        ステージ別の集計結果を作成
+
+        Returns:
+            ステージごとの件数・合計時間・スループット・レイテンシパーセンタイル
+        """
+        stages = {}
+        for name, durations in self._durations.items():
+            seconds = np.asarray(durations)
+            total_seconds = float(seconds.sum())
+            total_chars = int(sum(self._chars[name]))
+            total_bytes = int(sum(self._bytes[name]))
+            p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000.0
+            stages[name] = {
+                'count': len(durations),
+                'total_seconds': round(total_seconds, 6),
+                'total_chars': total_chars,
+                'total_bytes': total_bytes,
+                'files_per_sec': round(len(durations) / total_seconds, 3) if total_seconds > 0 else None,
+                # 文字数・バイト数を計上しないステージは None
+                'chars_per_sec': round(total_chars / total_seconds, 1) if total_seconds > 0 and total_chars else None,
+                'bytes_per_sec': round(total_bytes / total_seconds, 1) if total_seconds > 0 and total_bytes else None,
+                'latency_ms': {
+                    'mean': round(total_seconds * 1000.0 / len(durations), 3),
+                    'p50': round(float(p50), 3),
+                    'p95': round(float(p95), 3),
+                    'p99': round(float(p99), 3),
+                    'max': round(float(seconds.max()) * 1000.0, 3),
+                },
+            }
+
+        return {
+            'created_at': datetime.now().isoformat(),
+            'wall_seconds': round(time.perf_counter() - self._started_at, 3),
+            'stages': stages,
+            'slowest_documents': [
+                {'document': name, 'seconds': round(seconds, 6)}
+                for seconds, _, name, _ in sorted(self._traces, reverse=True)
+            ],
+        }
+
+    def write_report(self, output_dir: str) -> Path:
+        """
+        集計結果を pipeline_profile.json に、上位N文書のトレースを profiles/*.prof に出力
+
+        トレースは cProfile の pstats 形式（python -m pstats、snakeviz、flameprof 等で参照可能）。
+
+        Args:
+            output_dir: 出力ディレクトリ（dataset_stats.json と同じ場所）
+
+        Returns:
+            出力したレポートのパス
+        """
+        output_directory = Path(output_dir)
+        output_directory.mkdir(parents=True, exist_ok=True)
+        report = self.report()
+
+        if self._traces:
+            trace_dir = output_directory / TRACE_DIR
+            trace_dir.mkdir(exist_ok=True)
+            slowest = sorted(self._traces, reverse=True)
+            for rank, ((_, _, name, profile), entry) in enumerate(zip(slowest, report['slowest_documents']), 1):
+                safe_name = re.sub(r'[^\w.-]+', '_', name)
+                trace_path = trace_dir / f"{rank:03d}_{safe_name}.prof"
+                profile.dump_stats(str(trace_path))
+                entry['trace'] = trace_path.relative_to(output_directory).as_posix()
+
+        report_path = output_directory / PROFILE_FILE
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"プロファイル出力: {report_path}")
+        return report_path
+
+    def print_summary(self) -> None:
+        """ステージ別の集計結果を表示"""
+        stages = self.report()['stages']
+        if not stages:
+            return
+        print(f"\n=== ステージ別処理時間 ===")
+        for name, stats in sorted(stages.items(), key=lambda item: -item[1]['total_seconds']):
+            latency = stats['latency_ms']
+            print(f"  {name:<28} {stats['count']:>6}件 {stats['total_seconds']:>9.3f}s "
+                  f"p50={latency['p50']:.2f}ms p95={latency['p95']:.2f}ms p99={latency['p99']:.2f}ms")
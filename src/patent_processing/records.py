@@ -0,0 +1,504 @@
+"""
+解析済み特許データのコンパクトなレコード型
+
+parse_xml_file → process_xml_files → 各エクスポータを流れる辞書の入れ子の代わりに、
+__slots__ クラスとソーステキストへのオフセット配列（array('i')）で保持する。
+部分文字列はコピーせず、必要になった時点でスライスする。
+クリーニング済みの combined_text も本文バッファの区間の連結として保持し、テキストを二重に持たない。
+"""
+
+from array import array
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+
+from .analysis import LegalAnalysis, ChemicalAnalysis, LEGAL_CATEGORIES, CHEMICAL_CATEGORIES, CHEMICAL_PATTERNS
+
+# 本文バッファに格納するテキストセクション（この順で連結）
+TEXT_SECTIONS = ('title', 'abstract', 'technical_field', 'background_art',
+                 'summary', 'detailed_description')
+
+# 文字列として保持するメタデータ
+SCALAR_FIELDS = ('patent_number', 'publication_date', 'filing_date', 'xml_file_path', 'file_name', 'patent_id')
+
+# リストとして保持するメタデータ
+LIST_FIELDS = ('inventors', 'applicants', 'ipc_classification', 'citations')
+
+_LEGAL_CATEGORY_IDS = {name: i for i, name in enumerate(LEGAL_CATEGORIES)}
+_CHEMICAL_CATEGORY_IDS = {name: i for i, name in enumerate(CHEMICAL_CATEGORIES)}
+
+# 化学エンティティのパターンは固定のテーブル（analysis.CHEMICAL_PATTERNS）の位置をIDとして保持する
+# （登録順に依存しないため、ワーカー・実行をまたいで同じパターンは同じIDになる）
+_CHEMICAL_PATTERN_IDS = {pattern: i for i, pattern in enumerate(CHEMICAL_PATTERNS)}
+
+
+def _chemical_pattern_id(pattern: str) -> int:
+    """化学パターン文字列をIDに変換"""
+    try:
+        return _CHEMICAL_PATTERN_IDS[pattern]
+    except KeyError:
+        raise ValueError(f"未定義の化学パターンです（analysis.CHEMICAL_PATTERN_GROUPS に定義してください）: "
+                         f"{pattern!r}") from None
+
+
+# combined_text の続きを本文バッファ内で探す範囲（クリーニングで削除される文字列の長さの目安）
+_MAX_SKIP = 64
+
+# 位置合わせに使う文字数（長い順に試す。1文字だけの一致では位置合わせしない）
+_ANCHOR_SIZES = (8, 3)
+
+# 区間は (読み飛ばす文字数, 長さ) を array('H') に保持する。読み飛ばし幅が _LITERAL の区間は literals から取り出す
+_MAX_RUN = 0xFFFE
+_LITERAL = 0xFFFF
+
+
+def _append_run(runs: array, skip: int, length: int) -> None:
+    """区間を追加（上限を超える長さは分割）"""
+    while length > _MAX_RUN:
+        runs.extend((skip, _MAX_RUN))
+        length -= _MAX_RUN
+        if skip != _LITERAL:
+            skip = 0
+    runs.extend((skip, length))
+
+
+def _common_prefix_length(text: str, i: int, source: str, j: int, known: int = 0) -> int:
+    """
+    text[i:] と source[j:] の共通接頭辞の長さ（startswith による指数探索＋二分探索）
+
+    Args:
+        known: 一致していることが分かっている文字数
+    """
+    limit = min(len(text) - i, len(source) - j)
+    length = known
+    step = 8
+    while length < limit:
+        size = min(step, limit - length)
+        if source.startswith(text[i + length:i + length + size], j + length):
+            length += size
+            step *= 2
+            continue
+        # size 文字では一致しないため、一致する最長の長さを二分探索
+        low, high = 0, size
+        while high - low > 1:
+            middle = (low + high) // 2
+            if source.startswith(text[i + length:i + length + middle], j + length):
+                low = middle
+            else:
+                high = middle
+        return length + low
+    return length
+
+
+def encode_runs(source: str, text: str) -> Tuple[array, str]:
+    """
+    テキストをソーステキストの区間の連結として表現
+
+    クリーニングでは文字の削除と空白の置換が大部分のため、combined_text の大部分は本文バッファの
+    区間を先頭から順に並べたものになる。続きの数文字が現在位置から _MAX_SKIP 文字以内に見つからない文字
+    （置換後の空白・保護トークンの残り等）は literals に保持する。
+
+    Args:
+        source: 参照先のテキスト（本文バッファ）
+        text: 表現するテキスト
+
+    Returns:
+        (runs, literals): runs は (直前の区間の終わりから読み飛ばす文字数, 長さ) の2要素ずつ。
+        読み飛ばし幅が _LITERAL の区間は literals から順に長さ分の文字を取り出す
+    """
+    runs = array('H')
+    literals = []
+    find = source.find
+    text_length = len(text)
+    source_length = len(source)
+    literal_start = -1
+    i = j = 0
+    while i < text_length:
+        known = 0
+        if j < source_length and source[j] == text[i]:
+            start = j
+        else:
+            start = -1
+            if not text[i].isspace():
+                for size in _ANCHOR_SIZES:
+                    anchor = text[i:i + size]
+                    start = find(anchor, j, j + _MAX_SKIP + len(anchor))
+                    if start >= 0:
+                        known = len(anchor)
+                        break
+
+        if start < 0:
+            # ソースにない文字（空白類の置換・セクション間の区切り・保護トークンの残り等）
+            if literal_start < 0:
+                literal_start = i
+            i += 1
+            continue
+
+        if literal_start >= 0:
+            _append_run(runs, _LITERAL, i - literal_start)
+            literals.append(text[literal_start:i])
+            literal_start = -1
+
+        length = _common_prefix_length(text, i, source, start, known)
+        _append_run(runs, start - j, length)
+        i += length
+        j = start + length
+
+    if literal_start >= 0:
+        _append_run(runs, _LITERAL, text_length - literal_start)
+        literals.append(text[literal_start:])
+
+    if len(runs) * runs.itemsize >= text_length:
+        # 区間が細かすぎて削減にならない場合はテキストをそのまま保持
+        runs = array('H')
+        _append_run(runs, _LITERAL, text_length)
+        return runs, text
+    return runs, ''.join(literals)
+
+
+def decode_runs(source: str, runs: array, literals: str) -> str:
+    """encode_runs で表現したテキストを復元"""
+    parts = []
+    j = 0
+    cursor = 0
+    for k in range(0, len(runs), 2):
+        skip, length = runs[k], runs[k + 1]
+        if skip == _LITERAL:
+            parts.append(literals[cursor:cursor + length])
+            cursor += length
+        else:
+            j += skip
+            parts.append(source[j:j + length])
+            j += length
+    return ''.join(parts)
+
+
+def _locate_spans(text: str, pieces: List[str]) -> array:
+    """順序付きの部分文字列をテキスト内で順に探し、(start, end) のオフセット配列にする"""
+    spans = array('i')
+    cursor = 0
+    for piece in pieces:
+        start = text.find(piece, cursor)
+        if start < 0:
+            raise ValueError(f"部分文字列がテキスト内に見つかりません: {piece[:30]}")
+        cursor = start + len(piece)
+        spans.append(start)
+        spans.append(cursor)
+    return spans
+
+
+class Claim:
+    """請求項（本文バッファへのオフセットで保持）"""
+
+    __slots__ = ('record', 'number', 'start', 'end')
+
+    def __init__(self, record: 'PatentRecord', number: str, start: int, end: int):
+        self.record = record
+        self.number = number
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self) -> str:
+        return self.record.body[self.start:self.end]
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'claim_number': self.number, 'claim_text': self.text}
+
+
+class LegalSpan:
+    """法的表現の出現位置（combined_text へのオフセット）"""
+
+    __slots__ = ('source', 'start', 'end', 'importance', 'category_id', 'pattern_index')
+
+    def __init__(self, source: str, start: int, end: int, importance: int,
+                 category_id: int, pattern_index: int):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.importance = importance
+        self.category_id = category_id
+        self.pattern_index = pattern_index
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    @property
+    def category(self) -> str:
+        return LEGAL_CATEGORIES[self.category_id]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'text': self.text,
+            'start': self.start,
+            'end': self.end,
+            'importance': self.importance,
+            'category': self.category,
+            'pattern_index': self.pattern_index
+        }
+
+
+class ChemicalEntity:
+    """化学エンティティの出現位置（combined_text へのオフセット）"""
+
+    __slots__ = ('source', 'start', 'end', 'category_id', 'pattern_id')
+
+    def __init__(self, source: str, start: int, end: int, category_id: int, pattern_id: int):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.category_id = category_id
+        self.pattern_id = pattern_id
+
+    @property
+    def text(self) -> str:
+        return self.source[self.start:self.end]
+
+    @property
+    def category(self) -> str:
+        return CHEMICAL_CATEGORIES[self.category_id]
+
+    @property
+    def pattern(self) -> str:
+        return CHEMICAL_PATTERNS[self.pattern_id]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'text': self.text,
+            'category': self.category,
+            'start': self.start,
+            'end': self.end,
+            'pattern': self.pattern
+        }
+
+
+class PatentRecord:
+    """
+    解析済み特許1件分のコンパクトなレコード
+
+    テキストセクションと請求項は1つの本文バッファ（body）に連結し、
+    セクション・請求項・文・法的表現・化学エンティティはすべて array('i') のオフセットで保持する。
+    combined_text は本文バッファの区間（combined_runs）と区間外の文字（combined_literals）で保持し、
+    参照時に復元する（文・法的表現・化学エンティティのオフセットは復元後のテキストに対する位置）。
+    """
+
+    __slots__ = (
+        'patent_number', 'publication_date', 'filing_date', 'xml_file_path', 'file_name', 'patent_id',
+        'inventors', 'applicants', 'ipc_classification', 'citations',
+        'body', 'section_spans', 'claim_numbers', 'claim_spans',
+        'combined_runs', 'combined_literals', 'sentence_spans',
+        'legal_spans', 'legal_summary',
+        'chemical_spans', 'chemical_summary',
+        'extras',
+    )
+
+    def __init__(self):
+        for field in SCALAR_FIELDS:
+            setattr(self, field, '')
+        for field in LIST_FIELDS:
+            setattr(self, field, ())
+        self.body = ''
+        self.section_spans = array('i')
+        self.claim_numbers: Tuple[str, ...] = ()
+        self.claim_spans = array('i')
+        self.combined_runs = array('H')
+        self.combined_literals = ''
+        self.sentence_spans: Optional[array] = None
+        # (start, end, importance, category_id, pattern_index) の5要素ずつ
+        self.legal_spans: Optional[array] = None
+        self.legal_summary: Optional[Dict[str, Any]] = None
+        # (start, end, category_id, pattern_id) の4要素ずつ
+        self.chemical_spans: Optional[array] = None
+        self.chemical_summary: Optional[Dict[str, Any]] = None
+        self.extras: Dict[str, Any] = {}
+
+    # ===== セクション・請求項 =====
+
+    def section(self, name: str) -> str:
+        """テキストセクションを取得"""
+        i = TEXT_SECTIONS.index(name)
+        return self.body[self.section_spans[2 * i]:self.section_spans[2 * i + 1]]
+
+    @property
+    def claims(self) -> List[Claim]:
+        return [
+            Claim(self, number, self.claim_spans[2 * i], self.claim_spans[2 * i + 1])
+            for i, number in enumerate(self.claim_numbers)
+        ]
+
+    @property
+    def claims_count(self) -> int:
+        return len(self.claim_numbers)
+
+    # ===== 文・法的表現・化学エンティティ =====
+
+    @property
+    def combined_text(self) -> str:
+        """クリーニング済みテキスト（参照のたびに本文バッファから復元）"""
+        return decode_runs(self.body, self.combined_runs, self.combined_literals)
+
+    @combined_text.setter
+    def combined_text(self, text: str) -> None:
+        self.combined_runs, self.combined_literals = encode_runs(self.body, text)
+
+    def _sentences(self, text: str) -> List[str]:
+        spans = self.sentence_spans
+        return [text[spans[i]:spans[i + 1]] for i in range(0, len(spans), 2)]
+
+    @property
+    def sentences(self) -> List[str]:
+        if self.sentence_spans is None:
+            return []
+        return self._sentences(self.combined_text)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_spans) // 2 if self.sentence_spans is not None else 0
+
+    def iter_legal_spans(self, text: Optional[str] = None) -> Iterator[LegalSpan]:
+        """法的表現を順に返す（text は復元済みの combined_text。Noneの場合はここで1回だけ復元）"""
+        spans = self.legal_spans or array('i')
+        if spans and text is None:
+            text = self.combined_text
+        for i in range(0, len(spans), 5):
+            yield LegalSpan(text, *spans[i:i + 5])
+
+    def iter_chemical_entities(self, text: Optional[str] = None) -> Iterator[ChemicalEntity]:
+        """化学エンティティを順に返す（text は復元済みの combined_text。Noneの場合はここで1回だけ復元）"""
+        spans = self.chemical_spans or array('i')
+        if spans and text is None:
+            text = self.combined_text
+        for i in range(0, len(spans), 4):
+            yield ChemicalEntity(text, *spans[i:i + 4])
+
+    # ===== 辞書形式との相互変換 =====
+
+    @classmethod
+    def from_dict(cls, patent_data: Dict[str, Any]) -> 'PatentRecord':
+        """
+        既存の辞書形式（parse_xml_file / process_xml_files の出力）から変換
+
+        Args:
+            patent_data: 特許データ辞書
+
+        Returns:
+            PatentRecord
+        """
+        record = cls()
+        for field in SCALAR_FIELDS:
+            setattr(record, field, patent_data.get(field, '') or '')
+        for field in LIST_FIELDS:
+            setattr(record, field, tuple(patent_data.get(field, []) or ()))
+
+        # 本文バッファの構築（セクション → 請求項の順に連結）
+        parts = []
+        cursor = 0
+        for name in TEXT_SECTIONS:
+            text = patent_data.get(name, '') or ''
+            parts.append(text)
+            record.section_spans.append(cursor)
+            cursor += len(text)
+            record.section_spans.append(cursor)
+
+        claim_numbers = []
+        for claim in patent_data.get('claims', []) or []:
+            text = claim.get('claim_text', '') or ''
+            parts.append(text)
+            claim_numbers.append(claim.get('claim_number', ''))
+            record.claim_spans.append(cursor)
+            cursor += len(text)
+            record.claim_spans.append(cursor)
+        record.claim_numbers = tuple(claim_numbers)
+        record.body = ''.join(parts)
+
+        combined_text = patent_data.get('combined_text', '') or ''
+        record.combined_text = combined_text
+        if 'sentences' in patent_data:
+            record.sentence_spans = _locate_spans(combined_text, patent_data['sentences'])
+
+        legal_analysis = patent_data.get('legal_analysis')
+        if isinstance(legal_analysis, LegalAnalysis):
+            # 配列形式の分析結果は表現リストを経由せずにそのまま格納
+            record.legal_spans = array('i', legal_analysis.span_rows().ravel().tolist())
+            record.legal_summary = legal_analysis.summary()
+        elif legal_analysis is not None:
+            spans = array('i')
+            for expr in legal_analysis.get('expressions', []):
+                spans.extend((expr['start'], expr['end'], expr['importance'],
+                              _LEGAL_CATEGORY_IDS[expr['category']], expr['pattern_index']))
+            record.legal_spans = spans
+            record.legal_summary = {k: v for k, v in legal_analysis.items() if k != 'expressions'}
+
+        chemical_analysis = patent_data.get('chemical_analysis')
+        if isinstance(chemical_analysis, ChemicalAnalysis):
+            pattern_ids = [_chemical_pattern_id(pattern) for pattern in chemical_analysis.patterns]
+            spans = array('i')
+            for start, end, category_id, pattern_id in zip(
+                    chemical_analysis.starts.tolist(), chemical_analysis.ends.tolist(),
+                    chemical_analysis.categories.tolist(), chemical_analysis.pattern_ids.tolist()):
+                spans.extend((start, end, category_id, pattern_ids[pattern_id]))
+            record.chemical_spans = spans
+            record.chemical_summary = chemical_analysis.summary()
+        elif chemical_analysis is not None:
+            spans = array('i')
+            for entity in chemical_analysis.get('entities', []):
+                spans.extend((entity['start'], entity['end'],
+                              _CHEMICAL_CATEGORY_IDS[entity['category']], _chemical_pattern_id(entity['pattern'])))
+            record.chemical_spans = spans
+            record.chemical_summary = {k: v for k, v in chemical_analysis.items()
+                                       if k not in ('entities', 'unique_formulas_list')}
+
+        known = set(SCALAR_FIELDS) | set(LIST_FIELDS) | set(TEXT_SECTIONS) | {
+            'claims', 'combined_text', 'sentences', 'sentence_count', 'claims_text', 'claims_count',
+            'legal_analysis', 'chemical_analysis'
+        }
+        record.extras = {k: v for k, v in patent_data.items() if k not in known}
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        既存の辞書形式に変換（エクスポータ・DataFrame 用）
+
+        Returns:
+            特許データ辞書
+        """
+        patent_data = {field: getattr(self, field) for field in ('patent_number', 'publication_date', 'filing_date')}
+        for name in TEXT_SECTIONS:
+            patent_data[name] = self.section(name)
+        claims = [claim.to_dict() for claim in self.claims]
+        patent_data['claims'] = claims
+        for field in LIST_FIELDS:
+            patent_data[field] = list(getattr(self, field))
+        patent_data['xml_file_path'] = self.xml_file_path
+        patent_data['file_name'] = self.file_name
+        patent_data['patent_id'] = self.patent_id
+        combined_text = self.combined_text
+        patent_data['combined_text'] = combined_text
+
+        if self.chemical_summary is not None:
+            entities = [entity.to_dict() for entity in self.iter_chemical_entities(combined_text)]
+            patent_data['chemical_analysis'] = dict(
+                self.chemical_summary,
+                entities=entities,
+                unique_formulas_list=list(set(entity['text'] for entity in entities))
+            )
+        if self.legal_summary is not None:
+            patent_data['legal_analysis'] = dict(
+                self.legal_summary,
+                expressions=[span.to_dict() for span in self.iter_legal_spans(combined_text)]
+            )
+
+        patent_data.update(self.extras)
+
+        if self.sentence_spans is not None:
+            patent_data['sentences'] = self._sentences(combined_text)
+            patent_data['sentence_count'] = self.sentence_count
+            patent_data['claims_text'] = ' '.join(claim['claim_text'] for claim in claims)
+            patent_data['claims_count'] = self.claims_count
+
+        return patent_data
+
+
+def records_to_dataframe(records: List[PatentRecord]):
+    """PatentRecord のリストを既存形式のDataFrameに変換（create_training_dataset 等の入力用）"""
+    import pandas as pd
+    return pd.DataFrame([record.to_dict() for record in records])
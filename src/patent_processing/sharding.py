@@ -0,0 +1,317 @@
+"""
+bulkモードのシャード分割処理
+
+XMLファイル一覧をパスのハッシュで決定的に分割し、複数プロセス・複数マシンが
+それぞれ1シャードを独立に処理する。各シャードは shards/ 配下に自身のパートファイルを出力し、
+マージ時に統計の集約（指定した場合はシャード横断の近似重複除去も）を行って最終的な dataset_stats.json を作成する。
+マージはパートファイルを1件ずつ読み込んで書き出すため、全レコードをメモリに保持しない。
+"""
+
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Iterable, Iterator
+
+try:
+    from ..utils.json_stream import JSONArrayWriter, iter_json_records
+except ImportError:
+    # src をパスに追加して patent_processing をトップレベルのパッケージとして使用した場合
+    from utils.json_stream import JSONArrayWriter, iter_json_records
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIR_NAME = "shards"
+SHARD_DIR_PATTERN = re.compile(r'^shard-(\d{5})-of-(\d{5})$')
+
+# 各シャードが出力するパートファイル（create_training_dataset の出力）
+PART_FILES = ('complete_dataset.json', 'training_dataset.json', 'sections_dataset.json', 'chatml_training.json')
+
+# シャードの完了判定に使うファイル（create_training_dataset が最後に書き出す）
+SHARD_COMPLETE_MARKER = 'dataset_stats.json'
+
+
+def shard_for_path(relative_path: str, num_shards: int) -> int:
+    """
+    ファイルの所属シャードを決定（マシン・プロセスに依存しない）
+
+    Args:
+        relative_path: 入力ディレクトリからの相対パス
+        num_shards: シャード数
+
+    Returns:
+        シャード番号（0 <= n < num_shards）
+    """
+    digest = hashlib.md5(Path(relative_path).as_posix().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
+
+
+def validate_shard_args(shard_index: int, num_shards: int) -> None:
+    """シャード指定の妥当性チェック"""
+    if num_shards < 1:
+        raise ValueError(f"num_shards は1以上である必要があります: {num_shards}")
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index は 0〜{num_shards - 1} の範囲で指定してください: {shard_index}")
+
+
+def select_shard(files: Iterable[Path], base_dir: str, shard_index: int, num_shards: int) -> List[Path]:
+    """
+    ファイル一覧から指定シャードに属するファイルを抽出
+
+    Args:
+        files: ファイルパスの列
+        base_dir: 相対パスの基準ディレクトリ
+        shard_index: シャード番号
+        num_shards: シャード数
+
+    Returns:
+        指定シャードのファイルリスト（元の順序を維持）
+    """
+    validate_shard_args(shard_index, num_shards)
+    base = Path(base_dir)
+    return [
+        file_path for file_path in files
+        if shard_for_path(str(Path(file_path).relative_to(base)), num_shards) == shard_index
+    ]
+
+
+def select_shard_members(members: Iterable, shard_index: int, num_shards: int) -> List:
+    """
+    アーカイブのメンバー一覧から指定シャードに属するメンバーを抽出
+
+    Args:
+        members: ArchiveMember の列（メンバー名をアーカイブ内の相対パスとして使用）
+        shard_index: シャード番号
+        num_shards: シャード数
+
+    Returns:
+        指定シャードのメンバーリスト（元の順序を維持）
+    """
+    validate_shard_args(shard_index, num_shards)
+    return [member for member in members if shard_for_path(member.name, num_shards) == shard_index]
+
+
+def shard_output_dir(output_dir: str, shard_index: int, num_shards: int) -> Path:
+    """シャードのパートファイル出力先"""
+    return Path(output_dir) / SHARD_DIR_NAME / f"shard-{shard_index:05d}-of-{num_shards:05d}"
+
+
+def run_bulk_shard(processor, xml_dir: str, output_dir: str, shard_index: int, num_shards: int,
+                   resume: bool = False, checkpoint_options: Optional[Dict[str, Any]] = None,
+                   prefetch: int = 0) -> Path:
+    """
+    1シャード分の一括処理を実行してパートファイルを出力
+
+    Args:
+        processor: PatentTextProcessor
+        xml_dir: XMLファイルが格納されているディレクトリ
+        output_dir: 最終出力ディレクトリ（パートファイルは shards/ 配下に出力）
+        shard_index: シャード番号
+        num_shards: シャード数
+        resume: シャードのチェックポイントから再開するかどうか
+        checkpoint_options: CheckpointWriter の追加引数（書き出し間隔・パートサイズ・圧縮）
+        prefetch: スレッドプールで先読みするファイル数（0の場合は先読みしない）
+
+    Returns:
+        パートファイルの出力ディレクトリ
+    """
+    validate_shard_args(shard_index, num_shards)
+    part_dir = shard_output_dir(output_dir, shard_index, num_shards)
+
+    print(f"=== シャード {shard_index + 1}/{num_shards} の処理: {xml_dir} ===")
+    df = processor.process_xml_files(xml_dir, shard_index=shard_index, num_shards=num_shards,
+                                     checkpoint_dir=str(part_dir / "checkpoint"), resume=resume,
+                                     checkpoint_options=checkpoint_options, prefetch=prefetch)
+    print(f"処理されたファイル数: {len(df)}")
+
+    # 近似重複除去はシャードをまたいで行う必要があるためマージ時に実施（merge_shard_outputs の deduplicate）
+    processor.create_training_dataset(df, str(part_dir))
+    return part_dir
+
+
+def _run_local_shard(xml_dir: str, output_dir: str, shard_index: int, num_shards: int, resume: bool,
+                     checkpoint_options: Optional[Dict[str, Any]], processor_kwargs: Dict[str, Any],
+                     prefetch: int = 0) -> str:
+    """ワーカープロセスで1シャードを処理（プロセスごとに PatentTextProcessor を生成）"""
+    from .text_processor import PatentTextProcessor
+
+    processor = PatentTextProcessor(**processor_kwargs)
+    return str(run_bulk_shard(processor, xml_dir, output_dir, shard_index, num_shards,
+                              resume=resume, checkpoint_options=checkpoint_options, prefetch=prefetch))
+
+
+def run_local_shards(xml_dir: str, output_dir: str, num_workers: int, resume: bool = False,
+                     checkpoint_options: Optional[Dict[str, Any]] = None,
+                     processor_kwargs: Optional[Dict[str, Any]] = None,
+                     prefetch: int = 0, deduplicate: bool = False) -> Dict[str, Any]:
+    """
+    1台のマシン上で num_workers 個のシャードを並列処理し、出力をマージ
+
+    Args:
+        xml_dir: XMLファイルが格納されているディレクトリ
+        output_dir: 最終出力ディレクトリ
+        num_workers: ワーカープロセス数（＝シャード数）
+        resume: 各シャードのチェックポイントから再開するかどうか
+        checkpoint_options: CheckpointWriter の追加引数
+        processor_kwargs: 各ワーカーの PatentTextProcessor の引数（既定は language="japanese"）
+        prefetch: 各ワーカーがスレッドプールで先読みするファイル数
+        deduplicate: マージ時にシャード横断の近似重複除去を行うかどうか
+
+    Returns:
+        マージ後の統計情報（dataset_stats.json の内容）
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    validate_shard_args(0, num_workers)
+    processor_kwargs = processor_kwargs or {'language': 'japanese'}
+    print(f"=== ローカル並列処理: {num_workers}ワーカー ===")
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(_run_local_shard, xml_dir, output_dir, shard_index, num_workers, resume,
+                            checkpoint_options, processor_kwargs, prefetch)
+            for shard_index in range(num_workers)
+        ]
+        # 1シャードでも失敗した場合は例外を送出（完了済みシャードは resume で再利用できる）
+        for future in futures:
+            logger.info(f"シャード出力完了: {future.result()}")
+
+    return merge_shard_outputs(output_dir, num_workers, deduplicate=deduplicate)
+
+
+def _find_shard_dirs(output_dir: str, num_shards: Optional[int]) -> List[Path]:
+    """出力済みシャードディレクトリを検索し、全シャードが揃っているか確認"""
+    shards_root = Path(output_dir) / SHARD_DIR_NAME
+    found = {}
+    counts = set()
+    if shards_root.exists():
+        for child in shards_root.iterdir():
+            match = SHARD_DIR_PATTERN.match(child.name)
+            if not (match and child.is_dir()):
+                continue
+            index, count = int(match.group(1)), int(match.group(2))
+            if num_shards is not None and count != num_shards:
+                continue
+            counts.add(count)
+            if (child / SHARD_COMPLETE_MARKER).exists():
+                found[index] = child
+
+    if num_shards is None:
+        if len(counts) != 1:
+            raise ValueError(f"シャード数を特定できません（検出: {sorted(counts)}）。num_shards を指定してください")
+        num_shards = counts.pop()
+
+    missing = [index for index in range(num_shards) if index not in found]
+    if missing:
+        raise FileNotFoundError(f"未完了のシャードがあります: {missing} (全{num_shards}シャード)")
+
+    return [found[index] for index in range(num_shards)]
+
+
+def _load_json(path: Path) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _record_patent_id(record: Dict[str, Any]) -> str:
+    """パートファイルのレコードから patent_id を取得（ChatML形式は metadata 内）"""
+    if 'patent_id' in record:
+        return record['patent_id']
+    return record.get('metadata', {}).get('patent_id', '')
+
+
+def _iter_part_records(shard_dirs: List[Path], file_name: str,
+                       seen_ids: Optional[set] = None) -> Iterator[Dict[str, Any]]:
+    """全シャードのパートファイルのレコードをシャード順に1件ずつ返す（seen_ids には読み込んだ特許IDを追加）"""
+    for shard_dir in shard_dirs:
+        for record in iter_json_records(shard_dir / file_name):
+            if seen_ids is not None:
+                seen_ids.add(_record_patent_id(record))
+            yield record
+
+
+def merge_shard_outputs(output_dir: str, num_shards: Optional[int] = None, deduplicate: bool = False,
+                        dedup_threshold: float = 0.8) -> Dict[str, Any]:
+    """
+    シャードのパートファイルを結合して最終データセットを作成
+
+    Args:
+        output_dir: 最終出力ディレクトリ（shards/ 配下にパートファイルがあること）
+        num_shards: シャード数（Noneの場合はディレクトリ名から推定）
+        deduplicate: シャード横断の近似重複除去を行うかどうか（シャード分割しない場合の --dedup に相当）
+        dedup_threshold: 重複とみなす推定Jaccard類似度
+
+    Returns:
+        最終的な統計情報（dataset_stats.json の内容）
+    """
+    output_directory = Path(output_dir)
+    shard_dirs = _find_shard_dirs(output_dir, num_shards)
+    print(f"=== シャード出力のマージ: {len(shard_dirs)}シャード ===")
+
+    # 完全版を1件ずつ結合（指定した場合はシャード横断で近似重複を除去）
+    seen_ids = set()
+    complete_records = _iter_part_records(shard_dirs, 'complete_dataset.json', seen_ids if deduplicate else None)
+    deduplicator = None
+    if deduplicate:
+        from .deduplication import MinHashDeduplicator
+
+        index_path = str(output_directory / "minhash_index.json")
+        deduplicator = MinHashDeduplicator(threshold=dedup_threshold, index_path=index_path)
+        complete_records = deduplicator.iter_deduplicated(complete_records, text_field='combined_text',
+                                                          id_field='patent_id')
+
+    kept_ids = set()
+    total_sentences = 0
+    total_claims = 0
+    with JSONArrayWriter(output_directory / 'complete_dataset.json') as writer:
+        for record in complete_records:
+            if deduplicator is not None:
+                kept_ids.add(_record_patent_id(record))
+            total_sentences += record.get('sentence_count', 0)
+            total_claims += record.get('claims_count', 0)
+            writer.write(record)
+    total_patents = writer.count
+    print(f"  - complete_dataset.json: {total_patents}件")
+
+    dropped_ids = set()
+    if deduplicator is not None:
+        deduplicator.save(index_path)
+        deduplicator.write_report(str(output_directory / "dedup_report.json"))
+        dropped_ids = seen_ids - kept_ids
+
+    # 残りのパートファイルを結合して出力（除外した特許のレコードは除く）
+    for file_name in PART_FILES:
+        if file_name == 'complete_dataset.json':
+            continue
+        with JSONArrayWriter(output_directory / file_name) as writer:
+            writer.write_all(
+                record for record in _iter_part_records(shard_dirs, file_name)
+                if _record_patent_id(record) not in dropped_ids
+            )
+        print(f"  - {file_name}: {writer.count}件")
+
+    # 統計情報の集約
+    shard_stats = [_load_json(shard_dir / SHARD_COMPLETE_MARKER) for shard_dir in shard_dirs]
+    stats = {
+        'dataset_info': {
+            'created_at': datetime.now().isoformat(),
+            'total_patents': total_patents,
+            'total_sentences': int(total_sentences),
+            'total_claims': int(total_claims),
+            'num_shards': len(shard_dirs),
+            'dropped_duplicates': len(dropped_ids),
+        },
+        'file_descriptions': shard_stats[0].get('file_descriptions', {}),
+        'shards': [
+            dict(stats_data.get('dataset_info', {}), shard=shard_dir.name)
+            for shard_dir, stats_data in zip(shard_dirs, shard_stats)
+        ]
+    }
+
+    with open(output_directory / SHARD_COMPLETE_MARKER, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+
+    print(f"マージ完了: {output_directory} (特許数: {stats['dataset_info']['total_patents']})")
+    return stats
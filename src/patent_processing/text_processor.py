@@ -1,31 +1,118 @@
 """
 特許文書のテキスト前処理を行うモジュール
 日本特許庁のST96 XMLフォーマットに対応
+
+コマンドラインからはパッケージ内のモジュールとして実行する（相対インポートを使用するため）:
+    cd src && python -m patent_processing.text_processor bulk /path/to/xml_dir
 """
 
 import re
-import pandas as pd
-import xml.etree.ElementTree as ET
+import sys
+from array import array
 import json
 import numpy as np
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Union, Tuple, Mapping
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
+from typing import List, Optional, Dict, Any, Union, Tuple, Mapping, BinaryIO, Iterator, TYPE_CHECKING
+
+# pandas・nltk は読み込みに時間がかかるため使用時に読み込む（ワーカープロセスの起動時間短縮）
+if TYPE_CHECKING:
+    import pandas as pd
+    from .archive import ArchiveMember
+
+from .analysis import LegalAnalysis, ChemicalAnalysis, LEGAL_CATEGORIES, CHEMICAL_PATTERN_GROUPS, CHEMICAL_PATTERNS
+from .patent_ids import assign_patent_id, get_patent_id
+from .records import PatentRecord
+from .profiling import StageProfiler
+from .xml_backend import ST96_NAMESPACES, LINE_BREAK_MARKER, get_xml_backend
 
 # ロガーの初期化
 logger = logging.getLogger(__name__)
 
+# ST96 共通名前空間の段落番号属性
+PNUMBER_ATTRIBUTE = '{http://www.wipo.int/standards/XMLSchema/ST96/Common}pNumber'
+
+
+def _normalize_text(buffer: List[str]) -> str:
+    """
+    テキスト断片を結合し、空白を1回の走査で正規化
+
+    XML由来の改行・インデントを含む空白の連続は1つの空白に、<com:Br/> は改行にする。
+
+    Args:
+        buffer: XMLバックエンドの collect_text で収集したテキスト断片
+
+    Returns:
+        正規化済みテキスト
+    """
+    text = ''.join(buffer)
+    if LINE_BREAK_MARKER not in text:
+        return ' '.join(text.split())
+    lines = (' '.join(segment.split()) for segment in text.split(LINE_BREAK_MARKER))
+    return '\n'.join(line for line in lines if line)
+
+
+def _iter_xml_inputs(xml_dir: str, shard_index: int = 0, num_shards: int = 1
+                     ) -> Tuple[int, Iterator[Tuple[str, Union[Path, 'ArchiveMember'], Optional[BinaryIO]]]]:
+    """
+    process_xml_files の入力（ディレクトリ配下のXMLファイル、またはアーカイブのメンバー）を列挙
+    
+    Args:
+        xml_dir: XMLファイルが格納されているディレクトリ、またはアーカイブ
+        shard_index: 処理するシャード番号
+        num_shards: シャード数
+    
+    Returns:
+        (入力件数, (ファイル識別子, ファイルパスまたはメンバー, ストリーム) のイテレータ)
+        ストリームはランダムアクセスできない .tar.gz の場合のみ設定される（次の要素に進むまで有効）
+    """
+    from .archive import is_archive
+    
+    if not is_archive(xml_dir):
+        xml_files = list(Path(xml_dir).glob("**/*.xml"))
+        if num_shards > 1:
+            from .sharding import select_shard
+            xml_files = select_shard(xml_files, xml_dir, shard_index, num_shards)
+        return len(xml_files), ((Path(xml_file).relative_to(xml_dir).as_posix(), xml_file, None)
+                                for xml_file in xml_files)
+    
+    from .archive import list_members, iter_archive
+    members = list_members(xml_dir)
+    if num_shards > 1:
+        from .sharding import select_shard_members
+        members = select_shard_members(members, shard_index, num_shards)
+    if all(member.offset is not None for member in members):
+        # .zip/.tar はメンバーごとにデータ位置から直接読み込む
+        return len(members), ((member.name, member, None) for member in members)
+    return len(members), ((member.name, member, stream)
+                          for member, stream in iter_archive(xml_dir, members=members))
+
+
+def _is_pandas_series(obj: Any) -> bool:
+    """pandas.Series かどうかを判定（pandas が未読み込みなら Series は存在しないため読み込まない）"""
+    pandas = sys.modules.get('pandas')
+    return pandas is not None and isinstance(obj, pandas.Series)
+
+
+def _input_size(source: Union[str, Path, BinaryIO]) -> int:
+    """XML解析の入力のバイト数（ストリームの場合は読み込み済みの位置。取得できない場合は0）"""
+    try:
+        if isinstance(source, (str, Path)):
+            return Path(source).stat().st_size
+        return source.tell()
+    except (OSError, AttributeError, ValueError):
+        return 0
+
 
 class PatentTextProcessor:
     """特許文書のテキスト前処理クラス"""
     
     def __init__(self, language: str = "japanese", enable_chemical_processing: bool = True,
                  max_description_length: Optional[int] = None,
-                 description_sources: Optional[List[str]] = None):
+                 description_sources: Optional[List[str]] = None,
+                 profiler: Optional[StageProfiler] = None,
+                 xml_backend: Optional[str] = None):
         """
         初期化
         
@@ -35,6 +122,8 @@ class PatentTextProcessor:
             max_description_length: 実施形態説明の最大文字数（Noneの場合は制限なし）
             description_sources: 使用する説明タグのリスト（Noneの場合は全て使用）
                                 ['EmbodimentDescription', 'DetailedDescription', 'BestMode', 'InventionMode']
+            profiler: ステージ別の処理時間を計測するプロファイラ（Noneの場合は計測しない）
+            xml_backend: XML解析バックエンド（'etree'・'lxml'・'auto'。Noneの場合は 'etree'）
         """
         self.language = language
         self.enable_chemical_processing = enable_chemical_processing
@@ -42,7 +131,10 @@ class PatentTextProcessor:
         self.description_sources = description_sources or [
             'EmbodimentDescription', 'DetailedDescription', 'BestMode', 'InventionMode'
         ]
-        self._download_nltk_data()
+        self.profiler = profiler or StageProfiler(enabled=False)
+        # NLTKは英語の文分割でのみ使用するため、日本語モードではデータを確認しない
+        if self.language == "english":
+            self._download_nltk_data()
         
         # 化学式処理の初期化
         if self.enable_chemical_processing:
@@ -52,15 +144,14 @@ class PatentTextProcessor:
         self._init_legal_expressions()
         
         # ST96 XMLフォーマットの名前空間定義
-        self.namespaces = {
-            'jppat': 'http://www.jpo.go.jp/standards/XMLSchema/ST96/JPPatent',
-            'jpcom': 'http://www.jpo.go.jp/standards/XMLSchema/ST96/JPCommon',
-            'com': 'http://www.wipo.int/standards/XMLSchema/ST96/Common',
-            'pat': 'http://www.wipo.int/standards/XMLSchema/ST96/Patent'
-        }
+        self.namespaces = dict(ST96_NAMESPACES)
+        # 解析バックエンド（各フィールドのパスは事前コンパイル済み）
+        self.xml_backend = get_xml_backend(xml_backend, self.namespaces)
         
     def _download_nltk_data(self):
         """必要なNLTKデータをダウンロード"""
+        import nltk
+        
         try:
             nltk.data.find('tokenizers/punkt')
         except LookupError:
@@ -73,69 +164,27 @@ class PatentTextProcessor:
     
     def _init_chemical_patterns(self):
         """化学式処理用のパターンを初期化"""
-        # 有機化合物の分子式（C07分野中心）
-        self.organic_molecular_formulas = [
-            r'C\d{1,3}H\d{1,3}(?:O\d{1,2})?(?:N\d{1,2})?(?:S\d{1,2})?(?:P\d{1,2})?(?:Cl\d{1,2})?(?:Br\d{1,2})?(?:F\d{1,2})?(?:I\d{1,2})?',
-            r'(?:CH₃|CH₂|CH|C)(?:[-–](?:CH₃|CH₂|CH|C))*',  # 構造式表記
-            r'R₁|R₂|R₃|R₄|X|Y|Z',  # 化学式中の置換基表記
-        ]
-        
-        # 無機化合物（C01分野中心）
-        self.inorganic_compounds = [
-            r'H₂SO₄|HCl|HNO₃|H₃PO₄|NH₃|NaOH|KOH|Ca\(OH\)₂',  # 主要酸・塩基
-            r'NaCl|KCl|CaCl₂|MgSO₄|Na₂CO₃|K₂CO₃|NaHCO₃',  # 主要塩類
-            r'TiO₂|SiO₂|Al₂O₃|Fe₂O₃|CuO|ZnO|MgO|CaO',  # 金属酸化物
-            r'[A-Z][a-z]?(?:\d+)?(?:[+-]\d*)?',  # 元素記号＋イオン
-        ]
+        # パターンの定義は analysis.CHEMICAL_PATTERN_GROUPS（レコードのパターンIDを固定するため共有）
+        (self.organic_molecular_formulas, self.inorganic_compounds, self.polymer_formulas,
+         self.chemical_reactions, self.chemical_properties,
+         self.experimental_conditions) = (list(patterns) for patterns in CHEMICAL_PATTERN_GROUPS)
         
-        # 高分子化合物（C08分野）
-        self.polymer_formulas = [
-            r'\[-(?:CH₂[-–]CH₂[-–]|CH₂[-–]CHR[-–]|CH₂[-–]CR₂[-–])+\]ₙ',  # ポリマー表記
-            r'(?:PE|PP|PS|PVC|PET|PMMA|PA|PC|PU|PTFE)',  # 高分子略号
-            r'Mw\s*[=:]\s*\d+(?:[,，]\d+)*|Mn\s*[=:]\s*\d+(?:[,，]\d+)*',  # 分子量
-            r'重合度\s*[=:]\s*\d+(?:[,，]\d+)*',
-        ]
+        # 全パターンをまとめる（CHEMICAL_PATTERNS と同じ順）
+        self.all_chemical_patterns = list(CHEMICAL_PATTERNS)
         
-        # 化学反応式
-        self.chemical_reactions = [
-            r'[A-Z][a-z]?\d*(?:\s*[+＋]\s*[A-Z][a-z]?\d*)*\s*[→⇒]\s*[A-Z][a-z]?\d*(?:\s*[+＋]\s*[A-Z][a-z]?\d*)*',
-            r'[A-Z][a-z]?\d*\s*[⇌⇔]\s*[A-Z][a-z]?\d*',  # 平衡反応
-            r'[A-Z][a-z]?\d*\s*[→⇒]\s*[A-Z][a-z]?\d*\s*/\s*[A-Z][a-z]?',  # 触媒反応
-        ]
-        
-        # 化学的性質・数値
-        self.chemical_properties = [
-            r'融点\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?\s*℃',
-            r'沸点\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?\s*℃',
-            r'\d+(?:\.\d+)?\s*(?:wt%|重量%|質量%|mol%|体積%|重量％|質量％|体積％)',
-            r'純度\s*[=:：]?\s*\d+(?:\.\d+)?\s*%以上',
-            r'pH\s*[=:：]?\s*\d+(?:\.\d+)?(?:[～〜~]\d+(?:\.\d+)?)?',
-            r'pKa\s*[=:：]?\s*\d+(?:\.\d+)?',
-            r'収率\s*[=:：]?\s*\d+(?:\.\d+)?\s*%',
-            r'選択性\s*[=:：]?\s*\d+(?:\.\d+)?\s*%',
-        ]
+        # コンパイル済み正規表現パターンを作成
+        self.compiled_chemical_patterns = [re.compile(pattern) for pattern in self.all_chemical_patterns]
         
-        # 実験条件・装置
-        self.experimental_conditions = [
-            r'\d+(?:\.\d+)?\s*℃(?:で|にて|において|に|下で)',
-            r'\d+(?:\.\d+)?\s*(?:MPa|kPa|mmHg|Torr|Pa|atm)(?:で|にて|において|に|下で)',
-            r'\d+(?:\.\d+)?\s*(?:時間|分|秒|hr|min|sec)(?:反応させ|加熱し|撹拌し|処理し)',
-            r'(?:オートクレーブ|反応器|蒸留塔|分離塔|カラム|反応釜)(?:中で|内で|にて)',
+        # パターンID → カテゴリIDテーブル（all_chemical_patterns と同じ順）
+        pattern_groups = [
+            self.organic_molecular_formulas, self.inorganic_compounds, self.polymer_formulas,
+            self.chemical_reactions, self.chemical_properties, self.experimental_conditions,
         ]
-        
-        # 全パターンをまとめる
-        self.all_chemical_patterns = (
-            self.organic_molecular_formulas + 
-            self.inorganic_compounds + 
-            self.polymer_formulas + 
-            self.chemical_reactions + 
-            self.chemical_properties + 
-            self.experimental_conditions
+        self.chemical_pattern_categories = np.array(
+            [category_id for category_id, patterns in enumerate(pattern_groups) for _ in patterns],
+            dtype=np.int8
         )
         
-        # コンパイル済み正規表現パターンを作成
-        self.compiled_chemical_patterns = [re.compile(pattern) for pattern in self.all_chemical_patterns]
-        
         # 化学コンテキストキーワード
         self.chemical_context_keywords = [
             '化合物', '分子', '溶液', '反応', '合成', '製造', '調製', '精製',
@@ -258,6 +307,33 @@ class PatentTextProcessor:
             'を含む', '少なくとも', '複数の', 'による', 'に関する',
             '実施の形態', '効果を奏する', '課題を解決する'
         ]
+        
+        # 重要度判定用の正規表現（部分文字列チェックの繰り返しを1回の検索にまとめる）
+        self._critical_legal_regex = re.compile('|'.join(map(re.escape, self.critical_legal_expressions)))
+        self._important_legal_regex = re.compile('|'.join(map(re.escape, self.important_legal_expressions)))
+        
+        # パターンID → カテゴリIDテーブル
+        # 請求項パターンのマッチは必ず自身のパターンに一致するため 'claim'。
+        # 明細書・手続表現はリテラルなので、パターン文字列自体を分類すればマッチの分類と一致する
+        # （例: 「工程を含む」は「を含む」を含むため 'claim'）
+        num_claim_patterns = len(self.claim_legal_expressions)
+        self.legal_pattern_categories = np.array([
+            LEGAL_CATEGORIES.index('claim') if i < num_claim_patterns
+            else LEGAL_CATEGORIES.index(self._categorize_legal_expression(pattern))
+            for i, pattern in enumerate(self.all_legal_patterns)
+        ], dtype=np.int8)
+        
+        # パターンID → 重要度テーブル
+        # マッチは必ずパターン先頭のリテラル部分を含むため、その重要度が下限になる。
+        # リテラルのみのパターンと下限が既にクリティカルのパターンは重要度が一定で、
+        # それ以外（例: 「所定の[^。、]*」）のみマッチ内容による判定が必要
+        self.legal_pattern_importance = np.zeros(len(self.all_legal_patterns), dtype=np.int8)
+        self.content_dependent_legal_patterns = np.zeros(len(self.all_legal_patterns), dtype=bool)
+        for i, pattern in enumerate(self.all_legal_patterns):
+            literal_prefix = re.match(r'[^\\\[\](){}.*+?|^$]*', pattern).group()
+            self.legal_pattern_importance[i] = self._get_legal_expression_importance(literal_prefix)
+            if literal_prefix != pattern and self.legal_pattern_importance[i] < 2:
+                self.content_dependent_legal_patterns[i] = True
     
     def clean_text(self, text: str) -> str:
         """
@@ -369,53 +445,47 @@ class PatentTextProcessor:
         """
         if not self.enable_chemical_processing:
             return []
-            
-        entities = []
         
-        pattern_categories = [
-            ('organic_molecular', self.organic_molecular_formulas),
-            ('inorganic_compound', self.inorganic_compounds),
-            ('polymer', self.polymer_formulas),
-            ('reaction', self.chemical_reactions),
-            ('property', self.chemical_properties),
-            ('condition', self.experimental_conditions),
-        ]
+        return self.analyze_chemical_content(text).entities()
+    
+    def _match_chemical_entities(self, text: str) -> ChemicalAnalysis:
+        """化学エンティティのマッチ位置を配列で収集（重複除去済み）"""
+        starts = []
+        ends = []
+        pattern_ids = []
         
-        for category, patterns in pattern_categories:
-            for pattern in patterns:
-                compiled_pattern = re.compile(pattern)
-                for match in compiled_pattern.finditer(text):
-                    if self._is_valid_chemical_context(text, match.start(), match.end()):
-                        entity = {
-                            'text': match.group(),
-                            'category': category,
-                            'start': match.start(),
-                            'end': match.end(),
-                            'pattern': pattern
-                        }
-                        entities.append(entity)
+        for pattern_id, compiled_pattern in enumerate(self.compiled_chemical_patterns):
+            for match in compiled_pattern.finditer(text):
+                start, end = match.span()
+                if self._is_valid_chemical_context(text, start, end):
+                    starts.append(start)
+                    ends.append(end)
+                    pattern_ids.append(pattern_id)
+        
+        starts = np.array(starts, dtype=np.int32)
+        ends = np.array(ends, dtype=np.int32)
+        pattern_ids = np.array(pattern_ids, dtype=np.int16)
         
         # 重複除去（同じ位置の重複マッチを防ぐ）
-        entities = self._remove_overlapping_entities(entities)
+        keep = self._remove_overlapping_entities(starts, ends)
         
-        return entities
+        return ChemicalAnalysis(text, starts[keep], ends[keep], pattern_ids[keep],
+                                self.chemical_pattern_categories, self.all_chemical_patterns)
     
-    def _remove_overlapping_entities(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """重複するエンティティを除去"""
-        if not entities:
-            return []
-            
-        # 開始位置でソート
-        entities.sort(key=lambda x: x['start'])
+    def _remove_overlapping_entities(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """重複するエンティティを除去し、残すマッチのインデックスを返す"""
+        # 開始位置でソート（同位置はパターン順を維持）
+        order = np.argsort(starts, kind='stable')
         
-        filtered = [entities[0]]
-        
-        for entity in entities[1:]:
+        keep = []
+        last_end = -1
+        for index, start, end in zip(order.tolist(), starts[order].tolist(), ends[order].tolist()):
             # 前のエンティティと重複していない場合のみ追加
-            if entity['start'] >= filtered[-1]['end']:
-                filtered.append(entity)
+            if start >= last_end:
+                keep.append(index)
+                last_end = end
         
-        return filtered
+        return np.array(keep, dtype=np.intp)
     
     def enhanced_clean_text(self, text: str) -> str:
         """
@@ -459,73 +529,13 @@ class PatentTextProcessor:
             text: 入力テキスト
             
         Returns:
-            化学的内容の分析結果
+            化学的内容の分析結果（ChemicalAnalysis。従来の辞書と同じキーで参照可能）
         """
         if not self.enable_chemical_processing:
             return {'enabled': False}
-            
-        entities = self.extract_chemical_entities(text)
-        
-        # カテゴリ別統計
-        category_counts = {}
-        for entity in entities:
-            category = entity['category']
-            category_counts[category] = category_counts.get(category, 0) + 1
-        
-        # ユニークな化学式の抽出
-        unique_formulas = list(set(entity['text'] for entity in entities))
-        
-        # 複雑度スコアの計算
-        complexity_score = self._calculate_chemical_complexity(entities)
-        
-        analysis_result = {
-            'enabled': True,
-            'total_entities': len(entities),
-            'unique_formulas': len(unique_formulas),
-            'category_counts': category_counts,
-            'complexity_score': complexity_score,
-            'entities': entities,
-            'unique_formulas_list': unique_formulas
-        }
         
-        return analysis_result
-    
-    def _calculate_chemical_complexity(self, entities: List[Dict[str, Any]]) -> float:
-        """
-        化学的複雑度スコアを計算
-        
-        Args:
-            entities: 化学エンティティのリスト
-            
-        Returns:
-            複雑度スコア（0.0-1.0）
-        """
-        if not entities:
-            return 0.0
-        
-        complexity_weights = {
-            'organic_molecular': 0.3,
-            'inorganic_compound': 0.2,
-            'polymer': 0.4,
-            'reaction': 0.5,
-            'property': 0.1,
-            'condition': 0.1
-        }
-        
-        total_score = 0.0
-        for entity in entities:
-            category = entity['category']
-            weight = complexity_weights.get(category, 0.1)
-            
-            # テキスト長による追加重み
-            length_factor = min(len(entity['text']) / 20.0, 1.0)
-            total_score += weight * (1.0 + length_factor)
-        
-        # 正規化（最大値で割る）
-        max_possible_score = len(entities) * 1.0  # 最大重み値
-        normalized_score = min(total_score / max_possible_score, 1.0)
-        
-        return round(normalized_score, 3)
+        # 位置・パターンIDの配列で保持し、集計・エンティティリストは参照時に計算する
+        return self._match_chemical_entities(text)
     
     def protect_legal_expressions(self, text: str) -> Tuple[str, Dict[str, str]]:
         """
@@ -541,18 +551,27 @@ class PatentTextProcessor:
         legal_map = {}
         
         for i, pattern in enumerate(self.compiled_legal_patterns):
+            base_importance = int(self.legal_pattern_importance[i])
+            content_dependent = self.content_dependent_legal_patterns[i]
+            # 内容に関わらず通常（重要度0）のパターンは保護対象外
+            if base_importance == 0 and not content_dependent:
+                continue
+            category = LEGAL_CATEGORIES[self.legal_pattern_categories[i]]
+            
             matches = list(pattern.finditer(protected_text))
             for j, match in enumerate(matches):
-                legal_expr = match.group()
-                
                 # 重要度チェック
-                importance = self._get_legal_expression_importance(legal_expr)
+                importance = base_importance
+                if content_dependent:
+                    importance = self._match_legal_importance(protected_text, match.start(), match.end(),
+                                                              base_importance)
                 if importance >= 1:  # 重要または重要度クリティカル
+                    legal_expr = match.group()
                     token = f"__LEGAL_{i}_{j}__"
                     legal_map[token] = {
                         'expression': legal_expr,
                         'importance': importance,
-                        'category': self._categorize_legal_expression(legal_expr)
+                        'category': category
                     }
                     protected_text = protected_text.replace(legal_expr, token, 1)
         
@@ -587,13 +606,26 @@ class PatentTextProcessor:
         Returns:
             重要度 (0: 通常, 1: 重要, 2: クリティカル)
         """
-        for critical_expr in self.critical_legal_expressions:
-            if critical_expr in expression:
-                return 2  # クリティカル
+        return self._match_legal_importance(expression, 0, len(expression), 0)
+    
+    def _match_legal_importance(self, text: str, start: int, end: int, base_importance: int) -> int:
+        """
+        テキスト中のマッチ範囲の重要度を判定（部分文字列を切り出さずに検索）
+        
+        Args:
+            text: テキスト全体
+            start: マッチ開始位置
+            end: マッチ終了位置
+            base_importance: パターンから決まる重要度の下限
+            
+        Returns:
+            重要度 (0: 通常, 1: 重要, 2: クリティカル)
+        """
+        if self._critical_legal_regex.search(text, start, end):
+            return 2  # クリティカル
         
-        for important_expr in self.important_legal_expressions:
-            if important_expr in expression:
-                return 1  # 重要
+        if base_importance >= 1 or self._important_legal_regex.search(text, start, end):
+            return 1  # 重要
         
         return 0  # 通常
     
@@ -634,51 +666,66 @@ class PatentTextProcessor:
         Returns:
             法的表現のリスト
         """
-        expressions = []
+        return self.analyze_legal_content(text).expressions()
+    
+    def _match_legal_expressions(self, text: str) -> LegalAnalysis:
+        """法的表現のマッチ位置を配列で収集（重複除去済み）"""
+        spans = array('i')
+        pattern_ids = array('h')
+        importance = array('b')
         
         for i, pattern in enumerate(self.compiled_legal_patterns):
-            for match in pattern.finditer(text):
-                legal_expr = match.group()
-                importance = self._get_legal_expression_importance(legal_expr)
-                category = self._categorize_legal_expression(legal_expr)
-                
-                expression_data = {
-                    'text': legal_expr,
-                    'start': match.start(),
-                    'end': match.end(),
-                    'importance': importance,
-                    'category': category,
-                    'pattern_index': i
-                }
-                expressions.append(expression_data)
+            base_importance = int(self.legal_pattern_importance[i])
+            if self.content_dependent_legal_patterns[i]:
+                # マッチ内容によって重要度が変わるパターンのみ個別に判定
+                for match in pattern.finditer(text):
+                    start, end = match.span()
+                    spans.extend((start, end))
+                    importance.append(self._match_legal_importance(text, start, end, base_importance))
+                    pattern_ids.append(i)
+            else:
+                count = len(spans)
+                for match in pattern.finditer(text):
+                    spans.extend(match.span())
+                match_count = (len(spans) - count) // 2
+                pattern_ids.extend([i] * match_count)
+                importance.extend([base_importance] * match_count)
+        
+        spans = np.frombuffer(spans, dtype=np.int32).reshape(-1, 2) if spans else np.empty((0, 2), dtype=np.int32)
+        starts = spans[:, 0]
+        ends = spans[:, 1]
+        pattern_ids = np.frombuffer(pattern_ids, dtype=np.int16) if pattern_ids else np.empty(0, dtype=np.int16)
+        importance = np.frombuffer(importance, dtype=np.int8) if importance else np.empty(0, dtype=np.int8)
         
         # 重複除去（同じ位置の重複マッチを防ぐ）
-        expressions = self._remove_overlapping_legal_expressions(expressions)
-        
-        return expressions
-    
-    def _remove_overlapping_legal_expressions(self, expressions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """重複する法的表現を除去（重要度を考慮）"""
-        if not expressions:
-            return []
-        
-        # 開始位置でソート
-        expressions.sort(key=lambda x: (x['start'], -x['importance']))
-        
-        filtered = [expressions[0]]
-        
-        for expr in expressions[1:]:
+        keep = self._remove_overlapping_legal_expressions(starts, ends, importance)
+        
+        return LegalAnalysis(text, starts[keep], ends[keep], pattern_ids[keep], importance[keep],
+                             self.legal_pattern_categories)
+    
+    def _remove_overlapping_legal_expressions(self, starts: np.ndarray, ends: np.ndarray,
+                                              importance: np.ndarray) -> np.ndarray:
+        """重複する法的表現を除去（重要度を考慮）し、残すマッチのインデックスを返す"""
+        # 開始位置・重要度降順でソート
+        order = np.lexsort((-importance.astype(np.int16), starts))
+        
+        keep = []
+        last_end = -1
+        last_importance = -1
+        for index, start, end, imp in zip(order.tolist(), starts[order].tolist(),
+                                          ends[order].tolist(), importance[order].tolist()):
             # 前の表現と重複していない、または重要度が高い場合
-            if (expr['start'] >= filtered[-1]['end'] or 
-                expr['importance'] > filtered[-1]['importance']):
+            if start >= last_end:
+                keep.append(index)
+            elif imp > last_importance:
                 # 重要度が高い場合は前の表現を置き換え
-                if (expr['start'] < filtered[-1]['end'] and 
-                    expr['importance'] > filtered[-1]['importance']):
-                    filtered[-1] = expr
-                else:
-                    filtered.append(expr)
+                keep[-1] = index
+            else:
+                continue
+            last_end = end
+            last_importance = imp
         
-        return filtered
+        return np.array(keep, dtype=np.intp)
     
     def analyze_legal_content(self, text: str) -> Dict[str, Any]:
         """
@@ -688,73 +735,10 @@ class PatentTextProcessor:
             text: 入力テキスト
             
         Returns:
-            法的表現の分析結果
-        """
-        expressions = self.extract_legal_expressions(text)
-        
-        # カテゴリ別統計
-        category_counts = {}
-        importance_counts = {0: 0, 1: 0, 2: 0}
-        
-        for expr in expressions:
-            category = expr['category']
-            importance = expr['importance']
-            
-            category_counts[category] = category_counts.get(category, 0) + 1
-            importance_counts[importance] += 1
-        
-        # 法的品質スコアの計算
-        legal_quality_score = self._calculate_legal_quality_score(expressions)
-        
-        analysis_result = {
-            'total_expressions': len(expressions),
-            'category_counts': category_counts,
-            'importance_distribution': {
-                'critical': importance_counts[2],
-                'important': importance_counts[1],
-                'normal': importance_counts[0]
-            },
-            'legal_quality_score': legal_quality_score,
-            'expressions': expressions,
-            'has_claim_expressions': any(expr['category'] == 'claim' for expr in expressions),
-            'has_critical_expressions': any(expr['importance'] == 2 for expr in expressions)
-        }
-        
-        return analysis_result
-    
-    def _calculate_legal_quality_score(self, expressions: List[Dict[str, Any]]) -> float:
-        """
-        法的表現の品質スコアを計算
-        
-        Args:
-            expressions: 法的表現のリスト
-            
-        Returns:
-            品質スコア（0.0-1.0）
+            法的表現の分析結果（LegalAnalysis。従来の辞書と同じキーで参照可能）
         """
-        if not expressions:
-            return 0.0
-        
-        # 重要度による重み付け
-        total_score = 0.0
-        for expr in expressions:
-            importance = expr['importance']
-            if importance == 2:  # クリティカル
-                total_score += 1.0
-            elif importance == 1:  # 重要
-                total_score += 0.6
-            else:  # 通常
-                total_score += 0.3
-        
-        # カテゴリの多様性ボーナス
-        unique_categories = len(set(expr['category'] for expr in expressions))
-        diversity_bonus = min(unique_categories * 0.1, 0.3)
-        
-        # 正規化
-        max_possible_score = len(expressions) * 1.0
-        normalized_score = min((total_score + diversity_bonus) / max_possible_score, 1.0)
-        
-        return round(normalized_score, 3)
+        # 位置・パターンID・重要度の配列で保持し、集計・表現リストは参照時に計算する
+        return self._match_legal_expressions(text)
     
     def validate_patent_data(self, patent_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -908,7 +892,7 @@ class PatentTextProcessor:
         if not combined_text:
             return result
         
-        legal_analysis = self.analyze_legal_content(combined_text)
+        legal_analysis = patent_data.get('legal_analysis') or self.analyze_legal_content(combined_text)
         
         # クリティカルな法的表現の存在チェック
         if not legal_analysis['has_critical_expressions']:
@@ -1038,7 +1022,7 @@ class PatentTextProcessor:
         # 法的表現品質ボーナス
         combined_text = patent_data.get('combined_text', '')
         if combined_text:
-            legal_analysis = self.analyze_legal_content(combined_text)
+            legal_analysis = patent_data.get('legal_analysis') or self.analyze_legal_content(combined_text)
             legal_quality = legal_analysis.get('legal_quality_score', 0.0)
             base_score += legal_quality * 0.15
         
@@ -1047,40 +1031,52 @@ class PatentTextProcessor:
         
         return round(final_score, 3)
     
-    def parse_xml_file(self, xml_path: str) -> Dict[str, Any]:
+    def parse_xml_file(self, xml_path: Union[str, BinaryIO]) -> Dict[str, Any]:
         """
         特許XMLファイルを解析してセクション別にデータを抽出
         
         Args:
-            xml_path: XMLファイルのパス
+            xml_path: XMLファイルのパス、またはバイナリストリーム（アーカイブのメンバー等）
             
         Returns:
             セクション別のデータ辞書
         """
         try:
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            
-            patent_data = {
-                'patent_number': self._get_text(root, './/pat:PublicationNumber'),
-                'publication_date': self._get_text(root, './/com:PublicationDate'),
-                'filing_date': self._get_text(root, './/pat:FilingDate'),
-                'title': self._get_text(root, './/pat:InventionTitle'),
-                'abstract': self._extract_abstract(root),
-                'technical_field': self._extract_technical_field(root),
-                'background_art': self._extract_background_art(root),
-                'summary': self._extract_summary(root),
-                'detailed_description': self._extract_detailed_description(root),
-                'claims': self._extract_claims(root),
-                'inventors': self._extract_inventors(root),
-                'applicants': self._extract_applicants(root),
-                'ipc_classification': self._extract_ipc_classification(root),
-                'citations': self._extract_citations(root)
-            }
+            # 各ステージの計測範囲は重ならない（parse は XML の解析のみで、処理量は入力のバイト数）
+            with self.profiler.stage('parse') as stage:
+                root = self.xml_backend.parse(xml_path)
+                if self.profiler.enabled:
+                    stage.bytes = _input_size(xml_path)
+            
+            with self.profiler.stage('extract_detailed_description') as stage:
+                detailed_description = self._extract_detailed_description(root)
+                stage.chars = len(detailed_description)
+            
+            # 実施形態以外のセクション・書誌事項の抽出
+            with self.profiler.stage('extract_sections') as stage:
+                patent_data = {
+                    'patent_number': self._get_text(root, './/pat:PublicationNumber'),
+                    'publication_date': self._get_text(root, './/com:PublicationDate'),
+                    'filing_date': self._get_text(root, './/pat:FilingDate'),
+                    'title': self._get_text(root, './/pat:InventionTitle'),
+                    'abstract': self._extract_abstract(root),
+                    'technical_field': self._extract_technical_field(root),
+                    'background_art': self._extract_background_art(root),
+                    'summary': self._extract_summary(root),
+                    'detailed_description': detailed_description,
+                    'claims': self._extract_claims(root),
+                    'inventors': self._extract_inventors(root),
+                    'applicants': self._extract_applicants(root),
+                    'ipc_classification': self._extract_ipc_classification(root),
+                    'citations': self._extract_citations(root)
+                }
+                if self.profiler.enabled:
+                    stage.chars = sum(len(value) for key, value in patent_data.items()
+                                      if isinstance(value, str) and key != 'detailed_description')
             
             return patent_data
             
-        except ET.ParseError as e:
+        except self.xml_backend.parse_errors as e:
             print(f"XML解析エラー: {e}")
             return {}
         except Exception as e:
@@ -1090,23 +1086,24 @@ class PatentTextProcessor:
     def _get_text(self, root, xpath: str) -> str:
         """XPathでテキストを取得"""
         try:
-            element = root.find(xpath, self.namespaces)
+            element = self.xml_backend.find(root, xpath)
             return element.text.strip() if element is not None and element.text else ""
         except:
             return ""
     
-    def _clean_xml_text(self, text: str) -> str:
-        """XMLから抽出したテキストのクリーニング（段落番号対応版）"""
-        if not text:
-            return ""
-        
-        # XMLタグの除去と改行の正規化
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'<com:Br\s*/>', '\n', text)
-        text = re.sub(r'\n+', '\n', text)
-        text = re.sub(r'\s+', ' ', text)
+    def _element_text(self, element) -> str:
+        """
+        要素配下のテキストを抽出（空白を正規化し、<com:Br/> は改行として保持）
         
-        return text.strip()
+        Args:
+            element: XMLエレメント
+            
+        Returns:
+            正規化済みテキスト
+        """
+        buffer = []
+        self.xml_backend.collect_text(element, buffer)
+        return _normalize_text(buffer)
     
     def _extract_text_with_paragraph_numbers(self, element) -> str:
         """
@@ -1121,69 +1118,65 @@ class PatentTextProcessor:
         if element is None:
             return ""
         
-        text_parts = []
-        
-        # 直接の子要素を処理
-        for child in element:
-            if child.tag.endswith('}P'):  # com:P または pat:P
-                # 段落番号を取得
-                p_number = child.get('{http://www.wipo.int/standards/XMLSchema/ST96/Common}pNumber')
-                if not p_number:
-                    p_number = child.get('pNumber')  # 名前空間なしも試行
-                
-                # 段落のテキストを取得
-                p_text = ET.tostring(child, encoding='unicode', method='text')
-                p_text = self._clean_xml_text(p_text)
-                
-                if p_text:
-                    if p_number:
-                        # 段落番号付きで追加
-                        text_parts.append(f"【{p_number}】\n{p_text}")
-                    else:
-                        # 段落番号なしで追加
-                        text_parts.append(p_text)
-            else:
-                # P以外のタグは再帰処理
-                child_text = self._extract_text_with_paragraph_numbers(child)
-                if child_text:
-                    text_parts.append(child_text)
+        blocks = []
+        self._collect_paragraphs(element, blocks, [])
+        return '\n\n'.join(blocks)
+    
+    def _collect_paragraphs(self, element, blocks: List[str], buffer: List[str]) -> None:
+        """
+        段落（com:P / pat:P）単位のテキストを文書順に blocks へ追加
         
-        # 直接テキストがある場合も含める
+        Args:
+            element: XMLエレメント
+            blocks: 段落テキストの出力先（再帰の全階層で共有）
+            buffer: 段落テキスト収集用の作業バッファ（段落ごとに再利用）
+        """
+        # 直接テキストがある場合は子要素の段落より前に含める
         if element.text and element.text.strip():
-            text_parts.insert(0, element.text.strip())
+            blocks.append(element.text.strip())
         
-        return '\n\n'.join(text_parts)
+        for child in element:
+            if not child.tag.endswith('}P'):  # com:P または pat:P 以外は再帰処理
+                self._collect_paragraphs(child, blocks, buffer)
+                continue
+            
+            # 段落番号を取得（名前空間なしも試行）
+            p_number = child.get(PNUMBER_ATTRIBUTE) or child.get('pNumber')
+            
+            buffer.clear()
+            self.xml_backend.collect_text(child, buffer)
+            p_text = _normalize_text(buffer)
+            
+            if p_text:
+                # 段落番号があれば付けて追加
+                blocks.append(f"【{p_number}】\n{p_text}" if p_number else p_text)
     
     def _extract_abstract(self, root) -> str:
         """要約の抽出"""
-        abstract_elem = root.find('.//pat:Abstract', self.namespaces)
+        abstract_elem = self.xml_backend.find(root, './/pat:Abstract')
         if abstract_elem is not None:
-            text = ET.tostring(abstract_elem, encoding='unicode', method='text')
-            return self._clean_xml_text(text)
+            return self._element_text(abstract_elem)
         return ""
     
     def _extract_technical_field(self, root) -> str:
         """技術分野の抽出"""
-        field_elem = root.find('.//pat:TechnicalField', self.namespaces)
+        field_elem = self.xml_backend.find(root, './/pat:TechnicalField')
         if field_elem is not None:
-            text = ET.tostring(field_elem, encoding='unicode', method='text')
-            return self._clean_xml_text(text)
+            return self._element_text(field_elem)
         return ""
     
     def _extract_background_art(self, root) -> str:
         """背景技術の抽出"""
-        bg_elem = root.find('.//pat:BackgroundArt', self.namespaces)
+        bg_elem = self.xml_backend.find(root, './/pat:BackgroundArt')
         if bg_elem is not None:
-            text = ET.tostring(bg_elem, encoding='unicode', method='text')
-            return self._clean_xml_text(text)
+            return self._element_text(bg_elem)
         return ""
     
     def _extract_summary(self, root) -> str:
         """発明の概要の抽出"""
-        summary_elem = root.find('.//pat:Summary', self.namespaces)
+        summary_elem = self.xml_backend.find(root, './/pat:Summary')
         if summary_elem is not None:
-            text = ET.tostring(summary_elem, encoding='unicode', method='text')
-            return self._clean_xml_text(text)
+            return self._element_text(summary_elem)
         return ""
     
     def _extract_detailed_description(self, root) -> str:
@@ -1209,7 +1202,7 @@ class PatentTextProcessor:
                 continue
                 
             xpath = tag_mapping[source]
-            elem = root.find(xpath, self.namespaces)
+            elem = self.xml_backend.find(root, xpath)
             
             if elem is not None:
                 # 段落番号を含めてテキストを抽出
@@ -1230,23 +1223,22 @@ class PatentTextProcessor:
     def _extract_claims(self, root) -> List[Dict[str, str]]:
         """特許請求の範囲の抽出"""
         claims = []
-        claims_elem = root.find('.//pat:Claims', self.namespaces)
+        claims_elem = self.xml_backend.find(root, './/pat:Claims')
         if claims_elem is not None:
-            for claim in claims_elem.findall('.//pat:Claim', self.namespaces):
+            for claim in self.xml_backend.findall(claims_elem, './/pat:Claim'):
                 claim_num = self._get_text(claim, './/pat:ClaimNumber')
-                claim_text_elem = claim.find('.//pat:ClaimText', self.namespaces)
+                claim_text_elem = self.xml_backend.find(claim, './/pat:ClaimText')
                 if claim_text_elem is not None:
-                    claim_text = ET.tostring(claim_text_elem, encoding='unicode', method='text')
                     claims.append({
                         'claim_number': claim_num,
-                        'claim_text': self._clean_xml_text(claim_text)
+                        'claim_text': self._element_text(claim_text_elem)
                     })
         return claims
     
     def _extract_inventors(self, root) -> List[str]:
         """発明者の抽出"""
         inventors = []
-        inventor_elems = root.findall('.//jppat:Inventor//com:EntityName', self.namespaces)
+        inventor_elems = self.xml_backend.findall(root, './/jppat:Inventor//com:EntityName')
         for elem in inventor_elems:
             if elem.text:
                 inventors.append(elem.text.strip())
@@ -1255,7 +1247,7 @@ class PatentTextProcessor:
     def _extract_applicants(self, root) -> List[str]:
         """出願人の抽出"""
         applicants = []
-        applicant_elems = root.findall('.//jppat:Applicant//com:EntityName', self.namespaces)
+        applicant_elems = self.xml_backend.findall(root, './/jppat:Applicant//com:EntityName')
         for elem in applicant_elems:
             if elem.text:
                 applicants.append(elem.text.strip())
@@ -1264,7 +1256,7 @@ class PatentTextProcessor:
     def _extract_ipc_classification(self, root) -> List[str]:
         """IPC分類の抽出"""
         classifications = []
-        ipc_elems = root.findall('.//pat:MainClassification', self.namespaces)
+        ipc_elems = self.xml_backend.findall(root, './/pat:MainClassification')
         for elem in ipc_elems:
             if elem.text:
                 classifications.append(elem.text.strip())
@@ -1273,7 +1265,7 @@ class PatentTextProcessor:
     def _extract_citations(self, root) -> List[str]:
         """引用文献の抽出"""
         citations = []
-        citation_elems = root.findall('.//com:PatentCitationText', self.namespaces)
+        citation_elems = self.xml_backend.findall(root, './/com:PatentCitationText')
         for elem in citation_elems:
             if elem.text:
                 citations.append(elem.text.strip())
@@ -1296,64 +1288,255 @@ class PatentTextProcessor:
             sentences = re.split(r'[。！？]', text)
             sentences = [s.strip() for s in sentences if s.strip()]
         else:
+            from nltk.tokenize import sent_tokenize
             sentences = sent_tokenize(text)
             
         return sentences
     
-    def process_xml_files(self, xml_dir: str) -> pd.DataFrame:
+    def process_xml_files(self, xml_dir: str, as_records: bool = False,
+                          shard_index: int = 0, num_shards: int = 1,
+                          checkpoint_dir: Optional[str] = None,
+                          resume: bool = False,
+                          checkpoint_options: Optional[Dict[str, Any]] = None,
+                          prefetch: int = 0) -> Union['pd.DataFrame', List['PatentRecord']]:
         """
         XMLファイルの一括処理
         
         Args:
-            xml_dir: XMLファイルが格納されているディレクトリ
+            xml_dir: XMLファイルが格納されているディレクトリ、または .zip/.tar/.tar.gz アーカイブ
+                     （アーカイブは展開せずにメンバーを直接解析する）
+            as_records: Trueの場合、辞書の代わりにコンパクトな PatentRecord のリストを返す
+                        （大規模コーパス向け。records_to_dataframe で既存形式に戻せる）
+            shard_index: 処理するシャード番号（num_shards > 1 の場合）
+            num_shards: シャード数（ファイルを相対パスのハッシュで分割し、指定シャードのみ処理）
+            checkpoint_dir: 処理済みレコードを定期的に書き出すチェックポイントディレクトリ
+            resume: Trueの場合、チェックポイントで完了済みのファイルをスキップして再開
+            checkpoint_options: CheckpointWriter の追加引数（書き出し間隔・パートサイズ・圧縮）
+            prefetch: スレッドプールで先読みするファイル数（0の場合は解析時に1件ずつ読み込む。
+                      ネットワーク・USBドライブ等の読み込みが遅いストレージで解析と読み込みを重ねる）
             
         Returns:
-            処理済みDataFrame
+            処理済みDataFrame（as_records=True の場合は PatentRecord のリスト）
         """
-        xml_files = list(Path(xml_dir).glob("**/*.xml"))
+        total_files, xml_inputs = _iter_xml_inputs(xml_dir, shard_index, num_shards)
         processed_data = []
         
-        for xml_file in xml_files:
-            try:
-                patent_data = self.parse_xml_file(str(xml_file))
-                if patent_data:
-                    patent_data['xml_file_path'] = str(xml_file)
-                    patent_data['file_name'] = xml_file.name
-                    
-                    combined_text = self._combine_text_sections(patent_data)
-                    patent_data['combined_text'] = self.enhanced_clean_text(combined_text)
-                    
-                    # 化学的内容の分析
-                    if self.enable_chemical_processing:
-                        chemical_analysis = self.analyze_chemical_content(patent_data['combined_text'])
-                        patent_data['chemical_analysis'] = chemical_analysis
-                    
-                    # 法的表現の分析
-                    legal_analysis = self.analyze_legal_content(patent_data['combined_text'])
-                    patent_data['legal_analysis'] = legal_analysis
-                    
-                    # データ品質チェック
-                    validation_result = self.validate_patent_data(patent_data)
-                    patent_data['validation'] = validation_result
-                    
-                    patent_data['sentences'] = self.tokenize_sentences(patent_data['combined_text'])
-                    patent_data['sentence_count'] = len(patent_data['sentences'])
-                    
-                    # Claims情報をテキスト形式で格納
-                    claims_text = []
-                    if patent_data.get('claims'):
-                        for claim in patent_data['claims']:
-                            claims_text.append(claim.get('claim_text', ''))
-                    patent_data['claims_text'] = ' '.join(claims_text)
-                    patent_data['claims_count'] = len(patent_data.get('claims', []))
-                    
+        checkpoint = None
+        restored = {}
+        if checkpoint_dir is not None:
+            from .checkpoint import CheckpointWriter, STATUS_OK, STATUS_EMPTY, STATUS_ERROR
+            checkpoint = CheckpointWriter(checkpoint_dir, resume=resume, **(checkpoint_options or {}))
+            if resume:
+                restored = dict(checkpoint.iter_records())
+                print(f"チェックポイントから再開: 完了済み {len(checkpoint.completed)}/{total_files}件")
+        
+        if prefetch > 0:
+            from .prefetch import prefetch_inputs
+            xml_inputs = prefetch_inputs(xml_inputs, prefetch,
+                                         skip=checkpoint.is_completed if checkpoint is not None else None)
+        
+        try:
+            for file_key, xml_file, stream in xml_inputs:
+                
+                if checkpoint is not None and checkpoint.is_completed(file_key):
+                    patent_data = restored.pop(file_key, None)
+                    if patent_data is not None:
+                        processed_data.append(PatentRecord.from_dict(patent_data) if as_records else patent_data)
+                    continue
+                
+                try:
+                    with self.profiler.document(file_key) as document:
+                        patent_data = self.process_xml_file(xml_file, stream)
+                        if patent_data:
+                            document.chars = len(patent_data['combined_text'])
+                except Exception as e:
+                    print(f"ファイル処理エラー {xml_file}: {e}")
+                    if checkpoint is not None:
+                        checkpoint.add(file_key, None, status=STATUS_ERROR)
+                    continue
+                
+                if not patent_data:
+                    if checkpoint is not None:
+                        checkpoint.add(file_key, None, status=STATUS_EMPTY)
+                    continue
+                
+                if checkpoint is not None:
+                    checkpoint.add(file_key, self._checkpoint_record(patent_data), status=STATUS_OK)
+                
+                if as_records:
+                    processed_data.append(PatentRecord.from_dict(patent_data))
+                else:
                     processed_data.append(patent_data)
-                    
+        finally:
+            # 先読みスレッドを止めてから、開いたアーカイブのハンドルを閉じる
+            xml_inputs.close()
+            from .archive import close_archives
+            close_archives()
+            # 中断（KeyboardInterrupt 等）・例外時もバッファ中の処理済みファイルをジャーナルに記録
+            if checkpoint is not None:
+                checkpoint.close()
+        
+        if as_records:
+            return processed_data
+        
+        import pandas as pd
+        return pd.DataFrame(processed_data)
+    
+    def process_xml_file(self, xml_file: Union[str, Path, 'ArchiveMember'],
+                         stream: Optional[BinaryIO] = None) -> Optional[Dict[str, Any]]:
+        """
+        XMLファイル1件の解析と分析（process_xml_files の1ファイル分の処理）
+        
+        Args:
+            xml_file: XMLファイルパス、またはアーカイブのメンバー
+            stream: 解析するバイナリストリーム（Noneの場合は xml_file から読み込む）
+            
+        Returns:
+            分析済みの特許データ辞書（解析結果が空の場合はNone）
+        """
+        profiler = self.profiler
+        if isinstance(xml_file, str):
+            xml_file = Path(xml_file)
+        
+        # XML解析・セクション抽出のステージは parse_xml_file 内で計測
+        patent_data = self._parse_input(xml_file, stream)
+        if not patent_data:
+            return None
+        
+        combined_text = self._combine_text_sections(patent_data)
+        with profiler.stage('enhanced_clean_text', len(combined_text)):
+            patent_data['combined_text'] = self.enhanced_clean_text(combined_text)
+        text_length = len(patent_data['combined_text'])
+        
+        # 化学的内容の分析
+        if self.enable_chemical_processing:
+            with profiler.stage('analyze_chemical_content', text_length):
+                chemical_analysis = self.analyze_chemical_content(patent_data['combined_text'])
+            patent_data['chemical_analysis'] = chemical_analysis
+        
+        # 法的表現の分析
+        with profiler.stage('analyze_legal_content', text_length):
+            legal_analysis = self.analyze_legal_content(patent_data['combined_text'])
+        patent_data['legal_analysis'] = legal_analysis
+        
+        # データ品質チェック
+        with profiler.stage('validate_patent_data', text_length):
+            validation_result = self.validate_patent_data(patent_data)
+        patent_data['validation'] = validation_result
+        
+        with profiler.stage('tokenize_sentences', text_length):
+            patent_data['sentences'] = self.tokenize_sentences(patent_data['combined_text'])
+        patent_data['sentence_count'] = len(patent_data['sentences'])
+        
+        # Claims情報をテキスト形式で格納
+        claims_text = []
+        if patent_data.get('claims'):
+            for claim in patent_data['claims']:
+                claims_text.append(claim.get('claim_text', ''))
+        patent_data['claims_text'] = ' '.join(claims_text)
+        patent_data['claims_count'] = len(patent_data.get('claims', []))
+        
+        return patent_data
+    
+    def _parse_input(self, xml_file: Union[str, Path, 'ArchiveMember'],
+                     stream: Optional[BinaryIO] = None) -> Dict[str, Any]:
+        """
+        入力1件を解析し、ファイルパス・ファイル名を付けた特許データを返す
+        
+        Args:
+            xml_file: XMLファイルパス、またはアーカイブのメンバー
+            stream: 解析するバイナリストリーム（Noneの場合は xml_file から読み込む）
+            
+        Returns:
+            セクション別のデータ辞書（解析に失敗した場合は空の辞書）
+        """
+        if isinstance(xml_file, (str, Path)):
+            xml_file = Path(xml_file)
+            file_path, file_name = str(xml_file), xml_file.name
+        else:
+            file_path, file_name = xml_file.path, xml_file.file_name
+        
+        if stream is None and not isinstance(xml_file, Path):
+            # アーカイブのメンバーはデータ位置から直接読み込む
+            with xml_file.open() as member_stream:
+                patent_data = self.parse_xml_file(member_stream)
+        else:
+            patent_data = self.parse_xml_file(stream or file_path)
+        
+        if patent_data:
+            patent_data['xml_file_path'] = file_path
+            patent_data['file_name'] = file_name
+            # 解析時に決定的な特許IDを割り当て（シャード・並列実行をまたいで同じ値）
+            patent_data['patent_id'] = assign_patent_id(patent_data)
+        return patent_data
+    
+    def iter_patents(self, xml_dir: str, shard_index: int = 0, num_shards: int = 1,
+                     prefetch: int = 0, analyze: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        XMLファイルを1件ずつ解析して特許データを順に返す（全件をメモリに保持しない）
+        
+        データセット作成（dataset_builder.DatasetBuilder）等、解析結果を1回だけ順に使う処理向け。
+        
+        Args:
+            xml_dir: XMLファイルが格納されているディレクトリ、または .zip/.tar/.tar.gz アーカイブ
+            shard_index: 処理するシャード番号（num_shards > 1 の場合）
+            num_shards: シャード数
+            prefetch: スレッドプールで先読みするファイル数（0の場合は先読みしない）
+            analyze: Trueの場合は process_xml_file と同じクリーニング・分析も行う
+                     （Falseの場合は parse_xml_file による解析のみ）
+            
+        Yields:
+            特許データ辞書（解析結果が空のファイルは除く）
+        """
+        _, xml_inputs = _iter_xml_inputs(xml_dir, shard_index, num_shards)
+        if prefetch > 0:
+            from .prefetch import prefetch_inputs
+            xml_inputs = prefetch_inputs(xml_inputs, prefetch)
+        
+        for file_key, xml_file, stream in xml_inputs:
+            try:
+                if analyze:
+                    patent_data = self.process_xml_file(xml_file, stream)
+                else:
+                    patent_data = self._parse_input(xml_file, stream)
             except Exception as e:
                 print(f"ファイル処理エラー {xml_file}: {e}")
                 continue
+            
+            if patent_data:
+                yield patent_data
+    
+    def remove_near_duplicates(self, data: 'pd.DataFrame', output_dir: str,
+                               index_path: Optional[str] = None,
+                               threshold: float = 0.8) -> 'pd.DataFrame':
+        """
+        分割出願・再公表等の近似重複文書を除外（process_xml_files と create_training_dataset の間で使用）
         
-        return pd.DataFrame(processed_data)
+        Args:
+            data: process_xml_files の出力DataFrame
+            output_dir: 重複クラスタレポートの出力ディレクトリ
+            index_path: 署名インデックスのパス（リリースをまたいで永続化、Noneの場合はoutput_dir配下）
+            threshold: 重複とみなす推定Jaccard類似度
+            
+        Returns:
+            重複を除いたDataFrame
+        """
+        import pandas as pd
+        from .deduplication import MinHashDeduplicator
+        
+        output_directory = Path(output_dir)
+        if index_path is None:
+            index_path = str(output_directory / "minhash_index.json")
+        
+        deduplicator = MinHashDeduplicator(threshold=threshold, index_path=index_path)
+        kept_records = deduplicator.deduplicate_records(
+            data.to_dict('records'), text_field='combined_text', id_field='patent_id'
+        )
+        deduplicator.save(index_path)
+        deduplicator.write_report(str(output_directory / "dedup_report.json"))
+        
+        print(f"近似重複除外: {len(data)}件 → {len(kept_records)}件")
+        return pd.DataFrame(kept_records, columns=data.columns)
     
     def _combine_text_sections(self, patent_data: Dict[str, Any]) -> str:
         """
@@ -1384,7 +1567,7 @@ class PatentTextProcessor:
         
         return '\n\n'.join(text_sections)
     
-    def create_chatml_dataset(self, data: pd.DataFrame, output_path: str) -> None:
+    def create_chatml_dataset(self, data: 'pd.DataFrame', output_path: str) -> None:
         """
         ChatML形式の学習データを作成（請求項→実施形態）
         
@@ -1398,7 +1581,7 @@ class PatentTextProcessor:
         chatml_data = []
         
         for _, row in data.iterrows():
-            patent_id = row.get('patent_number', '')
+            patent_id = get_patent_id(row)
             claims = row.get('claims', [])
             detailed_description = row.get('detailed_description', '')
             
@@ -1445,6 +1628,33 @@ class PatentTextProcessor:
         print(f"ChatML学習データを出力しました: {output_path}")
         print(f"作成された学習サンプル数: {len(chatml_data)}")
     
+    def _checkpoint_record(self, patent_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        チェックポイントに書き出すレコードを作成
+        法的表現・化学エンティティは一覧を除いた集計結果のみ保持する（出力・検証が参照するのは集計結果のみ）
+        
+        Args:
+            patent_data: 特許データ辞書（process_xml_file の出力）
+            
+        Returns:
+            JSON出力可能な特許データ辞書
+        """
+        record = dict(patent_data)
+        legal_analysis = record.get('legal_analysis')
+        if isinstance(legal_analysis, LegalAnalysis):
+            record['legal_analysis'] = legal_analysis.summary()
+        elif legal_analysis is not None:
+            record['legal_analysis'] = {k: v for k, v in legal_analysis.items() if k != 'expressions'}
+        
+        chemical_analysis = record.get('chemical_analysis')
+        if isinstance(chemical_analysis, ChemicalAnalysis):
+            record['chemical_analysis'] = chemical_analysis.summary()
+        elif chemical_analysis is not None:
+            record['chemical_analysis'] = {k: v for k, v in chemical_analysis.items()
+                                           if k not in ('entities', 'unique_formulas_list')}
+        
+        return self._convert_to_json_serializable(record)
+    
     def _convert_to_json_serializable(self, obj: Any) -> Any:
         """
         JSON出力用にデータ型を変換
@@ -1462,16 +1672,16 @@ class PatentTextProcessor:
             return float(obj)
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
-        elif isinstance(obj, pd.Series):
+        elif _is_pandas_series(obj):
             return obj.tolist()
-        elif isinstance(obj, dict):
+        elif isinstance(obj, Mapping):
             return {key: self._convert_to_json_serializable(value) for key, value in obj.items()}
         elif isinstance(obj, list):
             return [self._convert_to_json_serializable(item) for item in obj]
         else:
             return obj
     
-    def export_to_json(self, data: pd.DataFrame, output_path: str, 
+    def export_to_json(self, data: 'pd.DataFrame', output_path: str, 
                       include_metadata: bool = True, 
                       compact_format: bool = False) -> None:
         """
@@ -1490,7 +1700,7 @@ class PatentTextProcessor:
         
         for _, row in data.iterrows():
             patent_record = {
-                'patent_id': row.get('patent_number', ''),
+                'patent_id': get_patent_id(row),
                 'title': row.get('title', ''),
                 'abstract': row.get('abstract', ''),
                 'technical_field': row.get('technical_field', ''),
@@ -1533,7 +1743,7 @@ class PatentTextProcessor:
         print(f"データをJSONファイルに出力しました: {output_path}")
         print(f"出力レコード数: {len(export_data)}")
         
-    def create_training_dataset(self, data: pd.DataFrame, output_dir: str) -> None:
+    def create_training_dataset(self, data: 'pd.DataFrame', output_dir: str) -> None:
         """
         機械学習用の複数形式でデータセットを作成
         
@@ -1563,15 +1773,8 @@ class PatentTextProcessor:
         # 3. セクション別データ
         sections_data = []
         for _, row in data.iterrows():
-            patent_id = row.get('patent_number', '')
-            
-            # patent_idが空の場合、ダミーIDを生成
-            if not patent_id or patent_id.strip() == '':
-                # ファイル名やインデックスからダミーIDを生成
-                file_name = row.get('file_name', 'unknown')
-                dummy_id = f"patent_{hash(file_name) % 100000:05d}"  # 5桁のダミーID
-                patent_id = dummy_id
-                logger.warning(f"空のpatent_idを検出、ダミーIDを生成: {patent_id}")
+            # 公報番号がない場合も解析時に割り当てた決定的なID（本文のダイジェスト）を使う
+            patent_id = get_patent_id(row)
             
             sections = [
                 {'patent_id': patent_id, 'section': 'title', 'text': row.get('title', '')},
@@ -1637,6 +1840,12 @@ class PatentTextProcessor:
         # 統計情報を更新（ChatMLファイル情報を追加）
         stats['file_descriptions']['chatml_training.json'] = 'ChatML形式の学習データ（請求項→実施形態）'
         
+        # 6. ステージ別プロファイル（計測有効時のみ）
+        if self.profiler.enabled:
+            from .profiling import PROFILE_FILE
+            self.profiler.write_report(str(output_directory))
+            stats['file_descriptions'][PROFILE_FILE] = 'ステージ別の処理時間・スループット'
+        
         # 統計情報をJSON出力
         with open(str(output_directory / "dataset_stats.json"), 'w', encoding='utf-8') as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
@@ -1764,22 +1973,22 @@ def _resolve_data_path(sample_data_path: Optional[str], mode: str) -> Path:
         print(f"📋 指定されたパス: {sample_dir}")
         return sample_dir
     
-    get_auto_data_path, DataDiscovery = _setup_data_discovery()
+    _, DataDiscovery = _setup_data_discovery()
     
     # 動的データ検出を試行
     sample_dir = None
-    if get_auto_data_path is not None:
-        auto_path = get_auto_data_path(mode)
+    if DataDiscovery is not None:
+        # パス取得とレポート表示で同じディレクトリインデックスを共有する
+        discovery = DataDiscovery()
+        auto_path = discovery.get_auto_path(mode)
         if auto_path:
             sample_dir = Path(auto_path)
             print(f"🔍 自動検出されたパス ({mode}モード): {sample_dir}")
             
             # ディスカバリーレポートを表示
-            if DataDiscovery is not None:
-                discovery = DataDiscovery()
-                print("\n" + LINE_SEPARATOR)
-                discovery.print_discovery_report()
-                print(LINE_SEPARATOR + "\n")
+            print("\n" + LINE_SEPARATOR)
+            discovery.print_discovery_report()
+            print(LINE_SEPARATOR + "\n")
     
     # 自動検出が失敗した場合のフォールバック処理
     if sample_dir is None:
@@ -1860,7 +2069,7 @@ def _display_patent_content(patent_data: Dict[str, Any]) -> None:
     print(f"\n引用文献数: {citations_count}")
 
 
-def _display_dataframe_info(df: pd.DataFrame) -> None:
+def _display_dataframe_info(df: 'pd.DataFrame') -> None:
     """DataFrameの情報を表示"""
     if len(df) == 0:
         return
@@ -1894,28 +2103,62 @@ def _get_output_directory(sample_data_path: Optional[str]) -> Path:
         return Path(sample_data_path).parent / "processed"
 
 
-def _parse_command_line_args() -> Tuple[Optional[str], str]:
+def _parse_command_line_args() -> Tuple[Optional[str], str, Dict[str, Any]]:
     """コマンドライン引数を解析"""
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="特許XMLファイル処理")
+    parser.add_argument('args', nargs='*', metavar='MODE|PATH',
+                        help=f"実行モード ({', '.join(SUPPORTED_MODES)}) とデータパス（順不同・省略可）")
+    parser.add_argument('--shard-index', type=int, default=0,
+                        help="bulkモードで処理するシャード番号（0始まり）")
+    parser.add_argument('--num-shards', type=int, default=1,
+                        help="bulkモードのシャード数（ファイル一覧をハッシュで分割）")
+    parser.add_argument('--merge', action='store_true',
+                        help="処理は行わず、出力済みのシャードをマージして最終データセットを作成")
+    parser.add_argument('--resume', action='store_true',
+                        help="bulkモードでチェックポイントの完了済みファイルをスキップして再開")
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N',
+                        help="bulkモードでN件のXMLファイルをスレッドプールで先読み（読み込みの遅いストレージ向け）")
+    parser.add_argument('--dedup', action='store_true',
+                        help="学習データ出力前に近似重複文書を除外（--merge と併用した場合はシャード横断で除外）")
+    parser.add_argument('--profile', action='store_true',
+                        help="ステージ別の処理時間を計測し pipeline_profile.json を出力")
+    parser.add_argument('--profile-top', type=int, default=0, metavar='N',
+                        help="処理時間の長い上位N文書の cProfile トレースを profiles/ に出力（--profile と併用）")
+    parsed = parser.parse_args()
     
     sample_path = None
     mode = DEFAULT_MODE
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] in SUPPORTED_MODES:
+    positional = parsed.args
+    if positional:
+        if positional[0] in SUPPORTED_MODES:
             # 第1引数がモード指定の場合
-            mode = sys.argv[1]
-            sample_path = sys.argv[2] if len(sys.argv) > 2 else None
+            mode = positional[0]
+            sample_path = positional[1] if len(positional) > 1 else None
         else:
             # 第1引数がパス指定の場合
-            sample_path = sys.argv[1]
-            if (len(sys.argv) > 2 and sys.argv[2] in SUPPORTED_MODES):
-                mode = sys.argv[2]
-    
-    return sample_path, mode
+            sample_path = positional[0]
+            if (len(positional) > 1 and positional[1] in SUPPORTED_MODES):
+                mode = positional[1]
+    
+    bulk_options = {
+        'shard_index': parsed.shard_index,
+        'num_shards': parsed.num_shards,
+        'merge': parsed.merge,
+        'resume': parsed.resume,
+        'prefetch': parsed.prefetch,
+        'dedup': parsed.dedup,
+        'profile': parsed.profile,
+        'profile_top': parsed.profile_top,
+    }
+    return sample_path, mode, bulk_options
 
 
-def main(sample_data_path: Optional[str] = None, mode: str = "single"):
+def main(sample_data_path: Optional[str] = None, mode: str = "single",
+         shard_index: int = 0, num_shards: int = 1, merge: bool = False, resume: bool = False,
+         prefetch: int = 0, dedup: bool = False, profile: bool = False, profile_top: int = 0):
     """
     サンプル実行（動的データ検出対応）
     
@@ -1923,24 +2166,50 @@ def main(sample_data_path: Optional[str] = None, mode: str = "single"):
         sample_data_path: サンプルデータのディレクトリパス
                          （指定しない場合は自動検出）
         mode: 実行モード ('single', 'bulk', 'quick')
+        shard_index: bulkモードで処理するシャード番号
+        num_shards: bulkモードのシャード数（2以上の場合はパートファイルを shards/ 配下に出力）
+        merge: Trueの場合は出力済みシャードのマージのみ実行
+        resume: bulkモードでチェックポイントから再開するかどうか
+        prefetch: bulkモードでスレッドプールにより先読みするファイル数（0の場合は先読みしない）
+        dedup: 学習データ出力前に近似重複文書を除外するかどうか（merge の場合はシャード横断で除外）
+        profile: ステージ別の処理時間を計測するかどうか
+        profile_top: cProfile トレースを保存する処理時間上位の文書数
     """
-    processor = PatentTextProcessor(language="japanese")
+    profiler = StageProfiler(enabled=profile, trace_top_n=profile_top)
+    processor = PatentTextProcessor(language="japanese", profiler=profiler)
     
     try:
+        if merge:
+            from .sharding import merge_shard_outputs
+            output_dir = _get_output_directory(sample_data_path)
+            merge_shard_outputs(str(output_dir), num_shards if num_shards > 1 else None, deduplicate=dedup)
+            return
+        
         # データパス解決
         sample_dir = _resolve_data_path(sample_data_path, mode)
         
         # モード別処理
-        if mode == "bulk":
+        if mode == "bulk" and num_shards > 1:
+            from .sharding import run_bulk_shard
+            output_dir = _get_output_directory(sample_data_path)
+            part_dir = run_bulk_shard(processor, str(sample_dir), str(output_dir), shard_index, num_shards,
+                                      resume=resume, prefetch=prefetch)
+            print(f"\nシャード出力: {part_dir}")
+            print(f"全シャード完了後に --merge --num-shards {num_shards} でマージしてください")
+            
+        elif mode == "bulk":
             # bulkモードの場合は直接一括処理
             print(f"=== ディレクトリ一括処理（bulkモード）: {sample_dir.name} ===")
-            df = processor.process_xml_files(str(sample_dir))
+            output_dir = _get_output_directory(sample_data_path)
+            df = processor.process_xml_files(str(sample_dir), checkpoint_dir=str(output_dir / "checkpoint"),
+                                             resume=resume, prefetch=prefetch)
             print(f"処理されたファイル数: {len(df)}")
             
             _display_dataframe_info(df)
             
             # JSON出力機能のテスト
-            output_dir = _get_output_directory(sample_data_path)
+            if dedup:
+                df = processor.remove_near_duplicates(df, str(output_dir))
             print(f"\n=== JSON学習データ出力テスト ===")
             processor.create_training_dataset(df, str(output_dir))
             
@@ -1965,9 +2234,14 @@ def main(sample_data_path: Optional[str] = None, mode: str = "single"):
             
             # JSON出力機能のテスト
             output_dir = _get_output_directory(sample_data_path)
+            if dedup:
+                df = processor.remove_near_duplicates(df, str(output_dir))
             print(f"\n=== JSON学習データ出力テスト ===")
             processor.create_training_dataset(df, str(output_dir))
         
+        if profiler.enabled:
+            profiler.print_summary()
+        
     except (FileNotFoundError, Exception) as e:
         print(f"エラーが発生しました: {e}")
         return
@@ -1975,7 +2249,7 @@ def main(sample_data_path: Optional[str] = None, mode: str = "single"):
 
 if __name__ == "__main__":
     # コマンドライン引数解析
-    sample_path, mode = _parse_command_line_args()
+    sample_path, mode, bulk_options = _parse_command_line_args()
     
     print(f"🚀 特許XMLファイル処理を開始")
     print(f"   モード: {mode}")
@@ -1983,5 +2257,13 @@ if __name__ == "__main__":
         print(f"   指定パス: {sample_path}")
     else:
         print(f"   パス: 自動検出")
-    
-    main(sample_path, mode)
\ No newline at end of file
+    if bulk_options['num_shards'] > 1:
+        print(f"   シャード: {bulk_options['shard_index'] + 1}/{bulk_options['num_shards']}")
+    if bulk_options['resume']:
+        print(f"   チェックポイントから再開")
+    if bulk_options['prefetch'] > 0:
+        print(f"   先読み: {bulk_options['prefetch']}件")
+    if bulk_options['dedup']:
+        print(f"   近似重複除外: 有効")
+    
+    main(sample_path, mode, **bulk_options)
\ No newline at end of file
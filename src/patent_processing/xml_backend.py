@@ -0,0 +1,225 @@
+"""
+ST96 XML の解析バックエンド
+
+標準ライブラリの xml.etree.ElementTree（etree）と lxml の2種類。etree は名前空間プレフィックスを
+事前に {URI}Tag 形式へ展開したパスで検索し（呼び出しごとの名前空間解決を省く）、lxml は各フィールドの
+パスを etree.XPath として事前にコンパイルしておく。
+どちらのバックエンドも同じ要素構造（コメント・処理命令を除く）を返し、要素配下のテキストを
+<com:Br/> の位置に LINE_BREAK_MARKER を挟んで収集するため、抽出結果は同一になる。
+"""
+
+import logging
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+ST96_NAMESPACES = {
+    'jppat': 'http://www.jpo.go.jp/standards/XMLSchema/ST96/JPPatent',
+    'jpcom': 'http://www.jpo.go.jp/standards/XMLSchema/ST96/JPCommon',
+    'com': 'http://www.wipo.int/standards/XMLSchema/ST96/Common',
+    'pat': 'http://www.wipo.int/standards/XMLSchema/ST96/Patent'
+}
+
+# parse_xml_file・_extract_detailed_description で使用するパス（バックエンド生成時に事前コンパイル）
+ST96_PATHS = (
+    './/pat:PublicationNumber',
+    './/com:PublicationDate',
+    './/pat:FilingDate',
+    './/pat:InventionTitle',
+    './/pat:Abstract',
+    './/pat:TechnicalField',
+    './/pat:BackgroundArt',
+    './/pat:Summary',
+    './/pat:EmbodimentDescription',
+    './/pat:DetailedDescription',
+    './/pat:BestMode',
+    './/jppat:InventionMode',
+    './/pat:Claims',
+    './/pat:Claim',
+    './/pat:ClaimNumber',
+    './/pat:ClaimText',
+    './/jppat:Inventor//com:EntityName',
+    './/jppat:Applicant//com:EntityName',
+    './/pat:MainClassification',
+    './/com:PatentCitationText',
+)
+
+# <com:Br/> の位置を示す内部マーカー（Unicode の非文字のため特許テキストには出現しない）
+LINE_BREAK_MARKER = '\ufdd0'
+
+# 既定のバックエンド。ST96 の明細書では段落ごとのテキスト取得が処理の大半を占め、
+# lxml は要素アクセスごとのプロキシ生成のため etree と同等以下の速度となる（解析自体は lxml が速い）。
+# 'auto' を指定すると lxml がインストールされていれば lxml を使用する。
+DEFAULT_BACKEND = 'etree'
+AUTO_BACKEND = 'auto'
+
+_PREFIX_PATTERN = re.compile(r'(\w+):(\w+)')
+
+
+class ElementTreeBackend:
+    """標準ライブラリ（xml.etree.ElementTree）による解析バックエンド"""
+
+    name = 'etree'
+    parse_errors: Tuple[Type[Exception], ...] = (ET.ParseError,)
+
+    def __init__(self, namespaces: Optional[Dict[str, str]] = None):
+        """
+        初期化
+
+        Args:
+            namespaces: 名前空間プレフィックス → URI（Noneの場合はST96の名前空間）
+        """
+        self.namespaces = namespaces or ST96_NAMESPACES
+        self._paths: Dict[str, str] = {}
+        for path in ST96_PATHS:
+            self._compile(path)
+
+    def _compile(self, path: str) -> str:
+        # プレフィックスを {URI}Tag 形式に展開（ElementPath は展開済みパスの名前空間解決を省略できる）
+        compiled = _PREFIX_PATTERN.sub(lambda m: '{%s}%s' % (self.namespaces[m.group(1)], m.group(2)), path)
+        self._paths[path] = compiled
+        return compiled
+
+    def parse(self, source):
+        """
+        XMLを解析してルート要素を返す
+
+        Args:
+            source: ファイルパスまたはバイナリのファイルオブジェクト
+
+        Returns:
+            ルート要素
+        """
+        return ET.parse(source).getroot()
+
+    def find(self, element, path: str):
+        """最初に一致する要素（見つからない場合はNone）"""
+        return element.find(self._paths.get(path) or self._compile(path))
+
+    def findall(self, element, path: str) -> List:
+        """一致する全要素（文書順）"""
+        return element.findall(self._paths.get(path) or self._compile(path))
+
+    def collect_text(self, element, buffer: List[str]) -> None:
+        """
+        要素配下のテキストを文書順にバッファへ追加（itertext 相当、<com:Br/> は改行マーカー）
+
+        Args:
+            element: XMLエレメント
+            buffer: テキスト断片を追加するリスト（再帰の全階層で共有）
+        """
+        if element.text:
+            buffer.append(element.text)
+        for child in element:
+            if child.tag.endswith('}Br'):
+                buffer.append(LINE_BREAK_MARKER)
+            else:
+                self.collect_text(child, buffer)
+            if child.tail:
+                buffer.append(child.tail)
+
+
+class LxmlBackend:
+    """lxml による解析バックエンド（事前コンパイル済み XPath を使用）"""
+
+    name = 'lxml'
+
+    def __init__(self, namespaces: Optional[Dict[str, str]] = None):
+        """
+        初期化
+
+        Args:
+            namespaces: 名前空間プレフィックス → URI（Noneの場合はST96の名前空間）
+
+        Raises:
+            ImportError: lxml がインストールされていない場合
+        """
+        from lxml import etree
+
+        self._etree = etree
+        self.namespaces = namespaces or ST96_NAMESPACES
+        self.parse_errors: Tuple[Type[Exception], ...] = (etree.XMLSyntaxError,)
+        # ElementTree と同じ要素構造にするため、コメント・処理命令は読み込まない
+        self._parser = etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+        self._paths: Dict[str, object] = {}
+        for path in ST96_PATHS:
+            self._compile(path)
+
+    def _compile(self, path: str):
+        compiled = self._etree.XPath(path, namespaces=self.namespaces)
+        self._paths[path] = compiled
+        return compiled
+
+    def parse(self, source):
+        """
+        XMLを解析してルート要素を返す
+
+        Args:
+            source: ファイルパスまたはバイナリのファイルオブジェクト
+
+        Returns:
+            ルート要素
+        """
+        root = self._etree.parse(source, self._parser).getroot()
+        # 要素ごとの Python オブジェクト生成を避けてテキストを一括で書き出せるよう、
+        # 改行要素に改行マーカーをテキストとして設定しておく
+        for line_break in root.iter('{*}Br'):
+            line_break.text = LINE_BREAK_MARKER
+        return root
+
+    def find(self, element, path: str):
+        """最初に一致する要素（見つからない場合はNone）"""
+        result = (self._paths.get(path) or self._compile(path))(element)
+        return result[0] if result else None
+
+    def findall(self, element, path: str) -> List:
+        """一致する全要素（文書順）"""
+        return (self._paths.get(path) or self._compile(path))(element)
+
+    def collect_text(self, element, buffer: List[str]) -> None:
+        """
+        要素配下のテキストを文書順にバッファへ追加（<com:Br/> は parse 時に設定した改行マーカー）
+
+        Args:
+            element: parse で読み込んだXMLエレメント
+            buffer: テキスト断片を追加するリスト
+        """
+        # 配下のテキストノードを C 実装で連結（itertext は要素ごとにプロキシを生成するため遅い）
+        buffer.append(self._etree.tostring(element, method='text', encoding=str, with_tail=False))
+
+
+BACKENDS = {
+    ElementTreeBackend.name: ElementTreeBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_xml_backend(name: Optional[str] = DEFAULT_BACKEND, namespaces: Optional[Dict[str, str]] = None):
+    """
+    解析バックエンドを取得
+
+    Args:
+        name: 'etree'・'lxml'・'auto'（lxml があれば lxml、なければ etree）のいずれか
+              （Noneの場合は DEFAULT_BACKEND）
+        namespaces: 名前空間プレフィックス → URI
+
+    Returns:
+        バックエンドのインスタンス
+
+    Raises:
+        ValueError: 不明なバックエンド名の場合
+        ImportError: 'lxml' を指定し、lxml がインストールされていない場合
+    """
+    name = name or DEFAULT_BACKEND
+    if name == AUTO_BACKEND:
+        try:
+            return LxmlBackend(namespaces)
+        except ImportError:
+            logger.debug("lxml がないため標準ライブラリの ElementTree で解析します")
+            return ElementTreeBackend(namespaces)
+
+    if name not in BACKENDS:
+        raise ValueError(f"不明なXMLバックエンドです: {name}（{', '.join([*BACKENDS, AUTO_BACKEND])} のいずれかを指定）")
+    return BACKENDS[name](namespaces)
@@ -1,8 +1,15 @@
 # トレーニング関連ユーティリティ
 
-from trl import SFTConfig, SFTTrainer
 import logging
-from config import Config
+from typing import TYPE_CHECKING
+from config import Config, PerformanceConfig
+from utils.lazy_imports import lazy_import
+
+# trl は読み込みに数秒かかるため、トレーナー作成時に読み込む
+trl = lazy_import("trl")
+
+if TYPE_CHECKING:
+    from trl import SFTTrainer
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +18,8 @@ class TrainingManager:
 
     def __init__(self, config: Config):
         self.config = config
+        # 性能設定（設定ファイルに performance がない場合は既定値）
+        self.performance = getattr(config, 'performance', None) or PerformanceConfig()
         self.model = None
         self.training_stats = None
         
@@ -75,13 +84,13 @@ class TrainingManager:
             logger.error(f"formatting_funcでエラー発生: {e}, example keys: {list(example.keys()) if isinstance(example, dict) else type(example)}")
             return ["[ERROR: Failed to format]"]
         
-    def create_trainer(self, model, tokenizer, dataset) -> SFTTrainer:
+    def create_trainer(self, model, tokenizer, dataset) -> 'SFTTrainer':
         """トレーナーを作成"""
         try:
             logger.info("トレーナーを設定中...")
 
             # SFTConfig 設定（型変換を確実にする）
-            sft_config = SFTConfig(
+            sft_config = trl.SFTConfig(
                 per_device_train_batch_size=int(self.config.training.per_device_train_batch_size),
                 gradient_accumulation_steps=int(self.config.training.gradient_accumulation_steps),
                 warmup_steps=int(self.config.training.warmup_steps),
@@ -148,14 +157,14 @@ class TrainingManager:
                             return {"text": texts}
 
                     # 通常のtext形式として処理
-                    trainer = SFTTrainer(
+                    trainer = trl.SFTTrainer(
                         model=model,
                         tokenizer=tokenizer,
                         train_dataset=converted_dataset,
                         dataset_text_field="text",
                         max_seq_length=self.config.model.max_seq_length,
-                        dataset_num_proc=1,  # ChatML変換時は安定性優先
-                        packing=False,
+                        dataset_num_proc=self.performance.dataset_num_proc,
+                        packing=self.performance.packing,
                         formatting_func=formatting_prompts_func_chatml,
                         args=sft_config,
                     )
@@ -168,11 +177,11 @@ class TrainingManager:
                 # 通常のtext形式（推奨パス）
                 logger.info("✅ 通常text形式のデータセットを使用します（推奨）")
                 
-                # Triton問題回避のため保守的設定を使用
-                dataset_num_proc = 1  # Tritonエラー回避のため1固定
-                packing = False       # packingを無効化
+                # 既定値（1・packing無効）はTriton問題回避のための保守的設定
+                dataset_num_proc = self.performance.dataset_num_proc
+                packing = self.performance.packing
                 
-                logger.info(f"設定: dataset_num_proc={dataset_num_proc}, packing={packing} (Triton問題回避)")
+                logger.info(f"設定: dataset_num_proc={dataset_num_proc}, packing={packing}")
                 
                 # データ変換コールバック追加（型エラー修正）
                 def formatting_prompts_func(examples):
@@ -190,7 +199,7 @@ class TrainingManager:
                                 texts.append(str(text) if text is not None else "")
                         return {"text": texts}
 
-                trainer = SFTTrainer(
+                trainer = trl.SFTTrainer(
                     model=model,
                     tokenizer=tokenizer,
                     train_dataset=dataset,
@@ -243,4 +252,4 @@ class TrainingManager:
             "train_steps_per_second": self.training_stats.metrics.get('train_steps_per_second', 0),
             "total_flos": self.training_stats.metrics.get('total_flos', 0),
             "train_loss": self.training_stats.metrics.get('train_loss', 0),
-        }
\ No newline at end of file
+        }
\ No newline at end of file
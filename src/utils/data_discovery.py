@@ -1,24 +1,36 @@
 """
 データディスカバリーユーティリティ
-プロジェクト内のXMLファイルを動的に検出・取得
+プロジェクト内のXMLファイル（およびJPB発行分のアーカイブ）を動的に検出・取得
 """
 
 import os
 import re
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Any
 import json
 
+# キャッシュ形式のバージョン（インデックス構造を変更した場合に更新）
+CACHE_VERSION = 3
+
+JPB_PATTERN = re.compile(r'JPB_\d+_\d+発行分')
+
+# 展開せずに直接処理できるアーカイブ（patent_processing.archive が対応する形式）
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz')
+
 
 class DataDiscovery:
     """データディスカバリークラス"""
     
-    def __init__(self, project_root: Optional[str] = None):
+    def __init__(self, project_root: Optional[str] = None, use_cache: bool = True,
+                 cache_path: Optional[str] = None):
         """
         初期化
         
         Args:
             project_root: プロジェクトルートパス（指定しない場合は自動検出）
+            use_cache: 有効なディスカバリーキャッシュがあれば走査の代わりに使用する
+            cache_path: キャッシュファイルのパス（指定しない場合は data/discovery_cache.json）
         """
         if project_root is None:
             self.project_root = self._find_project_root()
@@ -26,13 +38,118 @@ class DataDiscovery:
             self.project_root = Path(project_root)
         
         self.data_dir = self.project_root / "data"
+        self.use_cache = use_cache
+        self.cache_path = Path(cache_path) if cache_path else self.data_dir / "discovery_cache.json"
         
+        # ディレクトリ → {xml_count, xml_bytes, mtime, subdirs, archives} のインデックス（初回参照時に構築）
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        # アーカイブのパス → XMLメンバー数（参照時に読み込み）
+        self._archive_counts: Dict[str, Optional[int]] = {}
+    
     def _find_project_root(self) -> Path:
         """プロジェクトルートを自動検出"""
         current_file = Path(__file__).resolve()
         # src/utils/data_discovery.py から2つ上の階層がプロジェクトルート
         return current_file.parents[2]
     
+    @property
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """ディレクトリインデックス（有効なキャッシュがあれば読み込み、なければ走査）"""
+        if self._index is None:
+            if not (self.use_cache and self.load_discovery_cache()):
+                self._index = self._scan_directories()
+        return self._index
+    
+    def refresh(self) -> None:
+        """インデックスを破棄して再走査"""
+        self._index = self._scan_directories()
+    
+    def _scan_directories(self) -> Dict[str, Dict[str, Any]]:
+        """
+        data配下を os.scandir で1回だけ走査してインデックスを構築
+        
+        Returns:
+            ディレクトリパス → {xml_count, xml_bytes, mtime, subdirs, archives} の辞書
+        """
+        index = {}
+        if not self.data_dir.exists():
+            return index
+        
+        stack = [str(self.data_dir)]
+        while stack:
+            directory = stack.pop()
+            entry_info = {'xml_count': 0, 'xml_bytes': 0, 'mtime': 0.0, 'subdirs': [], 'archives': []}
+            try:
+                entry_info['mtime'] = os.stat(directory).st_mtime
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            entry_info['subdirs'].append(entry.name)
+                        elif entry.name.endswith('.xml') and entry.is_file():
+                            entry_info['xml_count'] += 1
+                            entry_info['xml_bytes'] += entry.stat().st_size
+                        elif entry.name.lower().endswith(ARCHIVE_SUFFIXES) and entry.is_file():
+                            entry_info['archives'].append(entry.name)
+            except (PermissionError, FileNotFoundError):
+                pass  # アクセス権限がない・走査中に削除された場合はスキップ
+            
+            entry_info['subdirs'].sort()
+            entry_info['archives'].sort()
+            index[directory] = entry_info
+            stack.extend(os.path.join(directory, name) for name in reversed(entry_info['subdirs']))
+        
+        return index
+    
+    def _iter_tree(self, base_dir: Path, max_depth: Optional[int] = None):
+        """インデックス上でディレクトリ配下を深さ優先で列挙（(パス, 深さ, 情報) を返す）"""
+        stack = [(str(base_dir), 0)]
+        while stack:
+            directory, depth = stack.pop()
+            entry_info = self.index.get(directory)
+            if entry_info is None:
+                continue
+            yield directory, depth, entry_info
+            if max_depth is None or depth < max_depth:
+                stack.extend((os.path.join(directory, name), depth + 1)
+                             for name in reversed(entry_info['subdirs']))
+    
+    def _xml_count(self, directory: Path) -> int:
+        """ディレクトリ直下のXMLファイル数"""
+        entry_info = self.index.get(str(directory))
+        return entry_info['xml_count'] if entry_info else 0
+    
+    def _tree_xml_count(self, directory: Path) -> Optional[int]:
+        """ディレクトリ配下（再帰）のXMLファイル数（アーカイブの場合はXMLメンバー数）"""
+        if str(directory).lower().endswith(ARCHIVE_SUFFIXES):
+            return self._archive_xml_count(Path(directory))
+        return sum(entry_info['xml_count'] for _, _, entry_info in self._iter_tree(directory))
+    
+    def _archive_xml_count(self, archive_path: Path) -> Optional[int]:
+        """
+        アーカイブ内のXMLメンバー数
+        
+        .zip は中央ディレクトリ、.tar はヘッダのみを読む。.tar.gz は全体の伸長が必要なため数えない。
+        
+        Returns:
+            XMLメンバー数（.tar.gz・読み込めない場合はNone）
+        """
+        key = str(archive_path)
+        if key not in self._archive_counts:
+            count = None
+            try:
+                if key.lower().endswith('.zip'):
+                    import zipfile
+                    with zipfile.ZipFile(archive_path) as archive:
+                        count = sum(1 for name in archive.namelist() if name.endswith('.xml'))
+                elif key.lower().endswith('.tar'):
+                    import tarfile
+                    with tarfile.open(archive_path, 'r:') as archive:
+                        count = sum(1 for info in archive if info.isfile() and info.name.endswith('.xml'))
+            except (OSError, ValueError, EOFError) as e:
+                print(f"警告: アーカイブを読み込めません: {archive_path} ({e})")
+            self._archive_counts[key] = count
+        return self._archive_counts[key]
+    
     def discover_xml_directories(self) -> Dict[str, List[Path]]:
         """
         XMLファイルを含むディレクトリを発見
@@ -51,28 +168,37 @@ class DataDiscovery:
             print(f"警告: データディレクトリが見つかりません: {self.data_dir}")
             return xml_dirs
         
+        data_info = self.index.get(str(self.data_dir), {'subdirs': []})
+        
         # data/raw配下の検索
         raw_dir = self.data_dir / "raw"
-        if raw_dir.exists():
-            for item in raw_dir.iterdir():
-                if item.is_dir():
-                    xml_files = list(item.glob("*.xml"))
-                    if xml_files:
-                        xml_dirs['raw_data'].append(item)
-                        xml_dirs['single_files'].append(item)
+        raw_info = self.index.get(str(raw_dir))
+        if raw_info:
+            for name in raw_info['subdirs']:
+                item = raw_dir / name
+                if self._xml_count(item):
+                    xml_dirs['raw_data'].append(item)
+                    xml_dirs['single_files'].append(item)
         
         # JPB発行分の検索
-        jpb_pattern = re.compile(r'JPB_\d+_\d+発行分')
-        for item in self.data_dir.iterdir():
-            if item.is_dir() and jpb_pattern.match(item.name):
+        for name in data_info['subdirs']:
+            if JPB_PATTERN.match(name):
+                item = self.data_dir / name
                 document_dir = item / "DOCUMENT"
-                if document_dir.exists():
+                if str(document_dir) in self.index:
                     xml_dirs['jpb_release'].append(item)
                     xml_dirs['bulk_processing'].append(document_dir)
                     
                     # JPB配下の単一XMLディレクトリも検索
                     xml_dirs['single_files'].extend(self._find_single_xml_dirs(document_dir))
         
+        # 展開していないJPB発行分のアーカイブ（process_xml_files に直接渡せる）
+        for name in data_info.get('archives', []):
+            if JPB_PATTERN.match(name):
+                archive_path = self.data_dir / name
+                xml_dirs['jpb_release'].append(archive_path)
+                xml_dirs['bulk_processing'].append(archive_path)
+        
         return xml_dirs
     
     def _find_single_xml_dirs(self, base_dir: Path, max_depth: int = 5) -> List[Path]:
@@ -82,39 +208,27 @@ class DataDiscovery:
         Args:
             base_dir: 検索ベースディレクトリ
             max_depth: 最大検索深度
-            
+        
         Returns:
             単一XMLファイルを含むディレクトリのリスト
         """
-        single_xml_dirs = []
-        
-        def _recursive_search(current_dir: Path, current_depth: int):
-            if current_depth > max_depth:
-                return
-                
-            try:
-                xml_files = list(current_dir.glob("*.xml"))
-                if len(xml_files) == 1:  # 単一XMLファイル
-                    single_xml_dirs.append(current_dir)
-                
-                # 子ディレクトリを再帰検索
-                for child_dir in current_dir.iterdir():
-                    if child_dir.is_dir():
-                        _recursive_search(child_dir, current_depth + 1)
-            except PermissionError:
-                pass  # アクセス権限がない場合はスキップ
-        
-        _recursive_search(base_dir, 0)
-        return single_xml_dirs
+        return [
+            Path(directory) for directory, _, entry_info in self._iter_tree(base_dir, max_depth)
+            if entry_info['xml_count'] == 1  # 単一XMLファイル
+        ]
     
-    def get_recommended_paths(self) -> Dict[str, Dict[str, str]]:
+    def get_recommended_paths(self, xml_dirs: Optional[Dict[str, List[Path]]] = None) -> Dict[str, Dict[str, str]]:
         """
         推奨実行パスを取得
         
+        Args:
+            xml_dirs: discover_xml_directories の結果（指定しない場合は取得する）
+        
         Returns:
             推奨パス辞書
         """
-        xml_dirs = self.discover_xml_directories()
+        if xml_dirs is None:
+            xml_dirs = self.discover_xml_directories()
         recommendations = {
             'single_file_test': {},
             'bulk_processing': {},
@@ -129,16 +243,18 @@ class DataDiscovery:
                 recommendations['single_file_test'] = {
                     'path': str(best_single),
                     'description': f"単一XMLファイルテスト用 ({best_single.name})",
-                    'xml_count': len(list(best_single.glob("*.xml")))
+                    'xml_count': self._xml_count(best_single)
                 }
         
         # 一括処理推奨パス
         if xml_dirs['bulk_processing']:
-            bulk_dir = xml_dirs['bulk_processing'][0]  # 最初のJPB DOCUMENTディレクトリ
-            xml_count = len(list(bulk_dir.glob("**/*.xml")))
+            bulk_dir = xml_dirs['bulk_processing'][0]  # 最初のJPB DOCUMENTディレクトリ（なければアーカイブ）
+            xml_count = self._tree_xml_count(bulk_dir)
+            count_text = f"約{xml_count}個" if xml_count is not None else "件数不明"
+            source_text = f"アーカイブ {bulk_dir.name}, " if bulk_dir.is_file() else ""
             recommendations['bulk_processing'] = {
                 'path': str(bulk_dir),
-                'description': f"一括処理用 (約{xml_count}個のXMLファイル)",
+                'description': f"一括処理用 ({source_text}{count_text}のXMLファイル)",
                 'xml_count': xml_count
             }
         
@@ -148,7 +264,7 @@ class DataDiscovery:
             recommendations['quick_test'] = {
                 'path': str(quick_dir),
                 'description': f"クイックテスト用 (data/raw/{quick_dir.name})",
-                'xml_count': len(list(quick_dir.glob("*.xml")))
+                'xml_count': self._xml_count(quick_dir)
             }
         
         return recommendations
@@ -162,9 +278,9 @@ class DataDiscovery:
         best_dir = None
         
         for directory in directories:
-            xml_files = list(directory.glob("*.xml"))
-            if xml_files:
-                total_size = sum(xml_file.stat().st_size for xml_file in xml_files)
+            entry_info = self.index.get(str(directory))
+            if entry_info and entry_info['xml_count']:
+                total_size = entry_info['xml_bytes']
                 if total_size < min_size:
                     min_size = total_size
                     best_dir = directory
@@ -177,7 +293,7 @@ class DataDiscovery:
         
         Args:
             mode: 'single' (単一ファイル), 'bulk' (一括処理), 'quick' (クイック)
-            
+        
         Returns:
             推奨パス文字列
         """
@@ -185,7 +301,7 @@ class DataDiscovery:
         
         mode_mapping = {
             'single': 'single_file_test',
-            'bulk': 'bulk_processing', 
+            'bulk': 'bulk_processing',
             'quick': 'quick_test'
         }
         
@@ -209,13 +325,13 @@ class DataDiscovery:
             if paths:
                 print(f"  {category}: {len(paths)}個のディレクトリ")
                 for path in paths[:3]:  # 最初の3つのみ表示
-                    xml_count = len(list(path.glob("**/*.xml")))
-                    print(f"    - {path.name} ({xml_count}個のXML)")
+                    xml_count = self._tree_xml_count(path)
+                    print(f"    - {path.name} ({xml_count if xml_count is not None else '?'}個のXML)")
                 if len(paths) > 3:
                     print(f"    ... 他{len(paths)-3}個")
         
         print(f"\n【推奨実行パス】")
-        recommendations = self.get_recommended_paths()
+        recommendations = self.get_recommended_paths(xml_dirs)
         for mode, info in recommendations.items():
             if info:
                 print(f"  {mode}: {info['description']}")
@@ -227,27 +343,72 @@ class DataDiscovery:
     def save_discovery_cache(self, cache_path: Optional[str] = None) -> None:
         """ディスカバリー結果をキャッシュファイルに保存"""
         if cache_path is None:
-            cache_file_path = self.project_root / "data" / "discovery_cache.json"
+            cache_file_path = self.cache_path
         else:
             cache_file_path = Path(cache_path)
         
+        xml_dirs = self.discover_xml_directories()
         cache_data = {
+            'version': CACHE_VERSION,
             'project_root': str(self.project_root),
-            'discovery_timestamp': __import__('datetime').datetime.now().isoformat(),
-            'xml_directories': {},
-            'recommendations': self.get_recommended_paths()
+            'discovery_timestamp': datetime.now().isoformat(),
+            'xml_directories': {category: [str(p) for p in paths] for category, paths in xml_dirs.items()},
+            'recommendations': self.get_recommended_paths(xml_dirs),
+            'index': self.index
         }
         
-        xml_dirs = self.discover_xml_directories()
-        for category, paths in xml_dirs.items():
-            cache_data['xml_directories'][category] = [str(p) for p in paths]
-        
         cache_file_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(cache_file_path, 'w', encoding='utf-8') as f:
             json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        
+
+        # キャッシュファイルの作成自体で data ディレクトリの mtime が変わるため、記録し直して上書きする
+        # （既存ファイルの上書きではディレクトリの mtime は変わらない）
+        parent_info = self.index.get(str(cache_file_path.parent))
+        if parent_info is not None:
+            parent_info['mtime'] = os.stat(cache_file_path.parent).st_mtime
+            with open(cache_file_path, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+
         print(f"ディスカバリーキャッシュを保存: {cache_file_path}")
+    
+    def load_discovery_cache(self, cache_path: Optional[str] = None) -> bool:
+        """
+        ディスカバリーキャッシュを読み込み
+        
+        インデックス内の全ディレクトリの mtime が保存時と一致する場合のみ有効とする
+        （ファイル・サブディレクトリの追加・削除・改名は親ディレクトリの mtime を更新するため検出できる）。
+        
+        Args:
+            cache_path: キャッシュファイルのパス（指定しない場合は self.cache_path）
+        
+        Returns:
+            キャッシュを読み込んだ場合True、存在しない・無効な場合False
+        """
+        cache_file_path = Path(cache_path) if cache_path else self.cache_path
+        if not cache_file_path.exists():
+            return False
+        
+        try:
+            with open(cache_file_path, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        
+        if (cache_data.get('version') != CACHE_VERSION or
+                cache_data.get('project_root') != str(self.project_root)):
+            return False
+        
+        index = cache_data.get('index', {})
+        for directory, entry_info in index.items():
+            try:
+                if os.stat(directory).st_mtime != entry_info['mtime']:
+                    return False
+            except OSError:
+                return False
+        
+        self._index = index
+        return True
 
 
 def get_auto_data_path(mode: str = "single") -> Optional[str]:
@@ -256,7 +417,7 @@ def get_auto_data_path(mode: str = "single") -> Optional[str]:
     
     Args:
         mode: 'single', 'bulk', 'quick'
-        
+    
     Returns:
         自動検出されたデータパス
     """
@@ -272,9 +433,9 @@ def main():
     
     print(f"\n=== 自動パス取得テスト ===")
     for mode in ['single', 'bulk', 'quick']:
-        auto_path = get_auto_data_path(mode)
+        auto_path = discovery.get_auto_path(mode)
         print(f"{mode}モード: {auto_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
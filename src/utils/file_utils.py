@@ -4,11 +4,15 @@
 
 import os
 import json
-import pandas as pd
 from pathlib import Path
 from typing import Union, List, Dict, Any
 import yaml
 
+from .lazy_imports import lazy_import
+
+# pandas は load_data / save_data の使用時に読み込む
+pd = lazy_import("pandas")
+
 
 def ensure_dir(directory: Union[str, Path]) -> Path:
     """
@@ -69,7 +73,7 @@ def save_config(config: Dict[str, Any], config_path: Union[str, Path]) -> None:
             raise ValueError(f"Unsupported config file format: {config_path.suffix}")
 
 
-def load_data(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
+def load_data(file_path: Union[str, Path], **kwargs) -> 'pd.DataFrame':
     """
     データファイルの読み込み（CSV, Excel, JSON対応）
     
@@ -99,7 +103,7 @@ def load_data(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
         raise ValueError(f"Unsupported file format: {suffix}")
 
 
-def save_data(data: pd.DataFrame, file_path: Union[str, Path], **kwargs) -> None:
+def save_data(data: 'pd.DataFrame', file_path: Union[str, Path], **kwargs) -> None:
     """
     データファイルの保存
     
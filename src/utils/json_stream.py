@@ -0,0 +1,388 @@
+"""
+JSON / JSONL ファイルの逐次読み込み・書き出し（エンコーディング判定付き）
+
+ファイル先頭のサンプルから BOM とエンコーディング（UTF-8 / CP932）を判定して1回だけデコードし
+（先頭が ASCII のみの場合は ASCII 部分をそのままデコードし、最初の非ASCII文字の位置で判定する）、トップレベルの JSON 配列は要素ごと、JSONL は行ごとに順に返す。
+エンコーディングを順に試してファイル全体をデコードし直すことも、巨大な配列全体をメモリに展開することもない。
+書き出しも JSONArrayWriter で1件ずつ行い、数GBのデータセットでもメモリ使用量を一定に保つ。
+"""
+
+import codecs
+import io
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, TextIO, Union
+
+logger = logging.getLogger(__name__)
+
+# エンコーディング判定に使用する先頭のバイト数（読み込みバッファの先頭をそのまま使う）
+SNIFF_BYTES = 64 * 1024
+
+# 配列の逐次読み込みで1回に読み込む文字数
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# BOM → エンコーディング（BOM はデコード時に取り除かれる）
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# BOM がない場合に試すエンコーディング（CP932 は Shift_JIS の上位互換）
+_CANDIDATE_ENCODINGS = ('utf-8', 'cp932')
+
+# 先頭が ASCII のみの場合に使用するエンコーディング名（最初の非ASCII文字の位置で UTF-8 / CP932 を判定する）
+ASCII_PREFIX_ENCODING = 'json_stream_ascii_prefix'
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+_DECODER = json.JSONDecoder()
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    ファイル先頭のサンプルからエンコーディングを判定
+
+    Args:
+        sample: ファイル先頭のバイト列（途中で切れた多バイト文字を含んでもよい）
+
+    Returns:
+        エンコーディング名（判定できない場合は 'utf-8'）
+    """
+    for bom, encoding in _BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in _CANDIDATE_ENCODINGS:
+        try:
+            # final=False で末尾の切れた多バイト文字はエラーにしない
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'utf-8'
+
+
+class _ASCIIPrefixDecoder(codecs.IncrementalDecoder):
+    """
+    ASCII 部分はそのままデコードし、最初の非ASCIIバイトから SNIFF_BYTES バイトでエンコーディングを判定するデコーダ
+
+    ASCII の直後の非ASCIIバイトは UTF-8・CP932 とも多バイト文字の先頭になるため、そこから判定できる。
+    判定のためにファイルを読み直さない（ASCII のみのファイルも1回の読み込みで済む）。
+    """
+
+    def __init__(self, errors: str = 'strict'):
+        super().__init__(errors)
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending = b''
+        self._encoding: Optional[str] = None
+        self._decoder: Optional[codecs.IncrementalDecoder] = None
+
+    def _select(self, encoding: str) -> None:
+        self._encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(self.errors)
+
+    def decode(self, input: bytes, final: bool = False) -> str:
+        if self._decoder is not None:
+            return self._decoder.decode(input, final)
+
+        text = ''
+        if not self._pending:
+            match = _NON_ASCII.search(input)
+            if match is None:
+                return bytes(input).decode('ascii')
+            text = bytes(input[:match.start()]).decode('ascii')
+            input = input[match.start():]
+        self._pending += input
+        if len(self._pending) < SNIFF_BYTES and not final:
+            # 判定に十分なバイト数が揃うまで保留
+            return text
+
+        pending, self._pending = self._pending, b''
+        self._select(detect_encoding(pending[:SNIFF_BYTES]))
+        logger.debug(f"エンコーディング判定（最初の非ASCII文字の位置）: {self._encoding}")
+        return text + self._decoder.decode(pending, final)
+
+    def getstate(self):
+        if self._decoder is None:
+            return self._pending, 0
+        buffered, flag = self._decoder.getstate()
+        # 判定済みのエンコーディング（_CANDIDATE_ENCODINGS の位置 + 1）を下位ビットに保持
+        return buffered, flag * 4 + _CANDIDATE_ENCODINGS.index(self._encoding) + 1
+
+    def setstate(self, state) -> None:
+        buffered, flag = state
+        self.reset()
+        if flag == 0:
+            self._pending = buffered
+            return
+        self._select(_CANDIDATE_ENCODINGS[flag % 4 - 1])
+        self._decoder.setstate((buffered, flag // 4))
+
+
+def _search_codec(name: str) -> Optional[codecs.CodecInfo]:
+    """ASCII_PREFIX_ENCODING を TextIOWrapper で使用できるよう登録する検索関数"""
+    if name != ASCII_PREFIX_ENCODING:
+        return None
+    return codecs.CodecInfo(
+        name=ASCII_PREFIX_ENCODING,
+        encode=codecs.utf_8_encode,
+        decode=lambda data, errors='strict': (_ASCIIPrefixDecoder(errors).decode(data, final=True), len(data)),
+        incrementaldecoder=_ASCIIPrefixDecoder,
+    )
+
+
+codecs.register(_search_codec)
+
+
+def open_text(path: Union[str, Path], encoding: Optional[str] = None) -> TextIO:
+    """
+    エンコーディングを判定してテキストファイルを開く
+
+    Args:
+        path: ファイルパス
+        encoding: エンコーディング（Noneの場合は先頭 SNIFF_BYTES バイトから判定。
+                  先頭が ASCII のみの場合は最初の非ASCII文字の位置から判定する）
+
+    Returns:
+        テキストストリーム
+    """
+    raw = open(path, 'rb', buffering=SNIFF_BYTES)
+    try:
+        if encoding is None:
+            # peek は読み込みバッファに読んだ先頭部分を返す（ファイル位置は進めない）
+            sample = raw.peek(SNIFF_BYTES)[:SNIFF_BYTES]
+            if sample.isascii():
+                # 英数字のみのメタデータ等が先頭に続く場合、先頭だけでは UTF-8 と CP932 を区別できないため、
+                # 読み直さずにデコードしながら最初の非ASCII文字の位置で判定する
+                encoding = ASCII_PREFIX_ENCODING
+            else:
+                encoding = detect_encoding(sample)
+            logger.debug(f"エンコーディング判定: {path} → {encoding}")
+        return io.TextIOWrapper(raw, encoding=encoding)
+    except Exception:
+        raw.close()
+        raise
+
+
+class _JSONValueReader:
+    """テキストストリームから JSON 値を順に取り出す（トップレベルが配列の場合はその要素）"""
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        """未消費の部分にテキストを追加（ストリーム終端ならFalse）"""
+        if self._eof:
+            return False
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """空白を読み飛ばして次の文字を返す（終端の場合は空文字）"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                return ''
+
+    def _decode(self) -> Any:
+        """現在位置の JSON 値を1つデコード"""
+        self._peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # 値がバッファの末尾で切れている場合は読み足して再試行
+                # （チャンクより大きい値で再デコードが繰り返されないよう、読み足す量を倍々にする）
+                if self._fill(size):
+                    size *= 2
+                    continue
+                raise
+            if end == len(self._buffer) and self._fill(size):
+                # 数値等はバッファ末尾で終わっていても続きがありうる
+                continue
+            self._pos = end
+            return value
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def __iter__(self) -> Iterator[Any]:
+        first = self._peek()
+        if first != '[':
+            # 配列以外は空白区切りの値を順に返す（単一オブジェクトの場合は1件）
+            while first:
+                yield self._decode()
+                first = self._peek()
+            return
+
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+        else:
+            while True:
+                yield self._decode()
+                delimiter = self._peek()
+                if delimiter != ',' and delimiter != ']':
+                    raise self._error("Expecting ',' delimiter")
+                self._pos += 1
+                if delimiter == ']':
+                    break
+
+        if self._peek():
+            raise self._error("Extra data")
+
+
+def iter_json_records(path: Union[str, Path], encoding: Optional[str] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    JSON / JSONL ファイルのレコードを順に読み込み
+
+    Args:
+        path: ファイルパス（.jsonl は1行1レコード、それ以外はトップレベルの配列の要素、
+              配列でない場合はトップレベルの値）
+        encoding: エンコーディング（Noneの場合は先頭部分から判定）
+        chunk_size: 1回に読み込む文字数
+
+    Yields:
+        レコード
+
+    Raises:
+        UnicodeDecodeError: 判定したエンコーディングでデコードできない場合
+        json.JSONDecodeError: JSON として不正な場合
+    """
+    with open_text(path, encoding) as f:
+        if str(path).endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from _JSONValueReader(f, chunk_size)
+
+
+def first_json_record(path: Union[str, Path], default: Any = None) -> Any:
+    """
+    先頭のレコードだけを読み込み（出力内容の確認用）
+
+    Args:
+        path: ファイルパス
+        default: レコードがない場合の戻り値
+
+    Returns:
+        先頭のレコード
+    """
+    records = iter_json_records(path)
+    try:
+        return next(records, default)
+    finally:
+        records.close()
+
+
+class JSONArrayWriter:
+    """
+    レコードを1件ずつ JSON 配列として書き出す
+
+    出力は json.dump(records, f, ensure_ascii=False, indent=indent) と同一になる。
+    書き出し中は一時ファイル（<path>.tmp）に書き、close() で配列を閉じてから出力先に置き換える。
+    with ブロックを例外で抜けた場合は一時ファイルを削除し、出力先（既存ファイル）は変更しない。
+    """
+
+    def __init__(self, path: Union[str, Path], indent: Optional[int] = 2, ensure_ascii: bool = False):
+        """
+        初期化
+
+        Args:
+            path: 出力ファイルパス（UTF-8 で書き出す）
+            indent: インデント幅（Noneの場合は1行で出力）
+            ensure_ascii: 非ASCII文字をエスケープするかどうか
+        """
+        self.path = Path(path)
+        self.count = 0
+        self._indent = indent
+        self._ensure_ascii = ensure_ascii
+        self._newline = '\n' + ' ' * indent if indent is not None else ''
+        self._separator = ',' if indent is not None else ', '
+        self._temp_path = self.path.with_name(self.path.name + '.tmp')
+        self._file = open(self._temp_path, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def write(self, record: Any) -> None:
+        """レコードを1件書き出し"""
+        text = json.dumps(record, ensure_ascii=self._ensure_ascii, indent=self._indent)
+        if self._newline:
+            # 文字列中の改行はエスケープされるため、改行は全て構造上のもの
+            text = text.replace('\n', self._newline)
+        self._file.write((self._separator if self.count else '') + self._newline + text)
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]) -> int:
+        """
+        レコードを順に書き出し
+
+        Args:
+            records: レコードの列
+
+        Returns:
+            これまでに書き出した件数
+        """
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self) -> None:
+        """配列を閉じてファイルを閉じ、出力先に置き換える"""
+        if self._file.closed:
+            return
+        self._file.write('\n]' if self.count and self._newline else ']')
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self) -> None:
+        """書きかけの一時ファイルを削除（出力先は変更しない）"""
+        if self._file.closed:
+            return
+        self._file.close()
+        self._temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> 'JSONArrayWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def write_json_records(path: Union[str, Path], records: Iterable[Any], indent: Optional[int] = 2) -> int:
+    """
+    レコードを JSON 配列として逐次書き出し
+
+    Args:
+        path: 出力ファイルパス
+        records: レコードの列（ジェネレータ可）
+        indent: インデント幅
+
+    Returns:
+        書き出した件数
+    """
+    with JSONArrayWriter(path, indent=indent) as writer:
+        return writer.write_all(records)
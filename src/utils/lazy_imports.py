@@ -0,0 +1,102 @@
+"""
+重い依存ライブラリの遅延読み込み
+
+datasets・trl・torch 等は読み込みに数秒かかるため、モジュールの読み込み時ではなく
+実際に属性へアクセスした時点で import する。各エントリポイントは使用する機能の分だけ
+読み込み時間を払えばよくなる（例: run_patent_processing.py quick は torch を読み込まない）。
+"""
+
+import importlib
+import importlib.util
+import logging
+from functools import lru_cache
+from types import ModuleType
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """初回の属性アクセス時にモジュールを読み込むプロキシ"""
+
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name: str):
+        """
+        初期化
+
+        Args:
+            name: モジュール名（例: 'datasets', 'trl'）
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            logger.debug(f"遅延読み込み: {self._name}")
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def is_loaded(self) -> bool:
+        """既に読み込み済みかどうか"""
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    モジュールを遅延読み込みするプロキシを取得
+
+    ImportError は属性に初めてアクセスした時点で発生する。
+
+    Args:
+        name: モジュール名
+
+    Returns:
+        LazyModule
+    """
+    return LazyModule(name)
+
+
+def is_available(name: str) -> bool:
+    """
+    トップレベルのモジュールがインストールされているかを読み込まずに確認
+
+    Args:
+        name: モジュール名
+
+    Returns:
+        インストール済みならTrue
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+@lru_cache(maxsize=None)
+def optional_import(name: str) -> Optional[ModuleType]:
+    """
+    モジュールを読み込み、失敗した場合はNoneを返す（結果はキャッシュ）
+
+    Args:
+        name: モジュール名（絶対名）
+
+    Returns:
+        モジュール（読み込めない場合はNone）
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        logger.debug(f"モジュールを読み込めません: {name} ({e})")
+        return None
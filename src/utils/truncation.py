@@ -0,0 +1,176 @@
+"""
+区切り位置を考慮したテキストの切り詰め（学習データ作成・推論で共通）
+
+区切り位置（文末の「。」や【請求項N】【0010】等のマーカー）のオフセットを1回の走査で求め、
+上限（文字数またはトークン数）に収まる最長の先頭部分を二分探索で選んで1回だけスライスする。
+区切りごとに結果の文字列を作り直さないため、区切りの数に対して線形時間で処理できる。
+"""
+
+import re
+from typing import Callable, List, Optional, Pattern, Sequence, Tuple, Union
+
+# 文の区切り文字
+SENTENCE_DELIMITER = '。'
+
+# テキストの長さを測る関数（None の場合は文字数）
+Measure = Optional[Callable[[str], int]]
+
+
+def sentence_boundaries(text: str, delimiter: str = SENTENCE_DELIMITER) -> List[int]:
+    """
+    文末（区切り文字の直後）のオフセットを昇順に取得
+
+    Args:
+        text: 対象テキスト
+        delimiter: 文の区切り文字
+
+    Returns:
+        各区切り文字の直後のオフセット
+    """
+    offsets = []
+    step = len(delimiter)
+    pos = text.find(delimiter)
+    while pos >= 0:
+        offsets.append(pos + step)
+        pos = text.find(delimiter, pos + step)
+    return offsets
+
+
+def join_marked_blocks(text: str, pattern: Union[str, Pattern]) -> Tuple[str, List[int]]:
+    """
+    マーカーの位置でテキストを分割し、各ブロックを直前のマーカー付きで連結
+
+    ブロックは前後の空白を除き、空のブロックは除く（先頭ブロックはマーカーなし）。
+    re.split と re.findall で分割して順に連結した結果と同じになる。
+
+    Args:
+        text: 対象テキスト
+        pattern: マーカーの正規表現（例: 【請求項\\d+】）
+
+    Returns:
+        (連結したテキスト, 各ブロックの末尾のオフセット) の組
+    """
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern)
+
+    pieces = []
+    ends = []
+    length = 0
+    start = 0
+    marker = ''
+    for match in pattern.finditer(text):
+        block = text[start:match.start()].strip()
+        if block:
+            pieces.append(marker + block)
+            length += len(marker) + len(block)
+            ends.append(length)
+        marker = match.group()
+        start = match.end()
+    block = text[start:].strip()
+    if block:
+        pieces.append(marker + block)
+        ends.append(length + len(marker) + len(block))
+    return ''.join(pieces), ends
+
+
+def longest_prefix(text: str, boundaries: Sequence[int], max_length: int, measure: Measure = None) -> int:
+    """
+    上限に収まる最長の先頭部分の末尾を区切り位置から二分探索
+
+    Args:
+        text: 対象テキスト
+        boundaries: 先頭部分の末尾にできるオフセット（昇順、range も可）
+        max_length: 上限（measure で測った長さ）
+        measure: 長さを測る関数（None の場合は文字数。先頭部分が長いほど値が大きいこと）
+
+    Returns:
+        text[:offset] が上限に収まる最大のオフセット（どの区切りでも収まらない場合は0）
+    """
+    low, high = 0, len(boundaries)
+    # boundaries[:low] は上限内、boundaries[high:] は上限超え
+    while low < high:
+        mid = (low + high) // 2
+        offset = boundaries[mid]
+        length = offset if measure is None else measure(text[:offset])
+        if length <= max_length:
+            low = mid + 1
+        else:
+            high = mid
+    return boundaries[low - 1] if low else 0
+
+
+def truncate_text(text: str, max_length: int, boundaries: Optional[Sequence[int]] = None,
+                  measure: Measure = None, ellipsis: str = '', delimiter: str = SENTENCE_DELIMITER) -> str:
+    """
+    区切り位置で上限に収まるようにテキストを切り詰め
+
+    上限に収まる場合はそのまま返す。どの区切りでも収まらない場合は、
+    ellipsis を付けて上限に収まる位置で強制的に切る。
+
+    Args:
+        text: 対象テキスト
+        max_length: 上限（文字数、measure を指定した場合はその値）
+        boundaries: 切り詰めてよいオフセット（昇順、None の場合は delimiter による文末）
+        measure: 長さを測る関数（例: token_counter(tokenizer)、None の場合は文字数）
+        ellipsis: 強制的に切った場合に末尾に付ける文字列
+        delimiter: boundaries を指定しない場合の文の区切り文字
+
+    Returns:
+        切り詰めたテキスト
+    """
+    if (len(text) if measure is None else measure(text)) <= max_length:
+        return text
+
+    if boundaries is None:
+        boundaries = sentence_boundaries(text, delimiter)
+    end = longest_prefix(text, boundaries, max_length, measure)
+    if end:
+        return text[:end]
+
+    # 区切りで何も残らない場合は強制的に切る
+    if measure is None:
+        return text[:max(max_length - len(ellipsis), 0)] + ellipsis
+    end = longest_prefix(text, range(1, len(text) + 1), max_length, lambda prefix: measure(prefix + ellipsis))
+    return text[:end] + ellipsis
+
+
+def truncate_blocks(text: str, pattern: Union[str, Pattern], max_length: int,
+                    measure: Measure = None, ellipsis: str = '...') -> str:
+    """
+    マーカー（【請求項N】【0010】等）で区切ったブロック単位で上限に収まるように切り詰め
+
+    ブロックはマーカー付きで前後の空白を除いて連結し（join_marked_blocks）、
+    上限に収まるだけ先頭から含める。先頭ブロックだけで上限を超える場合は、
+    ellipsis を付けて強制的に切る。上限に収まる場合も連結したテキストを返すため、
+    元のテキストをそのまま使う場合は呼び出し側で先に長さを確認すること。
+
+    Args:
+        text: 対象テキスト
+        pattern: マーカーの正規表現
+        max_length: 上限（文字数、measure を指定した場合はその値）
+        measure: 長さを測る関数（None の場合は文字数）
+        ellipsis: 強制的に切った場合に末尾に付ける文字列
+
+    Returns:
+        切り詰めたテキスト
+    """
+    joined, ends = join_marked_blocks(text, pattern)
+    if not joined:
+        # マーカーと空白のみの場合は元のテキストを強制的に切る
+        return truncate_text(text, max_length, (), measure, ellipsis)
+    return truncate_text(joined, max_length, ends, measure, ellipsis)
+
+
+def token_counter(tokenizer) -> Callable[[str], int]:
+    """
+    トークナイザーでトークン数を数える関数を作成（measure 引数に渡す）
+
+    Args:
+        tokenizer: transformers のトークナイザー（encode を持つもの）
+
+    Returns:
+        テキストのトークン数（特殊トークンを除く）を返す関数
+    """
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return count
@@ -0,0 +1,40 @@
+"""
+単体テスト共通設定・フィクスチャ
+
+src をインポートパスに追加し、ベンチマークと同じ合成ST96コーパス生成器（benchmarks/st96_generator.py）で
+小規模なコーパスをセッションごとに一時ディレクトリへ生成する。pytest-benchmark は不要。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+from st96_generator import ST96Generator  # noqa: E402
+
+# テスト用コーパスの規模
+CORPUS_DOCS = 12
+
+
+@pytest.fixture(scope="session")
+def st96_generator():
+    """小規模な文書を生成するコーパス生成器"""
+    return ST96Generator(paragraphs=12, claims=4, seed=0)
+
+
+@pytest.fixture(scope="session")
+def st96_corpus(st96_generator, tmp_path_factory):
+    """合成コーパスのディレクトリ"""
+    corpus_dir = tmp_path_factory.mktemp("st96")
+    st96_generator.write_corpus(str(corpus_dir), CORPUS_DOCS)
+    return corpus_dir
+
+
+@pytest.fixture(scope="session")
+def processor():
+    from patent_processing.text_processor import PatentTextProcessor
+    return PatentTextProcessor(language="japanese")
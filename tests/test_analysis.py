@@ -0,0 +1,52 @@
+"""
+分析結果のコンパクト表現（LegalAnalysis・ChemicalAnalysis）の確認
+"""
+
+from patent_processing.analysis import ChemicalAnalysis, LegalAnalysis
+
+TEXT = "請求項1に記載の樹脂組成物であって、ポリエチレンとNaClを含むことを特徴とする樹脂組成物。"
+
+
+def count_summary_calls(monkeypatch, analysis_class):
+    calls = []
+    compute = analysis_class._compute_summary
+
+    def counting(self):
+        calls.append(self)
+        return compute(self)
+
+    monkeypatch.setattr(analysis_class, '_compute_summary', counting)
+    return calls
+
+
+def test_legal_summary_is_computed_once(processor, monkeypatch):
+    calls = count_summary_calls(monkeypatch, LegalAnalysis)
+    analysis = processor.analyze_legal_content(TEXT)
+
+    converted = analysis.to_dict()
+    assert analysis['legal_quality_score'] == converted['legal_quality_score']
+    assert analysis['total_expressions'] == len(converted['expressions']) > 0
+    assert len(calls) == 1
+
+    # 呼び出し側で変更しても保持している集計結果には影響しない
+    summary = analysis.summary()
+    summary['total_expressions'] = -1
+    summary['importance_distribution']['critical'] = -1
+    analysis['category_counts']['claim'] = -1
+    assert analysis['total_expressions'] == len(converted['expressions'])
+    assert analysis['importance_distribution'] == converted['importance_distribution']
+    assert analysis['category_counts'] == converted['category_counts']
+
+
+def test_chemical_summary_is_computed_once(processor, monkeypatch):
+    calls = count_summary_calls(monkeypatch, ChemicalAnalysis)
+    analysis = processor.analyze_chemical_content(TEXT)
+
+    converted = analysis.to_dict()
+    assert analysis['total_entities'] == len(converted['entities'])
+    assert analysis['unique_formulas'] == len(converted['unique_formulas_list'])
+    assert len(calls) == 1
+
+    analysis['category_counts'].clear()
+    analysis.summary()['category_counts'].clear()
+    assert analysis['category_counts'] == converted['category_counts'] != {}
@@ -0,0 +1,61 @@
+"""
+アーカイブ（.zip / .tar / .tar.gz / .tgz）の直接読み込みの確認
+
+展開せずに処理した結果がディレクトリを処理した結果と同じになること、
+シャード分割でも同じファイルが同じシャードに割り当てられること、
+処理後にアーカイブのハンドルが閉じられることを確認する。
+"""
+
+import shutil
+
+import pytest
+
+from patent_processing import archive
+
+ARCHIVE_FORMATS = {'zip': ('zip', '.zip'), 'tar': ('tar', '.tar'), 'tar.gz': ('gztar', '.tar.gz'),
+                   'tgz': ('gztar', '.tgz')}
+
+
+@pytest.fixture(scope="module", params=list(ARCHIVE_FORMATS))
+def corpus_archive(request, st96_corpus, tmp_path_factory):
+    """コーパスのディレクトリをアーカイブ化したファイル"""
+    archive_format, suffix = ARCHIVE_FORMATS[request.param]
+    archive_dir = tmp_path_factory.mktemp(f"st96-{request.param.replace('.', '')}")
+    created = shutil.make_archive(str(archive_dir / "JPB_2025_01発行分"), archive_format, root_dir=st96_corpus)
+    path = archive_dir / f"JPB_2025_01発行分{suffix}"
+    shutil.move(created, path)
+    return path
+
+
+def summarize(df):
+    """ファイル名 → 比較する内容（パスはアーカイブ内かどうかで異なるため除く）"""
+    return {
+        row['file_name']: (row['patent_id'], row['combined_text'], row['claims'], row['sentences'])
+        for _, row in df.iterrows()
+    }
+
+
+def test_archive_matches_directory(processor, st96_corpus, corpus_archive):
+    expected = summarize(processor.process_xml_files(str(st96_corpus)))
+    assert summarize(processor.process_xml_files(str(corpus_archive))) == expected
+    assert archive._open_handles == {}
+
+
+def test_archive_shards_match_directory(processor, st96_corpus, corpus_archive):
+    for shard_index in range(2):
+        expected = summarize(processor.process_xml_files(str(st96_corpus), shard_index=shard_index, num_shards=2))
+        result = processor.process_xml_files(str(corpus_archive), shard_index=shard_index, num_shards=2)
+        assert summarize(result) == expected
+    assert archive._open_handles == {}
+
+
+def test_close_archives_closes_handles(st96_corpus, tmp_path):
+    path = shutil.make_archive(str(tmp_path / "corpus"), 'zip', root_dir=st96_corpus)
+    members = archive.list_members(path)
+    with archive.open_member(members[0]) as stream:
+        assert stream.read(5) == b'<?xml'
+    handle = next(iter(archive._open_handles.values()))
+
+    archive.close_archives()
+    assert archive._open_handles == {}
+    assert handle.fp is None
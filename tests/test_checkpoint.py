@@ -0,0 +1,67 @@
+"""
+一括処理のチェックポイント・再開（process_xml_files）の確認
+
+チェックポイントには法的表現・化学エンティティの一覧を書き出さず集計結果のみ保持し、
+再開時は処理せずにチェックポイントから同じ内容のレコードを復元すること、
+中断時も書き出し間隔に達していない処理済みファイルをジャーナルに記録することを確認する。
+"""
+
+import json
+
+import pytest
+
+from patent_processing.checkpoint import JOURNAL_FILE, PART_FILE_GLOB
+from patent_processing.text_processor import PatentTextProcessor
+
+
+def test_resume_restores_records_with_analysis_summaries(processor, st96_corpus, tmp_path):
+    checkpoint_dir = tmp_path / "checkpoint"
+    processed = processor.process_xml_files(str(st96_corpus), checkpoint_dir=str(checkpoint_dir))
+
+    lines = [json.loads(line) for part in sorted(checkpoint_dir.glob(PART_FILE_GLOB))
+             for line in part.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == len(processed)
+    assert all('expressions' not in line['record']['legal_analysis'] for line in lines)
+    assert (checkpoint_dir / JOURNAL_FILE).exists()
+
+    restored = processor.process_xml_files(str(st96_corpus), checkpoint_dir=str(checkpoint_dir), resume=True)
+    assert list(restored['patent_id']) == list(processed['patent_id'])
+    for (_, original), (_, resumed) in zip(processed.iterrows(), restored.iterrows()):
+        assert resumed['combined_text'] == original['combined_text']
+        assert resumed['sentences'] == original['sentences']
+        assert resumed['claims'] == original['claims']
+        assert 'expressions' not in resumed['legal_analysis']
+        assert resumed['legal_analysis'] == original['legal_analysis'].summary()
+        if original['chemical_analysis'].get('enabled'):
+            assert 'entities' not in resumed['chemical_analysis']
+            assert resumed['chemical_analysis'] == original['chemical_analysis'].summary()
+
+
+def test_interrupt_journals_buffered_files(processor, st96_corpus, tmp_path, monkeypatch):
+    expected = processor.process_xml_files(str(st96_corpus))
+    process_xml_file = PatentTextProcessor.process_xml_file
+    calls = []
+    limit = [5]
+
+    def interrupted(self, xml_file, stream=None):
+        if len(calls) == limit[0]:
+            raise KeyboardInterrupt
+        calls.append(xml_file)
+        return process_xml_file(self, xml_file, stream)
+
+    # 書き出し間隔（件数・時間）に達する前に中断
+    checkpoint_dir = tmp_path / "checkpoint"
+    options = {'flush_every': 1000, 'flush_interval': 3600}
+    monkeypatch.setattr(PatentTextProcessor, 'process_xml_file', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        processor.process_xml_files(str(st96_corpus), checkpoint_dir=str(checkpoint_dir),
+                                    checkpoint_options=options)
+    assert len((checkpoint_dir / JOURNAL_FILE).read_text(encoding='utf-8').splitlines()) == 5
+
+    # 再開時は記録済みの5件を処理しない
+    calls.clear()
+    limit[0] = None
+    restored = processor.process_xml_files(str(st96_corpus), checkpoint_dir=str(checkpoint_dir), resume=True,
+                                           checkpoint_options=options)
+    assert list(restored['patent_id']) == list(expected['patent_id'])
+    assert len(calls) == len(expected) - 5
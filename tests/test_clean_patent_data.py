@@ -0,0 +1,49 @@
+"""
+特許データクリーニング（scripts/clean_patent_data.py）の前処理設定の確認
+
+文字数制限・除去パターンを設定ファイルの preprocessing セクションから読み込み、
+セクションがない場合は従来の制限（800文字で切り詰め、50文字未満は除外）を使用することを確認する。
+"""
+
+from scripts.clean_patent_data import PatentDataCleaner
+
+# 同じ文字が続かないテキスト（連続文字の除去の影響を受けない）
+KANJI = ''.join(chr(0x4e00 + i) for i in range(100))
+
+
+def write_config(tmp_path, text):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(text, encoding='utf-8')
+    return config_path
+
+
+def test_cleaner_reads_preprocessing(tmp_path):
+    config_path = write_config(
+        tmp_path,
+        "preprocessing:\n"
+        "  remove_patterns:\n"
+        "    - \"Fig\\\\. \\\\d+\"\n"
+        "  min_text_length: 10\n"
+        "  max_text_length: 30\n"
+        "  max_field_length: 5\n"
+        "  max_list_item_length: 4\n",
+    )
+    cleaner = PatentDataCleaner(config_path)
+
+    item = cleaner.process_item({'text': "本発明の装置を示す。Fig. 1 に構成を示す。" * 3,
+                                 'title': "樹脂組成物の製造方法", 'claims': ["請求項1の装置。"]})
+    assert 'Fig' not in item['text']
+    assert len(item['text']) <= 30
+    assert item['title'] == "樹脂組成物..."
+    assert item['claims'] == ["請求項1..."]
+    # min_text_length 以下のテキストは除外
+    assert cleaner.process_item({'text': "短いテキストです。"}) is None
+
+
+def test_cleaner_defaults_without_preprocessing(tmp_path):
+    config_path = write_config(tmp_path, "performance:\n  num_workers: 2\n")
+    for cleaner in (PatentDataCleaner(config_path), PatentDataCleaner(tmp_path / "missing.yaml")):
+        assert cleaner.preprocessing.max_text_length == 800
+        assert cleaner.process_item({'text': KANJI[:49]}) is None
+        assert cleaner.process_item({'text': KANJI[:50]}) is not None
+        assert len(cleaner.process_item({'text': "本発明の装置。" * 200})['text']) <= 800
@@ -0,0 +1,82 @@
+"""
+chat形式変換（scripts/convert_to_chat_format.py）のペア作成の確認
+
+セクション単位のデータを特許ごとにまとめ、請求項・実施形態のペアを作成すること、
+並列処理（num_workers > 1）でも逐次処理と同じペアが同じ順序で得られること、
+並列数等を設定ファイルの専用の項目から読み込むことを確認する。
+"""
+
+import pytest
+
+from scripts.convert_to_chat_format import PatentChatFormatter, load_formatter_options
+
+CLAIMS = "【請求項1】樹脂組成物と、加熱部と、を備え、前記加熱部は前記樹脂組成物を加熱する装置。"
+PARAGRAPH = "【0010】本実施形態の装置は樹脂組成物と加熱部とを備える。"
+EMBODIMENT = PARAGRAPH * 5
+
+
+def section_records():
+    """セクション単位のレコード（成功・請求項なし・実施形態なし・文字数不足の特許を含む）"""
+    return [
+        {'patent_id': 'JP1', 'section': 'abstract', 'text': "要約。" * 50},
+        {'patent_id': 'JP1', 'section': 'claims', 'text': CLAIMS},
+        {'patent_id': 'JP1', 'section': 'detailed_description', 'text': EMBODIMENT},
+        {'patent_id': 'JP2', 'section': 'detailed_description', 'text': EMBODIMENT},
+        {'patent_id': 'JP3', 'section': 'claims', 'text': CLAIMS},
+        {'patent_id': 'JP3', 'section': 'detailed_description', 'text': "  "},
+        {'patent_id': 'JP4', 'section': 'claim', 'text': "短い請求項。"},
+        {'patent_id': 'JP4', 'section': 'embodiment', 'text': EMBODIMENT},
+        {'patent_id': 'JP5', 'section': 'claim', 'text': CLAIMS},
+        {'patent_id': 'JP5', 'section': 'embodiment', 'text': EMBODIMENT},
+    ]
+
+
+def test_group_sections_keeps_only_pair_sections():
+    formatter = PatentChatFormatter()
+    patents = formatter.group_sections(iter(section_records()))
+    assert list(patents) == ['JP1', 'JP2', 'JP3', 'JP4', 'JP5']
+    assert patents['JP1'] == {'claims': CLAIMS, 'detailed_description': EMBODIMENT}
+
+
+def test_build_pair_statuses():
+    formatter = PatentChatFormatter(max_embodiment_length=len(PARAGRAPH) * 4 + 10)
+    patents = formatter.group_sections(section_records())
+    results = {patent_id: formatter.build_pair((patent_id, sections)) for patent_id, sections in patents.items()}
+
+    assert {patent_id: status for patent_id, (status, _) in results.items()} == {
+        'JP1': 'success', 'JP2': 'no_claims', 'JP3': 'no_implementation', 'JP4': 'too_short', 'JP5': 'success'}
+
+    pair = results['JP1'][1]
+    assert pair['claims_section'] == 'claims'
+    assert pair['implementation_section'] == 'detailed_description'
+    assert pair['user_message'] == CLAIMS
+    # 実施形態は段落単位で上限に収まるだけ含める
+    assert pair['assistant_message'] == PARAGRAPH * 4
+    assert (results['JP5'][1]['claims_section'], results['JP5'][1]['implementation_section']) == \
+        ('claim', 'embodiment')
+
+
+@pytest.mark.parametrize("batch_size", [1, 1000])
+def test_parallel_pairs_match_sequential(batch_size):
+    records = [dict(record, patent_id=f"{record['patent_id']}-{i}") for i in range(10) for record in section_records()]
+
+    sequential = PatentChatFormatter().extract_claims_and_implementations(records)
+    parallel = PatentChatFormatter(num_workers=2, batch_size=batch_size).extract_claims_and_implementations(records)
+    assert len(sequential) == 20
+    assert parallel == sequential
+
+
+def test_load_formatter_options_uses_chat_settings(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "performance:\n"
+        "  num_workers: 8\n"
+        "  map_batch_size: 50\n"
+        "  chat_num_workers: 3\n"
+        "  chat_batch_size: 200\n"
+        "  max_claims_length: 400\n",
+        encoding='utf-8',
+    )
+    assert load_formatter_options(config_path) == {
+        'max_claims_length': 400, 'max_embodiment_length': 800, 'num_workers': 3, 'batch_size': 200}
+    assert load_formatter_options(tmp_path / "missing.yaml") == {'max_claims_length': 500, 'max_embodiment_length': 800}
@@ -0,0 +1,141 @@
+"""
+複数形式のデータセット作成（dataset_builder）の確認
+
+段落分割が従来の re.split による実装と同じ結果になること、1回の走査で ChatML・段落単位・
+会話履歴形式を作成でき、ChatML から作成した場合と同じ内容になることを確認する。
+"""
+
+import random
+import re
+
+import pytest
+
+from patent_processing.dataset_builder import (ChatMLSink, ConversationSink, DatasetBuilder, DatasetSink,
+                                               ParagraphUnitSink, build_paragraph_index, iter_chatml_documents,
+                                               iter_documents, split_into_paragraphs)
+from utils.json_stream import JSONArrayWriter
+
+
+def reference_split(text):
+    """従来の段落分割（re.split で段落番号と内容を交互に取り出す）"""
+    result = []
+    current_paragraph = None
+    current_number = None
+    for part in re.split(r'(【\d{4}】)', text or ''):
+        if re.match(r'【\d{4}】', part):
+            if current_number and current_paragraph:
+                result.append({'number': current_number, 'content': current_paragraph.strip()})
+            current_number = part
+            current_paragraph = ""
+        elif current_number:
+            current_paragraph += part
+    if current_number and current_paragraph:
+        result.append({'number': current_number, 'content': current_paragraph.strip()})
+    return result
+
+
+class ListWriter:
+    """書き出したレコードをリストに保持するライター"""
+
+    def __init__(self):
+        self.records = []
+        self.closed = False
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        self.closed = True
+
+
+def strip_created_at(records):
+    return [dict(record, metadata={k: v for k, v in record['metadata'].items() if k != 'created_at'})
+            for record in records]
+
+
+def test_split_into_paragraphs_matches_reference():
+    rng = random.Random(0)
+    tokens = ['【0010】', '【0011】', '【12】', '前文', '本文。', ' ', '\n\n', '']
+    for _ in range(2000):
+        text = ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+        assert split_into_paragraphs(text) == reference_split(text)
+
+
+def test_build_all_formats_in_one_pass(processor, st96_corpus):
+    patents = list(processor.iter_patents(str(st96_corpus)))
+    sinks = [
+        ChatMLSink(ListWriter()),
+        ParagraphUnitSink(ListWriter(), max_documents=3),
+        ConversationSink(ListWriter(), max_documents=2),
+    ]
+    counts = DatasetBuilder(sinks).build(iter_documents(patents))
+
+    chatml, option1, option2 = (sink.writer.records for sink in sinks)
+    assert all(sink.writer.closed for sink in sinks)
+    assert counts == {'chatml': len(patents), 'option1_paragraph_unit': len(option1), 'option2_conversation': 2}
+    assert {record['metadata']['patent_id'] for record in option1} == \
+        {record['metadata']['patent_id'] for record in chatml[:3]}
+    assert sinks[2].turns == sum(len(record['messages']) for record in option2)
+
+    # 作成済みの ChatML から派生データセットを作成した場合と同じ内容になる
+    from_chatml = [ParagraphUnitSink(ListWriter(), max_documents=3), ConversationSink(ListWriter(), max_documents=2)]
+    DatasetBuilder(from_chatml).build(iter_chatml_documents(chatml))
+    assert strip_created_at(from_chatml[0].writer.records) == strip_created_at(option1)
+    assert strip_created_at(from_chatml[1].writer.records) == strip_created_at(option2)
+
+
+def test_build_stops_when_all_sinks_are_full():
+    consumed = []
+
+    def patents():
+        for i in range(10):
+            consumed.append(i)
+            yield {'patent_number': f'JP{i}', 'claims': [{'claim_number': '1', 'claim_text': '装置。'}],
+                   'detailed_description': '【0001】\n第1段落。\n\n【0002】\n第2段落。'}
+
+    sink = ConversationSink(ListWriter(), max_documents=4)
+    assert DatasetBuilder([sink]).build(iter_documents(patents())) == {'option2_conversation': 4}
+    assert consumed == [0, 1, 2, 3]
+
+
+def test_build_paragraph_index_counts_each_document_once(tmp_path):
+    chatml = []
+    sink = ChatMLSink(ListWriter())
+    patents = [{'patent_number': '', 'file_name': f'{i}.xml',
+                'claims': [{'claim_number': '1', 'claim_text': f'装置{i}。'}],
+                'detailed_description': '【0001】\n本発明は上記実施形態に限定されない。\n\n【0002】\n固有の段落' + str(i)}
+               for i in range(3)]
+    DatasetBuilder([sink]).build(iter_documents(patents))
+    # 特許IDのない旧形式の ChatML
+    for record in sink.writer.records:
+        chatml.append(dict(record, metadata=dict(record['metadata'], patent_id='')))
+
+    index_path = str(tmp_path / "paragraph_frequency_index.json")
+    for _ in range(2):
+        paragraph_index = build_paragraph_index(iter_chatml_documents(chatml), index_path)
+    assert len(paragraph_index.documents) == 3
+    assert paragraph_index.frequency('本発明は上記実施形態に限定されない。') == 3
+
+
+def test_dataset_sink_requires_records():
+    with pytest.raises(TypeError):
+        DatasetSink(ListWriter())
+
+
+def test_build_discards_output_on_error(tmp_path):
+    def patents():
+        yield {'patent_number': 'JP1', 'claims': [{'claim_number': '1', 'claim_text': '装置。'}],
+               'detailed_description': '【0001】\n第1段落。'}
+        raise RuntimeError("読み込み失敗")
+
+    output_path = tmp_path / "option1.json"
+    sinks = [ParagraphUnitSink(JSONArrayWriter(str(output_path))), ChatMLSink(ListWriter())]
+    with pytest.raises(RuntimeError):
+        DatasetBuilder(sinks).build(iter_documents(patents()))
+    # 途中までの出力は確定させない（abort を持たないライターは閉じる）
+    assert list(tmp_path.iterdir()) == []
+    assert sinks[1].writer.closed
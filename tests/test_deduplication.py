@@ -0,0 +1,32 @@
+"""
+近似重複検出（MinHashDeduplicator）の確認
+"""
+
+from patent_processing.deduplication import MinHashDeduplicator
+
+TEXT = "本発明は、優れた耐衝撃性と剛性を両立するポリプロピレン樹脂組成物及びその成形品に関する。" * 5
+
+
+def test_near_duplicates_are_dropped():
+    records = [
+        {'patent_id': 'JP1', 'combined_text': TEXT},
+        {'patent_id': 'JP2', 'combined_text': TEXT + "。"},
+        {'patent_id': 'JP3', 'combined_text': "全く異なる内容の実施形態を説明する文章である。" * 5},
+    ]
+    deduplicator = MinHashDeduplicator()
+    kept = deduplicator.deduplicate_records(records)
+    assert [record['patent_id'] for record in kept] == ['JP1', 'JP3']
+    assert [member['patent_id'] for member in deduplicator.clusters['JP1']] == ['JP2']
+
+
+def test_empty_texts_are_kept_and_not_indexed():
+    records = [
+        {'patent_id': 'JP1', 'combined_text': ''},
+        {'patent_id': 'JP2', 'combined_text': ' \n'},
+        {'patent_id': 'JP3', 'combined_text': None},
+        {'patent_id': 'JP4', 'combined_text': TEXT},
+    ]
+    deduplicator = MinHashDeduplicator()
+    kept = deduplicator.deduplicate_records(records)
+    assert [record['patent_id'] for record in kept] == ['JP1', 'JP2', 'JP3', 'JP4']
+    assert deduplicator.clusters == {}
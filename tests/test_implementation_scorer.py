@@ -0,0 +1,71 @@
+"""
+実施形態生成品質（implementation_scorer）の確認
+
+請求項側インデックスの構築、候補テキストのスコア、断片ごとの差分更新が一括スコアと一致すること、
+best-of-N の再ランキングを確認する。
+"""
+
+import random
+
+import pytest
+
+from patent_processing.implementation_scorer import METRIC_NAME, ClaimIndex, ImplementationQualityScorer
+
+CLAIMS = [
+    {'claim_number': '1', 'claim_text': '樹脂組成物と、加熱部と、を備え、前記加熱部は前記樹脂組成物を加熱する装置。'},
+    {'claim_number': '2', 'claim_text': '請求項1に記載の装置であって、加熱部と、冷却部とを備える装置。'},
+]
+
+GOOD = ('【0010】本実施形態の装置は樹脂組成物と加熱部とを備える。'
+        '【0011】前記加熱部は前記樹脂組成物を加熱する。冷却部を備える。')
+POOR = '【0010】無関係な文章。【0012】'
+
+
+def test_claim_index_counts_repeated_elements_once():
+    index = ClaimIndex(CLAIMS)
+    assert index.elements == ['樹脂組成物と', '加熱部と', '前記加熱部は前記樹脂組成物を加熱する装置',
+                              '請求項1に記載の装置であって', '冷却部とを備える装置']
+    assert index.reference_terms == {'加熱部', '樹脂組成物'}
+    assert len(index.element_ngram_counts) == len(index.elements)
+
+
+def test_score_components():
+    scorer = ImplementationQualityScorer()
+    index = scorer.index_patent(CLAIMS)
+
+    good = scorer.score(index, GOOD)
+    assert good == {'element_coverage': 0.8, 'reference_reuse': 1.0, 'paragraph_continuity': 1.0,
+                    METRIC_NAME: 0.9, 'candidate_length': len(GOOD)}
+
+    poor = scorer.score(index, POOR)
+    assert poor[METRIC_NAME] == 0.0
+    assert poor['paragraph_continuity'] == 0.0
+
+    # 請求項がない場合は段落番号の連続性のみ
+    empty = scorer.score(scorer.index_patent([]), GOOD)
+    assert (empty['element_coverage'], empty['reference_reuse'], empty['paragraph_continuity']) == (0.0, 0.0, 1.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_feed_matches_one_shot(seed):
+    scorer = ImplementationQualityScorer()
+    index = scorer.index_patent(CLAIMS)
+    rng = random.Random(seed)
+
+    candidate = scorer.new_candidate(index)
+    position = 0
+    while position < len(GOOD):
+        step = rng.randint(1, 4)
+        candidate.feed(GOOD[position:position + step])
+        position += step
+    assert candidate.score() == scorer.score(index, GOOD)
+
+
+def test_rerank_and_index_cache():
+    scorer = ImplementationQualityScorer()
+    index = scorer.index_patent(CLAIMS, patent_id='JP1')
+    assert scorer.index_patent([], patent_id='JP1') is index
+
+    ranked = scorer.rerank(index, [POOR, GOOD])
+    assert [i for i, _ in ranked] == [1, 0]
+    assert ranked[0][1] == 0.9
@@ -0,0 +1,122 @@
+"""
+JSON / JSONL 読み込み（エンコーディング判定・逐次読み込み）の確認
+
+BOM・UTF-8・CP932 の各ファイルを1回の読み込みで json.load と同じ内容に復元できること、
+値がチャンクの境界をまたぐ場合も正しく読み込めること、逐次書き出しが json.dump と同じ出力になり、例外時は既存の出力を壊さないことを確認する。
+"""
+
+import codecs
+import io
+import json
+
+import pytest
+
+from utils import json_stream
+from utils.json_stream import (SNIFF_BYTES, JSONArrayWriter, detect_encoding, first_json_record, iter_json_records,
+                               write_json_records)
+
+RECORDS = [
+    {"id": i, "text": "特許請求の範囲【請求項１】" * (i * 7 % 50), "score": i / 3, "tags": ["a,]", {"b": None}]}
+    for i in range(200)
+] + [12345678901234567890, "文字列", None, [1, [2]]]
+
+ENCODINGS = [
+    ("utf-8", b"", "utf-8"),
+    ("utf-8", codecs.BOM_UTF8, "utf-8-sig"),
+    ("cp932", b"", "cp932"),
+    ("utf-16-le", codecs.BOM_UTF16_LE, "utf-16"),
+]
+
+
+@pytest.mark.parametrize("encoding,bom,expected", ENCODINGS, ids=[expected for _, _, expected in ENCODINGS])
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_iter_json_records_array(tmp_path, encoding, bom, expected, chunk_size):
+    path = tmp_path / "records.json"
+    path.write_bytes(bom + json.dumps(RECORDS, ensure_ascii=False, indent=2).encode(encoding))
+    assert detect_encoding(path.read_bytes()[:1024]) == expected
+    assert list(iter_json_records(path, chunk_size=chunk_size)) == RECORDS
+
+
+def test_iter_json_records_jsonl_and_object(tmp_path):
+    jsonl = tmp_path / "records.jsonl"
+    jsonl.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in RECORDS) + "\n\n", encoding="cp932")
+    assert list(iter_json_records(jsonl)) == RECORDS
+
+    single = tmp_path / "single.json"
+    single.write_text(' {"text": "請求項"} ', encoding="utf-8")
+    assert list(iter_json_records(single)) == [{"text": "請求項"}]
+
+
+@pytest.mark.parametrize("document", ["[1 2]", "[1,2] x", "[1,", "[1,]"])
+def test_iter_json_records_rejects_invalid(tmp_path, document):
+    path = tmp_path / "invalid.json"
+    path.write_text(document, encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(path, chunk_size=2))
+
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "cp932"])
+def test_encoding_detected_past_ascii_prefix(tmp_path, encoding):
+    # 先頭の判定範囲（SNIFF_BYTES）を超えて ASCII のみのレコードが続くファイル
+    records = [{"id": i, "source": "ascii metadata " * 20} for i in range(300)]
+    records.append({"text": "特許請求の範囲【請求項１】"})
+    path = tmp_path / "late.json"
+    path.write_bytes(json.dumps(records, ensure_ascii=False).encode(encoding))
+    assert path.stat().st_size > SNIFF_BYTES
+    assert list(iter_json_records(path)) == records
+
+
+class CountingFileIO(io.FileIO):
+    """読み込んだバイト数を数えるファイル"""
+
+    bytes_read = 0
+
+    def readinto(self, buffer):
+        size = super().readinto(buffer)
+        CountingFileIO.bytes_read += size or 0
+        return size
+
+    def readall(self):
+        data = super().readall()
+        CountingFileIO.bytes_read += len(data)
+        return data
+
+
+@pytest.mark.parametrize("encoding,ensure_ascii", [("utf-8", True), ("utf-8", False), ("cp932", False)],
+                         ids=["ensure_ascii", "utf-8", "cp932"])
+def test_ascii_prefix_file_is_read_once(tmp_path, monkeypatch, encoding, ensure_ascii):
+    # json.dump の既定（ensure_ascii=True）の出力は全て ASCII になる
+    records = [{"id": i, "source": "ascii metadata " * 20} for i in range(2000)]
+    records += [{"text": "特許請求の範囲【請求項１】" * 5000}]
+    path = tmp_path / "records.json"
+    path.write_bytes(json.dumps(records, ensure_ascii=ensure_ascii).encode(encoding))
+    assert path.stat().st_size > 10 * SNIFF_BYTES
+
+    CountingFileIO.bytes_read = 0
+    monkeypatch.setattr(json_stream, 'open', lambda file, mode, buffering: io.BufferedReader(
+        CountingFileIO(file, 'r'), buffer_size=buffering), raising=False)
+    assert list(iter_json_records(path, chunk_size=4096)) == records
+    assert CountingFileIO.bytes_read == path.stat().st_size
+
+
+@pytest.mark.parametrize("indent", [2, None])
+@pytest.mark.parametrize("records", [[], RECORDS], ids=["empty", "records"])
+def test_write_json_records_matches_json_dump(tmp_path, records, indent):
+    path = tmp_path / "out.json"
+    assert write_json_records(path, iter(records), indent=indent) == len(records)
+    assert path.read_text(encoding="utf-8") == json.dumps(records, ensure_ascii=False, indent=indent)
+    assert first_json_record(path) == (records[0] if records else None)
+
+
+def test_writer_keeps_existing_output_on_error(tmp_path):
+    path = tmp_path / "out.json"
+    write_json_records(path, RECORDS[:3])
+    previous = path.read_text(encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with JSONArrayWriter(path) as writer:
+            writer.write(RECORDS[0])
+            raise RuntimeError("中断")
+    assert path.read_text(encoding="utf-8") == previous
+    assert list(tmp_path.iterdir()) == [path]
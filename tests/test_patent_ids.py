@@ -0,0 +1,63 @@
+"""
+特許IDの決定的な割り当て（patent_ids）の確認
+
+公報番号がある場合はそのまま使い、ない場合は本文・請求項のダイジェストから
+PYTHONHASHSEED・ファイルパス・シャード分割に依存しない同じIDが付くことを確認する。
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from patent_processing.patent_ids import FALLBACK_ID_PREFIX, assign_patent_id, get_patent_id
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+UNNUMBERED = {
+    'patent_number': '',
+    'title': '加熱装置',
+    'detailed_description': '【0001】\n本発明は加熱装置に関する。',
+    'claims': [{'claim_number': '1', 'claim_text': '加熱部を備える装置。'}],
+    'file_name': 'a.xml',
+}
+
+
+def test_publication_number_is_preferred():
+    assert assign_patent_id(dict(UNNUMBERED, patent_number=' JP 2025-000123 A ')) == 'JP2025-000123A'
+    assert get_patent_id({'patent_id': 'JP1', 'patent_number': 'JP2'}) == 'JP1'
+
+
+def test_fallback_digest_depends_only_on_content():
+    patent_id = assign_patent_id(UNNUMBERED)
+    assert patent_id.startswith(FALLBACK_ID_PREFIX)
+    assert assign_patent_id(dict(UNNUMBERED, file_name='b.xml')) == patent_id
+    assert assign_patent_id(dict(UNNUMBERED, title='冷却装置')) != patent_id
+    assert assign_patent_id(dict(UNNUMBERED, claims=[{'claim_number': '2', 'claim_text': '加熱部を備える装置。'}])) \
+        != patent_id
+
+    # 本文も空の場合はファイル名から作る
+    empty = {'patent_number': None, 'file_name': 'a.xml'}
+    assert assign_patent_id(empty) != assign_patent_id(dict(empty, file_name='b.xml'))
+
+
+def test_fallback_id_is_stable_across_processes():
+    code = ("from patent_processing.patent_ids import assign_patent_id; "
+            f"print(assign_patent_id({UNNUMBERED!r}))")
+    ids = set()
+    for seed in ('1', '2'):
+        env = dict(os.environ, PYTHONPATH=str(SRC_DIR), PYTHONHASHSEED=seed)
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+        ids.add(result.stdout.strip())
+    assert ids == {assign_patent_id(UNNUMBERED)}
+
+
+def test_ids_assigned_at_parse_time_match_across_shards(processor, st96_corpus):
+    patents = list(processor.iter_patents(str(st96_corpus)))
+    assert [patent['patent_id'] for patent in patents] == [patent['patent_number'].strip() for patent in patents]
+
+    sharded = {}
+    for shard_index in range(3):
+        for patent in processor.iter_patents(str(st96_corpus), shard_index=shard_index, num_shards=3):
+            sharded[patent['xml_file_path']] = patent['patent_id']
+    assert sharded == {patent['xml_file_path']: patent['patent_id'] for patent in patents}
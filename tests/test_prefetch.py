@@ -0,0 +1,45 @@
+"""
+XMLファイルの先読み（prefetch）の確認
+
+先読みしても先読みしない場合と同じレコードが同じ順序で得られること
+（ディレクトリ・.tar.gz・チェックポイントからの再開）を確認する。
+"""
+
+import shutil
+
+import pytest
+
+from patent_processing.checkpoint import JOURNAL_FILE
+
+
+def summarize(df):
+    return [(row['file_name'], row['patent_id'], row['combined_text']) for _, row in df.iterrows()]
+
+
+@pytest.fixture(scope="module")
+def corpus_tar_gz(st96_corpus, tmp_path_factory):
+    archive_dir = tmp_path_factory.mktemp("st96-prefetch")
+    return shutil.make_archive(str(archive_dir / "corpus"), 'gztar', root_dir=st96_corpus)
+
+
+@pytest.mark.parametrize("prefetch", [1, 4, 32])
+def test_prefetch_matches_sequential(processor, st96_corpus, corpus_tar_gz, prefetch):
+    for xml_input in (str(st96_corpus), corpus_tar_gz):
+        expected = summarize(processor.process_xml_files(xml_input))
+        assert summarize(processor.process_xml_files(xml_input, prefetch=prefetch)) == expected
+
+
+@pytest.mark.parametrize("archived", [False, True], ids=["directory", "tar.gz"])
+def test_prefetch_resume_matches_sequential(processor, st96_corpus, corpus_tar_gz, tmp_path, archived):
+    xml_input = corpus_tar_gz if archived else str(st96_corpus)
+    expected = summarize(processor.process_xml_files(xml_input))
+
+    # 前半のファイルだけ完了した状態のチェックポイントを作成
+    checkpoint_dir = tmp_path / "checkpoint"
+    processor.process_xml_files(xml_input, checkpoint_dir=str(checkpoint_dir))
+    journal = checkpoint_dir / JOURNAL_FILE
+    lines = journal.read_text(encoding='utf-8').splitlines(keepends=True)
+    journal.write_text(''.join(lines[:len(lines) // 2]), encoding='utf-8')
+
+    resumed = processor.process_xml_files(xml_input, checkpoint_dir=str(checkpoint_dir), resume=True, prefetch=4)
+    assert summarize(resumed) == expected
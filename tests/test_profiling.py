@@ -0,0 +1,36 @@
+"""
+ステージ別プロファイリング（StageProfiler）の確認
+
+XML解析（parse）は入力のバイト数、他のステージは文字数を別の項目に集計し、
+各ステージの計測範囲が重ならない（合計が文書全体の処理時間を超えない）ことを確認する。
+"""
+
+import shutil
+
+import pytest
+
+from patent_processing.profiling import DOCUMENT_STAGE, StageProfiler
+from patent_processing.text_processor import PatentTextProcessor
+
+
+@pytest.mark.parametrize("archived", [False, True], ids=["directory", "zip"])
+def test_stages_report_bytes_and_chars_separately(st96_corpus, tmp_path, archived):
+    xml_input = str(st96_corpus)
+    if archived:
+        xml_input = shutil.make_archive(str(tmp_path / "corpus"), 'zip', root_dir=st96_corpus)
+    profiler = StageProfiler(enabled=True)
+    processor = PatentTextProcessor(language="japanese", profiler=profiler)
+    processed = processor.process_xml_files(xml_input)
+
+    stages = profiler.report()['stages']
+    total_bytes = sum(path.stat().st_size for path in st96_corpus.glob("**/*.xml"))
+    assert stages['parse']['total_bytes'] == total_bytes
+    assert stages['parse']['total_chars'] == 0
+    assert stages['parse']['chars_per_sec'] is None
+    assert stages['extract_detailed_description']['total_bytes'] == 0
+    assert stages['extract_detailed_description']['total_chars'] == \
+        sum(len(text) for text in processed['detailed_description'])
+
+    document_seconds = stages.pop(DOCUMENT_STAGE)['total_seconds']
+    assert all(stats['count'] == len(processed) for stats in stages.values())
+    assert sum(stats['total_seconds'] for stats in stages.values()) <= document_seconds
@@ -0,0 +1,89 @@
+"""
+コンパクトなレコード型（records）の確認
+
+combined_text を本文バッファの区間として保持しても元のテキスト・文・法的表現が復元できること、
+クリーニング済みテキストを別に持つより小さくなること、化学パターンのIDが出現順によらず固定であることを確認する。
+"""
+
+import random
+
+import pytest
+
+from patent_processing.analysis import CHEMICAL_PATTERNS
+from patent_processing.records import PatentRecord, decode_runs, encode_runs
+
+
+def random_edit(rng, source):
+    """クリーニングを模した編集（文字の削除・空白の置換・ソースにない文字の挿入）"""
+    result = []
+    for char in source:
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        if roll < 0.15:
+            result.append(' ')
+        elif roll < 0.17:
+            result.append('LEGAL' + str(rng.randint(0, 99)))
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def test_encode_runs_round_trip():
+    rng = random.Random(0)
+    alphabet = '本発明は樹脂組成物に関する。【0010】\n（）％0123abc '
+    for _ in range(300):
+        source = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 300)))
+        text = random_edit(rng, source)
+        runs, literals = encode_runs(source, text)
+        assert decode_runs(source, runs, literals) == text
+
+    # 区間の長さの上限を超えるテキスト
+    source = 'あ' * 70000 + '【】' + 'い' * 70000
+    text = 'あ' * 70000 + ' ' + 'い' * 70000
+    runs, literals = encode_runs(source, text)
+    assert decode_runs(source, runs, literals) == text
+    assert literals == ' '
+
+
+def test_record_keeps_combined_text_as_runs(processor, st96_corpus):
+    patents = list(processor.iter_patents(str(st96_corpus), analyze=True))
+    stored = 0
+    combined = 0
+    for patent_data in patents:
+        record = PatentRecord.from_dict(patent_data)
+        assert record.combined_text == patent_data['combined_text']
+        assert record.sentences == patent_data['sentences']
+        assert [span.text for span in record.iter_legal_spans()] == \
+            [expr['text'] for expr in patent_data['legal_analysis']['expressions']]
+        assert record.to_dict()['combined_text'] == patent_data['combined_text']
+
+        stored += len(record.combined_runs) * record.combined_runs.itemsize + 2 * len(record.combined_literals)
+        combined += 2 * len(patent_data['combined_text'])
+    assert stored < combined
+
+
+def chemical_record(patterns):
+    text = "NaCl と PE を含む樹脂組成物"
+    entities = [{'text': '', 'category': 'polymer', 'start': 0, 'end': 0, 'pattern': pattern} for pattern in patterns]
+    return PatentRecord.from_dict({'combined_text': text, 'chemical_analysis': {'enabled': True, 'entities': entities}})
+
+
+def test_chemical_pattern_ids_are_fixed(processor, st96_corpus):
+    patterns = list(reversed(CHEMICAL_PATTERNS[::3]))
+    record = chemical_record(patterns)
+    assert list(record.chemical_spans[3::4]) == [CHEMICAL_PATTERNS.index(pattern) for pattern in patterns]
+    assert [entity.pattern for entity in record.iter_chemical_entities()] == patterns
+
+    # 解析結果の配列形式からも同じテーブルのIDで保持する（別プロセス・別の実行でも同じ値）
+    patent = next(processor.iter_patents(str(st96_corpus), analyze=True))
+    record = PatentRecord.from_dict(patent)
+    expected = [entity['pattern'] for entity in patent['chemical_analysis']['entities']]
+    assert expected
+    assert list(record.chemical_spans[3::4]) == [CHEMICAL_PATTERNS.index(pattern) for pattern in expected]
+    assert [entity.pattern for entity in record.iter_chemical_entities()] == expected
+
+
+def test_unknown_chemical_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        chemical_record([r'未定義のパターン'])
@@ -0,0 +1,70 @@
+"""
+シャード出力のマージ（merge_shard_outputs）の確認
+
+既定ではシャード分割しない場合と同じレコードを出力し、近似重複除去は指定した場合のみ
+シャード横断で行い、除外した特許のレコードを全パートファイルから除くことを確認する。
+"""
+
+import json
+
+from patent_processing.sharding import (PART_FILES, SHARD_COMPLETE_MARKER, merge_shard_outputs, run_bulk_shard,
+                                       shard_output_dir)
+
+TEXT = "本発明は、優れた耐衝撃性と剛性を両立するポリプロピレン樹脂組成物及びその成形品に関する。" * 5
+
+
+def load(path):
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def test_merge_matches_unsharded_run(processor, st96_corpus, tmp_path):
+    for shard_index in range(2):
+        run_bulk_shard(processor, str(st96_corpus), str(tmp_path), shard_index, 2)
+    stats = merge_shard_outputs(str(tmp_path), 2)
+
+    expected = processor.process_xml_files(str(st96_corpus))
+    merged = load(tmp_path / 'complete_dataset.json')
+    assert sorted(record['patent_id'] for record in merged) == sorted(expected['patent_id'])
+    assert stats['dataset_info']['total_patents'] == len(expected)
+    assert stats['dataset_info']['dropped_duplicates'] == 0
+    assert not (tmp_path / 'dedup_report.json').exists()
+
+    # 各パートファイルはシャード順の単純な結合（json.dump と同じ形式）
+    for file_name in PART_FILES:
+        parts = [record for shard_index in range(2)
+                 for record in load(shard_output_dir(str(tmp_path), shard_index, 2) / file_name)]
+        assert (tmp_path / file_name).read_text(encoding='utf-8') == \
+            json.dumps(parts, ensure_ascii=False, indent=2)
+
+
+def write_shard(output_dir, shard_index, patents):
+    part_dir = shard_output_dir(str(output_dir), shard_index, 2)
+    part_dir.mkdir(parents=True)
+    complete = [{'patent_id': patent_id, 'combined_text': text, 'sentence_count': 2, 'claims_count': 1}
+                for patent_id, text in patents]
+    parts = {
+        'complete_dataset.json': complete,
+        'training_dataset.json': [{'patent_id': patent_id, 'text': text} for patent_id, text in patents],
+        'sections_dataset.json': [{'patent_id': patent_id, 'section': 'claims'} for patent_id, _ in patents],
+        'chatml_training.json': [{'messages': [], 'metadata': {'patent_id': patent_id}} for patent_id, _ in patents],
+        SHARD_COMPLETE_MARKER: {'dataset_info': {'total_patents': len(patents)}},
+    }
+    for file_name, records in parts.items():
+        (part_dir / file_name).write_text(json.dumps(records, ensure_ascii=False), encoding='utf-8')
+
+
+def test_merge_deduplicates_across_shards_only_when_requested(tmp_path):
+    write_shard(tmp_path, 0, [('JP1', TEXT), ('JP2', "全く異なる内容の実施形態を説明する文章である。" * 5)])
+    write_shard(tmp_path, 1, [('JP3', TEXT + "。")])
+
+    stats = merge_shard_outputs(str(tmp_path))
+    assert stats['dataset_info']['total_patents'] == 3
+
+    stats = merge_shard_outputs(str(tmp_path), deduplicate=True)
+    assert stats['dataset_info']['total_patents'] == 2
+    assert stats['dataset_info']['dropped_duplicates'] == 1
+    assert stats['dataset_info']['total_sentences'] == 4
+    assert (tmp_path / 'dedup_report.json').exists()
+    for file_name in PART_FILES:
+        ids = [record.get('patent_id') or record['metadata']['patent_id'] for record in load(tmp_path / file_name)]
+        assert ids == ['JP1', 'JP2']
@@ -0,0 +1,132 @@
+"""
+区切り位置を考慮したテキストの切り詰めの確認
+
+文の区切り・【請求項N】【0010】等のマーカーでの切り詰めが、区切りごとに文字列を連結していた
+従来の実装と同じ結果になること、トークン数の上限でも区切り位置で切り詰められることを確認する。
+"""
+
+import random
+import re
+from itertools import chain
+
+import pytest
+
+from utils.truncation import join_marked_blocks, token_counter, truncate_blocks, truncate_text
+
+CLAIM_PATTERN = r'【請求項\d+】'
+PARAGRAPH_PATTERN = r'【\d{4}】'
+# 従来の chat形式変換で、マーカーで分割できない場合に試していたパターン
+# （請求項は全ての【】、実施形態は【発明を実施する形態】等のセクション名で分割）
+SECTION_PATTERN = r'【[^】\d][^】]*】'
+ALL_PATTERN = r'【[^】]*】'
+FALLBACK_PATTERNS = {CLAIM_PATTERN: ALL_PATTERN, PARAGRAPH_PATTERN: SECTION_PATTERN}
+
+
+def reference_sentences(text, max_length, ellipsis=""):
+    """従来の文単位の切り詰め（区切りごとに結果を連結）"""
+    if len(text) <= max_length:
+        return text
+    result = ""
+    for sentence in text.split('。'):
+        if len(result + sentence + '。') <= max_length:
+            result += sentence + '。'
+        else:
+            break
+    return result if result else text[:max_length - len(ellipsis)] + ellipsis
+
+
+def reference_blocks(text, pattern, max_length):
+    """
+    従来の chat形式変換（preprocess_claims / preprocess_implementation）のマーカー単位の切り詰め
+
+    re.split と re.findall で分割してブロックごとに結果を連結し、結果が空の場合は
+    別の【】パターンでの分割 → 先頭の強制切り詰めの順に試す。
+    """
+    blocks = re.split(pattern, text)
+    markers = re.findall(pattern, text)
+    result = ""
+    for i, block in enumerate(blocks):
+        if not block.strip():
+            continue
+        marker = markers[i - 1] if i > 0 and i - 1 < len(markers) else ""
+        # 実施形態の先頭段落（【発明を実施する形態】を含む）は段落番号を付けない
+        if i == 0 and '【発明を実施する形態】' in block:
+            candidate = block.strip()
+        else:
+            candidate = marker + block.strip()
+        if len(result + candidate) <= max_length:
+            result = result + candidate
+        elif result:
+            break
+        else:
+            result = candidate[:max_length - 3] + '...'
+            break
+
+    if not result:
+        fallback = FALLBACK_PATTERNS[pattern]
+        fallback_blocks = re.split(fallback, text)
+        fallback_markers = re.findall(fallback, text)
+        for i, block in enumerate(fallback_blocks):
+            if not block.strip():
+                continue
+            marker = fallback_markers[i - 1] if i > 0 and i - 1 < len(fallback_markers) else ""
+            candidate = marker + block.strip()
+            if len(candidate) <= max_length:
+                result = candidate
+            else:
+                result = candidate[:max_length - 3] + '...'
+            break
+
+    if not result:
+        result = text[:max_length - 3] + '...'
+    return result
+
+
+def random_texts(tokens, count=2000, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 15)))
+
+
+@pytest.mark.parametrize("ellipsis", ["", "..."])
+def test_truncate_text_matches_sentence_accumulation(ellipsis):
+    tokens = ['。', 'あ' * 5, 'い' * 40, 'う' * 200, '特許請求の範囲。', ' ']
+    for text in random_texts(tokens):
+        for max_length in (10, 50, 300):
+            assert truncate_text(text, max_length, ellipsis=ellipsis) == reference_sentences(text, max_length, ellipsis)
+
+
+@pytest.mark.parametrize("pattern", [CLAIM_PATTERN, PARAGRAPH_PATTERN])
+def test_truncate_blocks_matches_block_accumulation(pattern):
+    tokens = ['【請求項1】', '【請求項12】', '【0010】', '【課題】', '【発明を実施する形態】', ' ',
+              'あ' * 20, 'い' * 150, 'う' * 600]
+    # マーカーのみのテキスト（従来は別の【】パターンでの分割を試していた）
+    marker_only = ['【請求項1】', '【0010】', '【課題】', ' ']
+    for text in chain(random_texts(tokens), random_texts(marker_only, count=500, seed=1)):
+        text = ' '.join(text.split())
+        for max_length in (10, 100, 500):
+            if len(text) > max_length:
+                assert truncate_blocks(text, pattern, max_length) == reference_blocks(text, pattern, max_length)
+
+
+def test_join_marked_blocks_offsets():
+    joined, ends = join_marked_blocks(" 前文 【請求項1】 装置。【請求項2】【請求項3】方法。 ", CLAIM_PATTERN)
+    assert joined == "前文【請求項1】装置。【請求項3】方法。"
+    assert [joined[:end] for end in ends] == ["前文", "前文【請求項1】装置。", joined]
+
+
+class CharPairTokenizer:
+    """2文字を1トークンとして数えるトークナイザー"""
+
+    def encode(self, text, add_special_tokens=True):
+        return list(range((len(text) + 1) // 2))
+
+
+def test_truncate_text_token_budget():
+    measure = token_counter(CharPairTokenizer())
+    text = "あいうえお。かきくけこ。さしすせそ。"
+    assert truncate_text(text, 9, measure=measure) == text
+    assert truncate_text(text, 7, measure=measure) == "あいうえお。かきくけこ。"
+    # 区切りで何も残らない場合は ellipsis を含めて上限内に切る
+    assert truncate_text(text, 2, measure=measure, ellipsis="…") == "あいう…"
+    assert truncate_blocks("【0001】あいう【0002】えお", PARAGRAPH_PATTERN, 5, measure=measure) == "【0001】あいう"